@@ -2,59 +2,155 @@
 Prompt Optimizer Flask Backend
 Main application server providing API endpoints for prompt optimization
 """
-from flask import Flask, request, jsonify
+import boot
+
+# Before the heavy imports, so the import phase is measured too
+BOOT = boot.BootTimer()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import logging
 from datetime import datetime
+import json
 import os
+import threading
+import time
 
 from config import Config
-from optimizer import PromptOptimizer
+import metrics
+import request_log
+from deadline import start_deadline
+from batch import iter_batch
+from jobs import JobManager, JobQueueFull
+from ratelimit import check_rate_limit
+from validation import validate_optimize_payload, validate_prompt_input
 
 # Initialize Flask app
 app = Flask(__name__)
 
 # Configure CORS
-CORS(app, origins=Config.CORS_ORIGINS)
+RESPONSE_HEADERS = ['X-Request-ID', 'X-Cache', 'X-Degraded', 'Location', 'Server-Timing', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset', 'Retry-After']
+CORS(app, origins=Config.CORS_ORIGINS, expose_headers=RESPONSE_HEADERS)
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+log_handler = request_log.configure_logging(Config.LOG_MODE, Config.LOG_QUEUE_SIZE, Config.LOG_SAMPLE_RATE)
+if log_handler:
+    metrics.REGISTRY.register_collector(log_handler.collect_metrics)
 logger = logging.getLogger(__name__)
 
-# Initialize optimizer
-try:
-    optimizer = PromptOptimizer()
-    logger.info("Prompt Optimizer initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Prompt Optimizer: {e}")
-    optimizer = None
+metrics.REGISTRY.register_collector(BOOT.collect_metrics)
 
-# Rate limiting storage (simple in-memory for demo)
-request_counts = {}
+# Built by init_optimizer: at import (BOOT_MODE=eager) or on first use (lazy)
+optimizer = None
+# Worker pool for "async": true optimizations, so slow DETAIL calls don't hold a web worker
+job_manager = None
+_boot_lock = threading.Lock()
+_booted = False
 
-def check_rate_limit(client_ip: str) -> bool:
-    """Simple rate limiting check"""
-    current_time = datetime.now()
-    current_minute = current_time.replace(second=0, microsecond=0)
-    
-    if client_ip not in request_counts:
-        request_counts[client_ip] = {}
-    
-    if current_minute not in request_counts[client_ip]:
-        request_counts[client_ip][current_minute] = 0
-    
-    request_counts[client_ip][current_minute] += 1
+def init_optimizer():
+    """Build the optimizer and job pool once; later calls return the result of the first"""
+    global optimizer, job_manager, _booted
+    if _booted:
+        return optimizer
+    with _boot_lock:
+        if _booted:
+            return optimizer
+        try:
+            # Imported here so a lazy boot also defers the upstream client stack
+            from optimizer import PromptOptimizer
+            optimizer = PromptOptimizer()
+            optimizer.health_monitor.start()
+            metrics.REGISTRY.register_collector(optimizer.collect_metrics)
+            logger.info("Prompt Optimizer initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize Prompt Optimizer: {e}")
+            optimizer = None
+
+        if optimizer:
+            job_manager = JobManager(
+                workers=Config.JOB_WORKERS,
+                max_queue=Config.JOB_MAX_QUEUE,
+                ttl=Config.JOB_TTL_SECONDS,
+                deadline_seconds=Config.JOB_DEADLINE_SECONDS
+            )
+            metrics.REGISTRY.register_collector(job_manager.collect_metrics)
+        BOOT.mark("optimizer_ready")
+        _booted = True
+    return optimizer
+
+if Config.BOOT_MODE != 'lazy':
+    init_optimizer()
+if Config.BOOT_PREWARM:
+    boot.prewarm(BOOT, init_optimizer)
+BOOT.mark("imported")
+
+# Endpoints whose upstream calls share a per-request deadline
+DEADLINE_ENDPOINTS = {'optimize_prompt', 'optimize_prompt_stream'}
+# Endpoints that need the optimizer; a lazy boot builds it on the first of these
+OPTIMIZER_ENDPOINTS = DEADLINE_ENDPOINTS | {'health', 'get_job', 'optimize_batch'}
+
+@app.before_request
+def start_request_trace():
+    g.request_start = time.perf_counter()
+    g.request_id = request_log.request_id(request.headers.get('X-Request-ID'))
+    g.trace = metrics.start_trace()
+    if not _booted and request.endpoint in OPTIMIZER_ENDPOINTS:
+        # Only the requests that arrive before a lazy boot finishes pay for (and show) it
+        with metrics.span("boot"):
+            init_optimizer()
+    # Upstream calls only get the time left, so slow requests fail cleanly before gunicorn's worker timeout
+    start_deadline(Config.REQUEST_DEADLINE_SECONDS if request.endpoint in DEADLINE_ENDPOINTS else None)
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe request latency, expose stage timings as Server-Timing and log the request"""
+    start = g.get('request_start')
+    if start is not None:
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=request.endpoint or 'unknown',
+            status=response.status_code
+        )
+    trace = g.get('trace')
+    if trace is not None and trace.stages:
+        response.headers['Server-Timing'] = trace.server_timing()
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    if log_handler and start is not None:
+        # Streamed responses are still being produced here; log once the body is done
+        method, path, status = request.method, request.path, response.status_code
+        response.call_on_close(lambda: request_log.log_request(
+            request_id, method, path, status, time.perf_counter() - start, trace
+        ))
+    BOOT.first_response()
+    return response
+
+@app.after_request
+def add_rate_limit_headers(response):
+    """Attach X-RateLimit-* (and Retry-After when limited) to rate-limited endpoints"""
+    rate_limit = g.get('rate_limit')
+    if rate_limit is not None:
+        for name, value in rate_limit.headers().items():
+            response.headers[name] = value
+    return response
+
+def parse_optimize_request(data, stream=False):
+    """
+    Validate an optimization request body (stream: for /optimize/stream)
     
-    # Clean old entries
-    old_entries = [k for k in request_counts[client_ip].keys() 
-                   if (current_time - k).total_seconds() > 60]
-    for old_key in old_entries:
-        del request_counts[client_ip][old_key]
+    Returns:
+        (params, None) on success, or (None, (response, status)) on failure
+    """
+    with metrics.span("validation"):
+        params, error_message = validate_optimize_payload(data, request.headers.get('Cache-Control', ''), stream)
+    if error_message:
+        return None, (jsonify({
+            "error": True,
+            "message": error_message
+        }), 400)
     
-    return request_counts[client_ip][current_minute] <= Config.REQUESTS_PER_MINUTE
+    return params, None
 
 @app.route('/', methods=['GET'])
 def home():
@@ -68,25 +164,38 @@ def home():
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Comprehensive health check including DeepSeek API"""
+    """Cached upstream health, refreshed by a background prober and real traffic"""
     if not optimizer:
         logger.error("Optimizer validation endpoint called but optimizer not initialized")
         return jsonify({
             "error": "Prompt Optimizer not initialized"
         }), 503
 
-    health_status = optimizer.health_check()
-    status_code = 200 if health_status["status"] == "healthy" else 500
+    health_status = optimizer.health_monitor.snapshot()
+    if optimizer.circuit:
+        health_status["circuit"] = optimizer.circuit.state
+    if len(optimizer.backends.backends) > 1:
+        health_status["backends"] = {
+            name: "ejected" if backend_stats["ejected"] else "ok"
+            for name, backend_stats in optimizer.backends.stats().items()
+        }
+    status_code = 500 if health_status["status"] == "unhealthy" else 200
     
     return jsonify(health_status), status_code
 
+@app.route('/health/live', methods=['GET'])
+def liveness():
+    """Cheap liveness check: the process is up and serving, no upstream call"""
+    return jsonify({"status": "alive"}), 200
+
 @app.route('/optimize', methods=['POST'])
 def optimize_prompt():
     """Main endpoint for prompt optimization"""
     client_ip = request.remote_addr
     
     # Rate limiting
-    if not check_rate_limit(client_ip):
+    g.rate_limit = check_rate_limit(client_ip)
+    if not g.rate_limit.allowed:
         return jsonify({
             "error": True,
             "message": "Rate limit exceeded. Please try again later."
@@ -100,64 +209,44 @@ def optimize_prompt():
         }), 503
     
     try:
-        # Parse request data
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                "error": True,
-                "message": "No JSON data provided"
-            }), 400
-        
-        # Validate required fields
-        required_fields = ["raw_prompt", "prompt_style", "target_ai"]
-        missing_fields = [field for field in required_fields if field not in data]
-        
-        if missing_fields:
-            return jsonify({
-                "error": True,
-                "message": f"Missing required fields: {', '.join(missing_fields)}"
-            }), 400
-        
-        # Validate field values
-        # Extract required fields
-        raw_prompt = data.get('raw_prompt', '').strip()
-        prompt_style = data.get('prompt_style', 'BASIC').upper()
-        target_ai = data.get('target_ai', 'ChatGPT')
-        clarifications = data.get('clarifications', '').strip() or None
+        # Parse and validate request data
+        params, error_response = parse_optimize_request(request.get_json())
+        if error_response:
+            return error_response
         
-        if not raw_prompt:
-            return jsonify({
-                "error": True,
-                "message": "raw_prompt cannot be empty"
-            }), 400
+        if params["async"] or 'respond-async' in request.headers.get('Prefer', ''):
+            return submit_optimization_job(params, client_ip)
         
-        if prompt_style not in ["BASIC", "DETAIL"]:
-            return jsonify({
-                "error": True,
-                "message": "prompt_style must be 'BASIC' or 'DETAIL'"
-            }), 400
-        
-        if target_ai not in ["ChatGPT", "Claude", "Gemini", "Other"]:
-            return jsonify({
-                "error": True,
-                "message": "target_ai must be one of: ChatGPT, Claude, Gemini, Other"
-            }), 400
+        raw_prompt = params["raw_prompt"]
+        prompt_style = params["prompt_style"]
+        target_ai = params["target_ai"]
+        clarifications = params["clarifications"]
+        use_cache = params["use_cache"]
         
         # Log the optimization request
-        logger.info(f"Optimization request from {client_ip}: style={prompt_style}, target={target_ai}")
+        logger.info("Optimization request from %s: style=%s, target=%s", client_ip, prompt_style, target_ai)
         
         # Perform optimization (may return questions for DETAIL mode)
-        result = optimizer.optimize_prompt(raw_prompt, prompt_style, target_ai, clarifications)
+        result = optimizer.optimize_prompt(raw_prompt, prompt_style, target_ai, clarifications,
+                                           use_cache=use_cache, routing=params["routing"],
+                                           session_id=params["session_id"])
+        cache_status = result.pop("cache_status", "BYPASS")
+        metrics.annotate(prompt_style=prompt_style, target_ai=target_ai, cache=cache_status)
         
         if result.get("error"):
             logger.error(f"Optimization failed: {result.get('message')}")
-            return jsonify(result), 500
+            response = jsonify(result)
+            response.headers['X-Cache'] = cache_status
+            return response, 504 if result.get("deadline_exceeded") else 500
         
         # Log successful optimization
-        logger.info(f"Optimization completed successfully for {client_ip}")
+        logger.info("Optimization completed successfully for %s (cache=%s)", client_ip, cache_status)
         
-        return jsonify(result), 200
+        response = jsonify(result)
+        response.headers['X-Cache'] = cache_status
+        if result.get("degraded"):
+            response.headers['X-Degraded'] = 'true'
+        return response, 200
         
     except Exception as e:
         logger.error(f"Unexpected error in optimize_prompt: {str(e)}")
@@ -166,32 +255,258 @@ def optimize_prompt():
             "message": "An unexpected error occurred. Please try again."
         }), 500
 
+def queue_job(run, client_ip: str):
+    """Submit run to the job pool; returns (job, None) or (None, 503 response) when the queue is full"""
+    try:
+        return job_manager.submit(run), None
+    except JobQueueFull as e:
+        logger.warning(f"Rejected job from {client_ip}: {str(e)}")
+        response = jsonify({
+            "error": True,
+            "message": "Too many optimizations queued. Please try again shortly."
+        })
+        response.headers['Retry-After'] = '5'
+        return None, (response, 503)
+
+def job_accepted(job):
+    """202 response pointing at where to poll for a queued job"""
+    poll_url = f"/jobs/{job.id}"
+    response = jsonify(dict(job.to_dict(), poll_url=poll_url))
+    response.headers['Location'] = poll_url
+    return response, 202
+
+def submit_optimization_job(params: dict, client_ip: str):
+    """Queue an optimization on the job pool and answer 202 with where to poll for it"""
+    def run():
+        result = optimizer.optimize_prompt(
+            params["raw_prompt"],
+            params["prompt_style"],
+            params["target_ai"],
+            params["clarifications"],
+            use_cache=params["use_cache"],
+            routing=params["routing"],
+            session_id=params["session_id"]
+        )
+        # X-Cache is for synchronous responses; a polled job result carries only the optimization
+        result.pop("cache_status", None)
+        return result
+    
+    job, error_response = queue_job(run, client_ip)
+    if error_response:
+        return error_response
+    
+    metrics.annotate(job_id=job.id, prompt_style=params['prompt_style'], target_ai=params['target_ai'])
+    logger.info("Queued optimization job %s for %s: style=%s, target=%s", job.id, client_ip,
+                params['prompt_style'], params['target_ai'])
+    return job_accepted(job)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Status of a background optimization, with its result once finished
+    
+    ?wait=<seconds> long-polls: the request blocks until the job finishes or
+    the wait (capped by JOB_MAX_WAIT_SECONDS) runs out.
+    """
+    if not job_manager:
+        return jsonify({
+            "error": True,
+            "message": "Service temporarily unavailable"
+        }), 503
+    
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({
+            "error": True,
+            "message": "wait must be a number of seconds"
+        }), 400
+    wait = max(0.0, min(wait, Config.JOB_MAX_WAIT_SECONDS))
+    
+    job = job_manager.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({
+            "error": True,
+            "message": "Job not found or expired"
+        }), 404
+    
+    return jsonify(job.to_dict()), 200
+
+def format_sse(event: str, data: dict) -> str:
+    """Serialize one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/optimize/stream', methods=['POST'])
+def optimize_prompt_stream():
+    """Stream an optimization as Server-Sent Events"""
+    client_ip = request.remote_addr
+    
+    # Rate limiting
+    g.rate_limit = check_rate_limit(client_ip)
+    if not g.rate_limit.allowed:
+        return jsonify({
+            "error": True,
+            "message": "Rate limit exceeded. Please try again later."
+        }), 429
+    
+    # Validate optimizer is initialized
+    if not optimizer:
+        return jsonify({
+            "error": True,
+            "message": "Service temporarily unavailable"
+        }), 503
+    
+    params, error_response = parse_optimize_request(request.get_json(silent=True), stream=True)
+    if error_response:
+        return error_response
+    
+    logger.info("Streaming optimization request from %s: style=%s, target=%s", client_ip,
+                params['prompt_style'], params['target_ai'])
+    metrics.annotate(prompt_style=params['prompt_style'], target_ai=params['target_ai'])
+    
+    def generate():
+        for event, data in optimizer.optimize_prompt_stream(
+            params["raw_prompt"],
+            params["prompt_style"],
+            params["target_ai"],
+            params["clarifications"],
+            use_cache=params["use_cache"],
+            routing=params["routing"],
+            session_id=params["session_id"]
+        ):
+            if event == "done":
+                metrics.annotate(cache=data.get("cache_status", "BYPASS"))
+            yield format_sse(event, data)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def charged_batch_lines(lines, client_ip: str, max_items: int, stop: dict):
+    """
+    Yield batch lines while the client has rate-limit tokens, one token per
+    item (the request's own check paid for the first). Stops at max_items
+    lines; `stop` then holds the index of the first line left out and why.
+    """
+    items = 0
+    for index, line in enumerate(lines):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            yield line
+            continue
+        if items >= max_items:
+            stop.update(index=index, error=(f"Batch limited to {max_items} items; send larger batches "
+                                            f"with async=true or run batch.py"))
+            break
+        if items and not check_rate_limit(client_ip).allowed:
+            stop.update(index=index, error="Rate limit exceeded; this item and the rest were not processed")
+            break
+        items += 1
+        yield line
+    if stop:
+        logger.warning("Batch from %s stopped at line %s: %s", client_ip, stop["index"], stop["error"])
+
+@app.route('/optimize/batch', methods=['POST'])
+def optimize_batch():
+    """
+    Optimize many prompts in one request
+    
+    The body is JSONL with one /optimize request per line; the response
+    streams one JSON line per input, tagged with its input index. Query
+    parameters: concurrency (capped by BATCH_MAX_CONCURRENCY),
+    ordered=false to emit results as they complete, and async=true to run
+    the batch as a background job (see /jobs/<job_id>).
+    
+    Each item costs one rate-limit token. A batch that runs out of tokens,
+    items (BATCH_MAX_ITEMS, or BATCH_JOB_MAX_ITEMS for jobs) or time ends
+    with error lines for the items it did not optimize.
+    """
+    client_ip = request.remote_addr
+    
+    g.rate_limit = check_rate_limit(client_ip)
+    if not g.rate_limit.allowed:
+        return jsonify({
+            "error": True,
+            "message": "Rate limit exceeded. Please try again later."
+        }), 429
+    
+    # Validate optimizer is initialized
+    if not optimizer:
+        return jsonify({
+            "error": True,
+            "message": "Service temporarily unavailable"
+        }), 503
+    
+    try:
+        concurrency = int(request.args.get('concurrency', Config.BATCH_CONCURRENCY))
+    except ValueError:
+        return jsonify({
+            "error": True,
+            "message": "concurrency must be an integer"
+        }), 400
+    concurrency = max(1, min(concurrency, Config.BATCH_MAX_CONCURRENCY))
+    ordered = request.args.get('ordered', 'true').lower() != 'false'
+    run_as_job = request.args.get('async', 'false').lower() == 'true'
+    
+    logger.info("Batch optimization request from %s: concurrency=%s, ordered=%s, async=%s",
+                client_ip, concurrency, ordered, run_as_job)
+    
+    stop = {}
+    if run_as_job:
+        # Read (and charge for) the whole body now; the job outlives the request
+        lines = list(charged_batch_lines(request.stream, client_ip, Config.BATCH_JOB_MAX_ITEMS, stop))
+        
+        def run():
+            results = list(iter_batch(optimizer, lines, concurrency, ordered,
+                                      deadline_seconds=Config.REQUEST_DEADLINE_SECONDS))
+            if stop:
+                results.append(dict(stop))
+            return {"error": False, "results": results}
+        
+        job, error_response = queue_job(run, client_ip)
+        if error_response:
+            return error_response
+        metrics.annotate(job_id=job.id)
+        logger.info("Queued batch job %s for %s: %s lines", job.id, client_ip, len(lines))
+        return job_accepted(job)
+    
+    # The whole stream has to finish on this worker, so every item shares the request's budget
+    expires_at = time.monotonic() + Config.REQUEST_DEADLINE_SECONDS
+    
+    def generate():
+        lines = charged_batch_lines(request.stream, client_ip, Config.BATCH_MAX_ITEMS, stop)
+        for item in iter_batch(optimizer, lines, concurrency, ordered,
+                               deadline_seconds=Config.REQUEST_DEADLINE_SECONDS, expires_at=expires_at):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        if stop:
+            yield json.dumps(stop, ensure_ascii=False) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson'
+    )
+
 @app.route('/validate', methods=['POST'])
 def validate_input():
     """Endpoint to validate input before optimization"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"valid": False, "message": "No data provided"})
-        
-        raw_prompt = data.get("raw_prompt", "").strip()
-        
-        if not raw_prompt:
-            return jsonify({"valid": False, "message": "Prompt cannot be empty"})
-        
-        if len(raw_prompt) < 10:
-            return jsonify({"valid": False, "message": "Prompt too short (minimum 10 characters)"})
-        
-        if len(raw_prompt) > 5000:
-            return jsonify({"valid": False, "message": "Prompt too long (maximum 5000 characters)"})
-        
-        return jsonify({"valid": True, "message": "Input is valid"})
+        return jsonify(validate_prompt_input(request.get_json()))
         
     except Exception as e:
         logger.error(f"Error in validate_input: {str(e)}")
         return jsonify({"valid": False, "message": "Validation error"}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of latency, token and cache metrics"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
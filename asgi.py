@@ -0,0 +1,278 @@
+"""
+Prompt Optimizer ASGI Backend
+Async serving mode: one worker multiplexes many in-flight upstream calls
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+import metrics
+import request_log
+from config import Config
+from async_optimizer import AsyncPromptOptimizer
+from deadline import start_deadline
+from ratelimit import check_rate_limit
+from validation import validate_optimize_payload, validate_prompt_input
+
+# Configure logging
+log_handler = request_log.configure_logging(Config.LOG_MODE, Config.LOG_QUEUE_SIZE, Config.LOG_SAMPLE_RATE)
+if log_handler:
+    metrics.REGISTRY.register_collector(log_handler.collect_metrics)
+logger = logging.getLogger(__name__)
+
+# Created during lifespan startup so the asyncio primitives bind to the server's loop
+optimizer = None
+
+ALLOWED_ORIGINS = [origin.strip() for origin in Config.CORS_ORIGINS.split(',') if origin.strip()]
+
+
+def _cors_headers(origin):
+    if not origin:
+        return []
+    if '*' in ALLOWED_ORIGINS:
+        allow = [(b'access-control-allow-origin', b'*')]
+    elif origin in ALLOWED_ORIGINS:
+        allow = [(b'access-control-allow-origin', origin.encode()), (b'vary', b'Origin')]
+    else:
+        return []
+    return allow + [(b'access-control-expose-headers', b'X-Request-ID, X-Cache, X-Degraded, Server-Timing, X-RateLimit-Limit, X-RateLimit-Remaining, X-RateLimit-Reset, Retry-After')]
+
+
+async def _send_json(send, payload, status=200, origin=None, extra_headers=None):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode())
+    ]
+    headers += _cors_headers(origin)
+    for name, value in (extra_headers or {}).items():
+        headers.append((name.lower().encode(), str(value).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_json(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    body = b''.join(chunks)
+    if not body:
+        return None
+    return json.loads(body)
+
+
+async def home(scope, receive, send, headers):
+    origin = headers.get('origin')
+    await _send_json(send, {
+        "service": "Prompt Optimizer",
+        "status": "running",
+        "version": "1.0.0",
+        "timestamp": datetime.now().isoformat()
+    }, origin=origin)
+
+
+async def health(scope, receive, send, headers):
+    origin = headers.get('origin')
+    if not optimizer:
+        await _send_json(send, {"error": "Prompt Optimizer not initialized"}, 503, origin)
+        return
+
+    # The first snapshot may run a blocking probe, so keep it off the event loop
+    health_status = await asyncio.to_thread(optimizer.health_monitor.snapshot)
+    if optimizer.circuit:
+        health_status["circuit"] = optimizer.circuit.state
+    if len(optimizer.backends.backends) > 1:
+        health_status["backends"] = {
+            name: "ejected" if backend_stats["ejected"] else "ok"
+            for name, backend_stats in optimizer.backends.stats().items()
+        }
+    status_code = 500 if health_status["status"] == "unhealthy" else 200
+    await _send_json(send, health_status, status_code, origin)
+
+
+async def liveness(scope, receive, send, headers):
+    await _send_json(send, {"status": "alive"}, origin=headers.get('origin'))
+
+
+async def optimize(scope, receive, send, headers):
+    origin = headers.get('origin')
+    client_ip = (scope.get('client') or ('unknown', 0))[0]
+
+    # Rate limiting; the SQLite backend blocks on its file lock, so keep it off the event loop
+    rate_limit = await asyncio.to_thread(check_rate_limit, client_ip)
+    rate_limit_headers = rate_limit.headers()
+    if not rate_limit.allowed:
+        await _send_json(send, {
+            "error": True,
+            "message": "Rate limit exceeded. Please try again later."
+        }, 429, origin, rate_limit_headers)
+        return
+
+    # Validate optimizer is initialized
+    if not optimizer:
+        await _send_json(send, {
+            "error": True,
+            "message": "Service temporarily unavailable"
+        }, 503, origin, rate_limit_headers)
+        return
+
+    try:
+        data = await _read_json(receive)
+    except ValueError:
+        data = None
+
+    with metrics.span("validation"):
+        params, error_message = validate_optimize_payload(data, headers.get('cache-control', ''))
+    if error_message:
+        await _send_json(send, {"error": True, "message": error_message}, 400, origin, rate_limit_headers)
+        return
+
+    logger.info("Optimization request from %s: style=%s, target=%s", client_ip, params['prompt_style'], params['target_ai'])
+    start_deadline(Config.REQUEST_DEADLINE_SECONDS)
+
+    try:
+        result = await optimizer.optimize_prompt_async(
+            params["raw_prompt"],
+            params["prompt_style"],
+            params["target_ai"],
+            params["clarifications"],
+            use_cache=params["use_cache"],
+            routing=params["routing"],
+            session_id=params["session_id"]
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in optimize: {str(e)}")
+        await _send_json(send, {
+            "error": True,
+            "message": "An unexpected error occurred. Please try again."
+        }, 500, origin, rate_limit_headers)
+        return
+
+    cache_status = result.pop("cache_status", "BYPASS")
+    metrics.annotate(prompt_style=params["prompt_style"], target_ai=params["target_ai"], cache=cache_status)
+    if result.get("error"):
+        logger.error(f"Optimization failed: {result.get('message')}")
+        status = 504 if result.get("deadline_exceeded") else 500
+        await _send_json(send, result, status, origin, dict(rate_limit_headers, **{"X-Cache": cache_status}))
+        return
+
+    logger.info("Optimization completed successfully for %s (cache=%s)", client_ip, cache_status)
+    response_headers = dict(rate_limit_headers, **{"X-Cache": cache_status})
+    if result.get("degraded"):
+        response_headers["X-Degraded"] = "true"
+    await _send_json(send, result, 200, origin, response_headers)
+
+
+async def validate(scope, receive, send, headers):
+    origin = headers.get('origin')
+    try:
+        data = await _read_json(receive)
+        await _send_json(send, validate_prompt_input(data), origin=origin)
+    except Exception as e:
+        logger.error(f"Error in validate_input: {str(e)}")
+        await _send_json(send, {"valid": False, "message": "Validation error"}, 500, origin)
+
+
+async def metrics_endpoint(scope, receive, send, headers):
+    body = metrics.REGISTRY.render().encode('utf-8')
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/plain; version=0.0.4'),
+        (b'content-length', str(len(body)).encode())
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    global optimizer
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                optimizer = AsyncPromptOptimizer()
+                optimizer.health_monitor.start()
+                metrics.REGISTRY.register_collector(optimizer.collect_metrics)
+                logger.info("Async Prompt Optimizer initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize Async Prompt Optimizer: {e}")
+                optimizer = None
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if optimizer:
+                optimizer.health_monitor.stop()
+                await optimizer.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+ROUTES = {
+    ('GET', '/'): home,
+    ('GET', '/health'): health,
+    ('GET', '/health/live'): liveness,
+    ('POST', '/optimize'): optimize,
+    ('POST', '/validate'): validate,
+    ('GET', '/metrics'): metrics_endpoint,
+}
+
+
+async def app(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+    origin = headers.get('origin')
+    method = scope['method']
+    path = scope['path'].rstrip('/') or '/'
+
+    # CORS preflight
+    if method == 'OPTIONS':
+        preflight = _cors_headers(origin) + [
+            (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+            (b'access-control-allow-headers', b'Content-Type, Cache-Control'),
+            (b'content-length', b'0')
+        ]
+        await send({'type': 'http.response.start', 'status': 204, 'headers': preflight})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        await _send_json(send, {"error": True, "message": "Endpoint not found"}, 404, origin)
+        return
+
+    trace = metrics.start_trace()
+    start = time.perf_counter()
+    response_status = {}
+    request_id = request_log.request_id(headers.get('x-request-id'))
+
+    async def send_with_timing(message):
+        # Stage spans are complete by the time the response starts
+        if message['type'] == 'http.response.start':
+            response_status['code'] = message['status']
+            extra = [(b'x-request-id', request_id.encode())]
+            if trace.stages:
+                extra.append((b'server-timing', trace.server_timing().encode()))
+            message = dict(message, headers=list(message.get('headers', [])) + extra)
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_with_timing, headers)
+    finally:
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=path,
+            status=response_status.get('code', 500)
+        )
+        request_log.log_request(request_id, method, path, response_status.get('code', 500),
+                                time.perf_counter() - start, trace)
@@ -0,0 +1,203 @@
+"""
+Async Prompt Optimizer
+asyncio variant of PromptOptimizer for the ASGI serving mode
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import metrics
+from cache import make_cache_key
+from circuit import CircuitOpenError
+from deadline import DeadlineExceeded, current_deadline
+from hedging import hedged_call_async
+from optimizer import PromptOptimizer
+from sessions import DetailSession
+from singleflight import AsyncSingleFlight
+from upstream import AsyncUpstreamClient
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AsyncPromptOptimizer(PromptOptimizer):
+    """
+    Same prompts, caching and parsing as PromptOptimizer, but upstream calls
+    are awaited so one process can multiplex many optimizations. A semaphore
+    bounds the number of concurrent upstream requests.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        super().__init__()
+        self.max_concurrency = max_concurrency or self.config.ASYNC_MAX_CONCURRENCY
+        self.upstream_semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.async_client = AsyncUpstreamClient()
+        self.singleflight = AsyncSingleFlight() if self.config.SINGLEFLIGHT_ENABLED else None
+
+    async def optimize_prompt_async(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                                    clarifications: Optional[str] = None, use_cache: bool = True,
+                                    routing: Optional[Dict] = None, session_id: Optional[str] = None) -> Dict:
+        """Async equivalent of PromptOptimizer.optimize_prompt"""
+        speculation = self._speculation_for(session_id, raw_prompt, prompt_style, target_ai, routing)
+        if speculation is not None:
+            result = await self.speculator.claim_async(speculation, self._speculation_wait())
+            if result is not None:
+                return self._speculative_result(result)
+
+        cache_key, cached = self._cache_lookup(raw_prompt, prompt_style, target_ai, clarifications, use_cache, routing)
+        if cached is not None:
+            return cached
+
+        near_duplicate_entry = self._near_duplicate_entry(raw_prompt, prompt_style, target_ai, clarifications, routing)
+        if not self.singleflight:
+            result = await self._optimize_uncached_async(raw_prompt, prompt_style, target_ai, clarifications,
+                                                         routing, session_id)
+            return self._cache_store(cache_key, result, near_duplicate_entry)
+
+        flight_key = cache_key or make_cache_key(raw_prompt, prompt_style, target_ai, clarifications, routing)
+        try:
+            result, shared = await self.singleflight.do(
+                flight_key,
+                lambda: self._optimize_uncached_async(raw_prompt, prompt_style, target_ai, clarifications, routing,
+                                                      session_id)
+            )
+        except DeadlineExceeded as e:
+            # Our budget ran out while waiting on the identical in-flight request
+            return self._optimization_error(e)
+        return self._finish_flight(cache_key, result, shared, raw_prompt, target_ai, near_duplicate_entry)
+
+    def _speculate(self, session: DetailSession):
+        """Start the speculative BASIC optimization as a task on the serving event loop"""
+        session.speculation = self.speculator.start_async(
+            lambda: self.optimize_prompt_async(session.raw_prompt, "BASIC", session.target_ai)
+        )
+
+    async def _optimize_uncached_async(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                                       clarifications: Optional[str] = None, routing: Optional[Dict] = None,
+                                       session_id: Optional[str] = None) -> Dict:
+        try:
+            if self.circuit:
+                self.circuit.reject_if_open()
+
+            # For DETAIL mode without clarifications, first ask questions
+            if prompt_style == "DETAIL" and clarifications is None:
+                logger.info("DETAIL mode: Getting clarifying questions")
+                return await self._get_clarifying_questions_async(raw_prompt, target_ai)
+
+            logger.info("Optimizing prompt: style=%s, has_clarifications=%s", prompt_style, clarifications is not None)
+
+            payload = self._build_optimization_payload(raw_prompt, prompt_style, target_ai, clarifications,
+                                                       routing=routing, session_id=session_id)
+            labels = {"model": payload["model"], "prompt_style": prompt_style, "target_ai": target_ai}
+            with metrics.span("upstream", **labels):
+                response = await self._call_deepseek_api_async(payload, clarifications is not None)
+            with metrics.span("parse", **labels):
+                return self._parse_response(response)
+
+        except CircuitOpenError:
+            return self._degraded_result(raw_prompt, prompt_style, target_ai, clarifications)
+        except Exception as e:
+            logger.error(f"Optimization failed: {str(e)}")
+            return self._optimization_error(e)
+
+    async def _get_clarifying_questions_async(self, raw_prompt: str, target_ai: str) -> Dict:
+        """Async equivalent of PromptOptimizer._get_clarifying_questions"""
+        try:
+            payload = self._build_questions_payload(raw_prompt, target_ai)
+            with metrics.span("questions", model=payload["model"], prompt_style="DETAIL", target_ai=target_ai):
+                response = await self._call_deepseek_api_async(payload, False)
+            return self._questions_result(response, raw_prompt, target_ai, payload)
+
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get clarifying questions: {str(e)}")
+            return self._questions_fallback()
+
+    async def _call_deepseek_api_async(self, payload: Dict, is_clarification_stage: bool = False,
+                                       timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                                       probe: bool = False) -> Dict:
+        """Async equivalent of PromptOptimizer._call_deepseek_api"""
+        if timeout is None:
+            timeout = self.config.UPSTREAM_CLARIFICATION_TIMEOUT if is_clarification_stage else self.config.UPSTREAM_TIMEOUT
+
+        model = payload.get("model", "")
+        deadline = current_deadline()
+        # A request whose own budget is already spent raises here, before the circuit sees it
+        budget = deadline.cap(timeout) if deadline else timeout
+
+        async def call():
+            # A hedge takes its own concurrency slot
+            async with self.upstream_semaphore:
+                return await self.backends.call_async(payload, lambda backend, backend_payload: self.async_client.post_json(
+                    backend.url,
+                    backend_payload,
+                    headers=backend.headers,
+                    timeout=timeout,
+                    max_retries=max_retries,
+                    deadline=deadline,
+                    retry_statuses=self.backends.retry_statuses(model)
+                ))
+
+        circuit = self.circuit if not probe else None
+        if circuit:
+            circuit.before_call()
+
+        start = time.perf_counter()
+        try:
+            if self.hedge_policy and not probe:
+                response, _ = await hedged_call_async(self.hedge_policy, model, call, timeout=budget)
+            else:
+                response = await call()
+        except DeadlineExceeded:
+            # Judged by the slow-call threshold only, as in _call_deepseek_api
+            if circuit:
+                circuit.record(time.perf_counter() - start, failed=False)
+            if not probe:
+                metrics.record_upstream(model, None, success=False)
+            raise
+        except Exception as e:
+            if circuit:
+                circuit.record(time.perf_counter() - start, failed=True)
+            # A probe's outcome is recorded by HealthMonitor.probe_now alone
+            if not probe:
+                self.health_monitor.record_failure(str(e))
+                metrics.record_upstream(model, None, success=False)
+            raise
+        except BaseException:
+            # Cancelled (a lost hedge, a disconnected client): no outcome to judge the upstream by
+            if circuit:
+                circuit.release()
+            raise
+
+        if probe:
+            return response
+        elapsed = time.perf_counter() - start
+        if circuit:
+            circuit.record(elapsed, failed=False)
+        if self.hedge_policy:
+            self.hedge_policy.record(model, elapsed)
+        self.health_monitor.record_success()
+        metrics.record_upstream(model, response.get("usage"))
+        return response
+
+    async def health_check_async(self) -> Dict:
+        """Async equivalent of PromptOptimizer.health_check"""
+        try:
+            payload = {
+                "model": self.config.DEFAULT_MODEL,
+                "messages": [{"role": "user", "content": "Test"}],
+                "max_tokens": 10
+            }
+
+            await self._call_deepseek_api_async(payload, timeout=self.config.HEALTH_CHECK_TIMEOUT, max_retries=0,
+                                                probe=True)
+            return {"status": "healthy", "api_accessible": True}
+
+        except Exception as e:
+            return {"status": "unhealthy", "error": str(e), "api_accessible": False}
+
+    async def aclose(self):
+        await self.async_client.close()
@@ -0,0 +1,291 @@
+"""
+Upstream Backend Pool
+Spreads upstream calls over several OpenAI-compatible endpoints (URL, API key
+and model names), preferring the least loaded and fastest one
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+from upstream import RETRYABLE_STATUS_CODES, UpstreamError, is_backend_failure
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class Backend:
+    """
+    One upstream endpoint
+
+    `models` maps the model names the optimizer uses (deepseek-chat,
+    deepseek-reasoner) to the names this backend expects; a backend without
+    a mapping serves every model under its own name.
+    """
+
+    def __init__(self, name: str, url: str, api_key: str, models: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.url = url
+        self.api_key = api_key
+        self.models = models
+        self.outstanding = 0
+        self.latency: Dict[str, float] = {}  # model -> EWMA of call latency, failures penalized
+        self.ejected_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.ejections = 0
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def payload_for(self, payload: Dict) -> Dict:
+        """The payload with the model renamed for this backend"""
+        model = payload.get("model", "")
+        if not self.models or self.models[model] == model:
+            return payload
+        return dict(payload, model=self.models[model])
+
+    @property
+    def headers(self) -> Dict:
+        # Local stand-ins often take no key at all
+        if not self.api_key:
+            return {"Content-Type": "application/json"}
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+
+def load_backends(spec: str, default_url: str, default_key: Optional[str]) -> List[Backend]:
+    """
+    Parse UPSTREAM_BACKENDS, a JSON list of {"url", "api_key", "models", "name"}
+    objects; "api_key" defaults to DEEPSEEK_API_KEY. An empty spec is the single
+    DEEPSEEK_API_URL backend.
+    """
+    if not spec.strip():
+        return [Backend("default", default_url, default_key)]
+
+    try:
+        entries = json.loads(spec)
+    except ValueError as e:
+        raise ValueError(f"UPSTREAM_BACKENDS is not valid JSON: {e}")
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("UPSTREAM_BACKENDS must be a non-empty JSON list")
+
+    backends = []
+    for number, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get("url"):
+            raise ValueError(f"UPSTREAM_BACKENDS[{number}] must be an object with a url")
+        api_key = entry.get("api_key", default_key)
+        if api_key is None:
+            raise ValueError(f"UPSTREAM_BACKENDS[{number}] has no api_key and DEEPSEEK_API_KEY is not set")
+        models = entry.get("models")
+        if models is not None and not (isinstance(models, dict) and
+                                       all(isinstance(v, str) for v in models.values())):
+            raise ValueError(f"UPSTREAM_BACKENDS[{number}].models must map model names to backend model names")
+        backends.append(Backend(entry.get("name") or f"backend-{number}", entry["url"], api_key, models))
+
+    names = [backend.name for backend in backends]
+    if len(set(names)) != len(names):
+        raise ValueError("UPSTREAM_BACKENDS names must be unique")
+    return backends
+
+
+class BackendPool:
+    """
+    Picks a backend per upstream call: the one with the lowest
+    (outstanding calls + 1) x EWMA latency for the model, among those not
+    ejected. A failed call folds `failure_penalty` x its latency (or the
+    current average, if that is higher) into the EWMA. A 429 ejects a
+    backend for its Retry-After, and a 5xx, connection error or timeout for
+    `eject_seconds`; the call then moves on to the next backend. A backend
+    that is the only one left for a model is never skipped, so a single
+    backend keeps the client's usual retry-with-backoff behaviour.
+    """
+
+    def __init__(self, backends: List[Backend], ewma_alpha: float = 0.3, eject_seconds: float = 30,
+                 failure_penalty: float = 2.0):
+        self.backends = backends
+        self.ewma_alpha = ewma_alpha
+        self.eject_seconds = eject_seconds
+        self.failure_penalty = failure_penalty
+        self._lock = threading.Lock()
+
+    def _candidates(self, model: str) -> List[Backend]:
+        candidates = [backend for backend in self.backends if backend.serves(model)]
+        if not candidates:
+            raise UpstreamError(400, f"No upstream backend is configured for model {model}")
+        return candidates
+
+    def retry_statuses(self, model: str) -> set:
+        """Statuses the client should retry on the same backend"""
+        # With somewhere else to go, a 429 or 5xx is handled by moving on rather than waiting
+        if len(self._candidates(model)) > 1:
+            return set()
+        return RETRYABLE_STATUS_CODES
+
+    def acquire(self, model: str, exclude: List[Backend] = ()) -> Backend:
+        """Choose a backend for one call and count it as outstanding"""
+        candidates = [backend for backend in self._candidates(model) if backend not in exclude]
+        now = time.time()
+        with self._lock:
+            available = [backend for backend in candidates if backend.ejected_until <= now]
+            if available:
+                known = [backend.latency[model] for backend in available if model in backend.latency]
+                # A backend without samples yet is scored at the average, so it gets tried
+                default = sum(known) / len(known) if known else 1.0
+                backend = min(available, key=lambda b: (b.outstanding + 1) * b.latency.get(model, default))
+            else:
+                # Everything is ejected; the one that comes back first is the best bet
+                backend = min(candidates, key=lambda b: b.ejected_until)
+            backend.outstanding += 1
+            backend.calls += 1
+        return backend
+
+    def release(self, backend: Backend, model: str, seconds: Optional[float], error: Optional[Exception] = None):
+        """Record the outcome of a call made on an acquired backend (seconds=None: latency unknown)"""
+        with self._lock:
+            backend.outstanding -= 1
+            if error is not None:
+                backend.failures += 1
+            if seconds is not None:
+                previous = backend.latency.get(model)
+                if error is not None:
+                    # A fast error must not make the backend look fast
+                    seconds = self.failure_penalty * max(seconds, previous or 0.0)
+                backend.latency[model] = seconds if previous is None else (
+                    self.ewma_alpha * seconds + (1 - self.ewma_alpha) * previous)
+            if error is None or not is_backend_failure(error):
+                return
+            if isinstance(error, UpstreamError) and error.status_code == 429:
+                backend.rate_limited += 1
+                self._eject(backend, error.retry_after, "rate limited")
+            else:
+                self._eject(backend, None, f"failing ({error})")
+
+    def _eject(self, backend: Backend, retry_after: Optional[str], reason: str):
+        try:
+            seconds = float(retry_after) if retry_after else self.eject_seconds
+        except ValueError:
+            seconds = self.eject_seconds
+        backend.ejected_until = time.time() + seconds
+        backend.ejections += 1
+        logger.warning("Upstream backend %s %s; ejected for %gs", backend.name, reason, seconds)
+
+    def _should_fail_over(self, error: Exception, model: str, tried: List[Backend]) -> bool:
+        if not is_backend_failure(error):
+            return False
+        return any(backend not in tried for backend in self._candidates(model))
+
+    def call(self, payload: Dict, fn: Callable[[Backend, Dict], Dict]) -> Dict:
+        """Run fn(backend, payload) on a chosen backend, failing over on 429, 5xx, connection errors and timeouts"""
+        model = payload.get("model", "")
+        tried = []
+        while True:
+            backend = self.acquire(model, tried)
+            start = time.perf_counter()
+            outcome = None  # (seconds, error) once the call has finished
+            try:
+                response = fn(backend, backend.payload_for(payload))
+                outcome = (time.perf_counter() - start, None)
+                return response
+            except Exception as e:
+                outcome = (time.perf_counter() - start, e)
+                tried.append(backend)
+                if self._should_fail_over(e, model, tried):
+                    continue
+                raise
+            finally:
+                # A cancelled call (a lost hedge) has no outcome but must stop counting as outstanding
+                self.release(backend, model, *(outcome or (None, None)))
+
+    async def call_async(self, payload: Dict, fn: Callable[[Backend, Dict], Awaitable[Dict]]) -> Dict:
+        """Async equivalent of call"""
+        model = payload.get("model", "")
+        tried = []
+        while True:
+            backend = self.acquire(model, tried)
+            start = time.perf_counter()
+            outcome = None  # (seconds, error) once the call has finished
+            try:
+                response = await fn(backend, backend.payload_for(payload))
+                outcome = (time.perf_counter() - start, None)
+                return response
+            except Exception as e:
+                outcome = (time.perf_counter() - start, e)
+                tried.append(backend)
+                if self._should_fail_over(e, model, tried):
+                    continue
+                raise
+            finally:
+                # A cancelled call (a lost hedge) has no outcome but must stop counting as outstanding
+                self.release(backend, model, *(outcome or (None, None)))
+
+    def stream(self, payload: Dict, fn: Callable[[Backend, Dict], Iterator[Dict]]) -> Iterator[Dict]:
+        """
+        Yield from fn(backend, payload) on a chosen backend; a backend failure
+        fails over only before the first event. Latency is recorded as time to first event.
+        """
+        model = payload.get("model", "")
+        tried = []
+        while True:
+            backend = self.acquire(model, tried)
+            start = time.perf_counter()
+            first_event_seconds = None
+            outcome = None
+            try:
+                for event in fn(backend, backend.payload_for(payload)):
+                    if first_event_seconds is None:
+                        first_event_seconds = time.perf_counter() - start
+                    yield event
+                outcome = (first_event_seconds or time.perf_counter() - start, None)
+            except Exception as e:
+                outcome = (time.perf_counter() - start, e)
+                tried.append(backend)
+                if first_event_seconds is None and self._should_fail_over(e, model, tried):
+                    continue
+                raise
+            finally:
+                # The consumer stopped reading (GeneratorExit); the latency is only known if an event arrived
+                self.release(backend, model, *(outcome or (first_event_seconds, None)))
+            return
+
+    def stats(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            return {
+                backend.name: {
+                    "outstanding": backend.outstanding,
+                    "calls": backend.calls,
+                    "failures": backend.failures,
+                    "rate_limited": backend.rate_limited,
+                    "ejections": backend.ejections,
+                    "ejected": backend.ejected_until > now,
+                    "latency_ewma": {model: round(seconds, 4) for model, seconds in backend.latency.items()}
+                }
+                for backend in self.backends
+            }
+
+    def collect_metrics(self):
+        """Scrape-time gauges for /metrics (see metrics.MetricsRegistry.register_collector)"""
+        for name, backend_stats in self.stats().items():
+            labels = {"backend": name}
+            yield ("prompt_optimizer_backend_outstanding", "gauge", "Upstream calls in flight per backend", labels,
+                   backend_stats["outstanding"])
+            yield ("prompt_optimizer_backend_ejected", "gauge", "1 while a backend is ejected after a 429, 5xx or connection failure", labels,
+                   int(backend_stats["ejected"]))
+            yield ("prompt_optimizer_backend_calls_total", "counter", "Upstream calls per backend", labels,
+                   backend_stats["calls"])
+            yield ("prompt_optimizer_backend_failures_total", "counter", "Failed upstream calls per backend", labels,
+                   backend_stats["failures"])
+            yield ("prompt_optimizer_backend_rate_limited_total", "counter", "429 responses per backend", labels,
+                   backend_stats["rate_limited"])
+            yield ("prompt_optimizer_backend_ejections_total", "counter", "Times a backend was ejected", labels,
+                   backend_stats["ejections"])
+            for model, seconds in backend_stats["latency_ewma"].items():
+                yield ("prompt_optimizer_backend_latency_ewma_seconds", "gauge",
+                       "Moving average of call latency per backend and model, failures penalized",
+                       dict(labels, model=model), seconds)
@@ -0,0 +1,273 @@
+"""
+Bulk Prompt Optimization
+Streams JSONL prompts through PromptOptimizer with bounded parallelism
+
+Each input line is a JSON object with the same fields as POST /optimize
+(raw_prompt, prompt_style, target_ai, optional clarifications/no_cache and
+an optional caller-supplied "id"). Each output line is tagged with the
+zero-based input "index":
+
+    {"index": 0, "id": "...", "result": {...}}
+    {"index": 1, "id": "...", "error": "raw_prompt cannot be empty"}
+
+Usage:
+    python batch.py prompts.jsonl -o results.jsonl --concurrency 8 --resume
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, Optional
+
+from config import Config
+from deadline import start_deadline
+from validation import validate_optimize_payload
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def parse_batch_line(line: str, defaults: Optional[Dict] = None) -> Dict:
+    """Decode one JSONL line, filling in default style/target when absent"""
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Each line must be a JSON object")
+    for field, value in (defaults or {}).items():
+        record.setdefault(field, value)
+    return record
+
+
+def _process_record(optimizer, index: int, line: str, defaults: Optional[Dict],
+                    deadline_seconds: Optional[float] = None, expires_at: Optional[float] = None) -> Dict:
+    output = {"index": index}
+    try:
+        record = parse_batch_line(line, defaults)
+    except ValueError as e:
+        output["error"] = f"Invalid JSON line: {e}"
+        return output
+
+    # Each item gets its own deadline, cut short by the batch's when there is one
+    if expires_at is not None:
+        left = expires_at - time.monotonic()
+        if left <= 0:
+            output["error"] = "Batch deadline exceeded before this item started"
+            return output
+        deadline_seconds = min(deadline_seconds or left, left)
+    start_deadline(deadline_seconds)
+
+    if "id" in record:
+        output["id"] = record["id"]
+
+    try:
+        # Inside the try so one malformed record fails its own line, never the batch
+        params, error_message = validate_optimize_payload(record)
+        if error_message:
+            output["error"] = error_message
+            return output
+
+        result = optimizer.optimize_prompt(
+            params["raw_prompt"],
+            params["prompt_style"],
+            params["target_ai"],
+            params["clarifications"],
+            use_cache=params["use_cache"],
+            routing=params["routing"],
+            session_id=params["session_id"]
+        )
+    except Exception as e:
+        logger.error(f"Batch item {index} failed: {str(e)}")
+        output["error"] = str(e)
+        return output
+
+    # Internal to the HTTP handlers (the X-Cache header); not part of a result line
+    result.pop("cache_status", None)
+    output["result"] = result
+    return output
+
+
+def iter_batch(optimizer, lines: Iterable[str], concurrency: int = 4, ordered: bool = True,
+               start_index: int = 0, defaults: Optional[Dict] = None,
+               deadline_seconds: Optional[float] = None, expires_at: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Optimize a stream of JSONL lines, yielding one tagged output per input line
+
+    At most 2 * concurrency lines are buffered at any time, so memory use does
+    not depend on the input size. Blank lines are skipped but still consume
+    an index so output indices always match input line numbers.
+
+    Args:
+        optimizer: A PromptOptimizer instance
+        lines: Iterable of JSONL lines (e.g. an open file)
+        concurrency: Number of optimizations to run in parallel
+        ordered: Yield results in input order; otherwise as they complete
+        start_index: Index of the first line (used when resuming)
+        defaults: Field values for records that omit them
+        deadline_seconds: Time budget of each item's upstream calls
+        expires_at: time.monotonic() value by which the whole batch must be
+            done; items still queued then fail with a deadline error
+    """
+    concurrency = max(1, concurrency)
+    window = concurrency * 2
+    pending = deque() if ordered else set()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        for index, line in enumerate(lines, start=start_index):
+            if not line.strip():
+                continue
+
+            future = executor.submit(_process_record, optimizer, index, line, defaults, deadline_seconds, expires_at)
+            if ordered:
+                pending.append(future)
+                while len(pending) >= window:
+                    yield pending.popleft().result()
+            else:
+                pending.add(future)
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for finished in done:
+                        pending.remove(finished)
+                        yield finished.result()
+
+        if ordered:
+            while pending:
+                yield pending.popleft().result()
+        else:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for finished in done:
+                    pending.remove(finished)
+                    yield finished.result()
+
+
+def _read_checkpoint(path: str) -> Dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"next_index": 0, "output_offset": 0}
+
+
+def _write_checkpoint(path: str, next_index: int, output_offset: int):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"next_index": next_index, "output_offset": output_offset}, f)
+    os.replace(tmp_path, path)
+
+
+def run_batch_file(optimizer, input_path: str, output_path: Optional[str], concurrency: int = 4,
+                   ordered: bool = True, resume: bool = False, checkpoint_every: int = 50,
+                   defaults: Optional[Dict] = None) -> Dict:
+    """
+    Run a JSONL file through the optimizer, checkpointing progress
+
+    The checkpoint records how many input lines are fully written and the
+    output file size at that point. On resume the output is truncated back to
+    that size and the input is skipped up to that line, so a crash never
+    produces duplicate or missing results. Resume requires ordered output.
+
+    Returns:
+        Summary counts
+    """
+    if resume and (not output_path or not ordered):
+        raise ValueError("--resume requires an output file and ordered output")
+
+    checkpoint_path = f"{output_path}.checkpoint" if output_path else None
+    start_index = 0
+    output_offset = 0
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint = _read_checkpoint(checkpoint_path)
+        start_index = checkpoint["next_index"]
+        output_offset = checkpoint["output_offset"]
+        logger.info(f"Resuming batch from line {start_index}")
+
+    in_file = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+    if output_path:
+        out_file = open(output_path, "r+" if output_offset else "w", encoding="utf-8")
+        out_file.seek(output_offset)
+        out_file.truncate()
+    else:
+        out_file = sys.stdout
+
+    summary = {"processed": 0, "succeeded": 0, "failed": 0, "start_index": start_index}
+    try:
+        # Skip lines already written before the last checkpoint
+        for _ in range(start_index):
+            if not in_file.readline():
+                break
+
+        for item in iter_batch(optimizer, in_file, concurrency, ordered, start_index, defaults,
+                               deadline_seconds=Config.REQUEST_DEADLINE_SECONDS):
+            out_file.write(json.dumps(item, ensure_ascii=False) + "\n")
+            summary["processed"] += 1
+            if item.get("error") or (item.get("result") or {}).get("error"):
+                summary["failed"] += 1
+            else:
+                summary["succeeded"] += 1
+
+            if checkpoint_path and ordered and summary["processed"] % checkpoint_every == 0:
+                out_file.flush()
+                os.fsync(out_file.fileno())
+                _write_checkpoint(checkpoint_path, item["index"] + 1, out_file.tell())
+
+        out_file.flush()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    finally:
+        if in_file is not sys.stdin:
+            in_file.close()
+        if out_file is not sys.stdout:
+            out_file.close()
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimize a JSONL file of prompts")
+    parser.add_argument("input", help="Input JSONL file, or - for stdin")
+    parser.add_argument("-o", "--output", help="Output JSONL file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=Config.BATCH_CONCURRENCY,
+                        help="Parallel optimizations")
+    parser.add_argument("--unordered", action="store_true",
+                        help="Write results as they complete instead of in input order")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue from the last checkpoint of a previous run")
+    parser.add_argument("--checkpoint-every", type=int, default=50,
+                        help="Write a checkpoint after this many results")
+    parser.add_argument("--style", default="BASIC", help="Default prompt_style for lines without one")
+    parser.add_argument("--target", default="ChatGPT", help="Default target_ai for lines without one")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+
+    from optimizer import PromptOptimizer
+    optimizer = PromptOptimizer()
+
+    try:
+        summary = run_batch_file(
+            optimizer,
+            args.input,
+            args.output,
+            concurrency=args.concurrency,
+            ordered=not args.unordered,
+            resume=args.resume,
+            checkpoint_every=args.checkpoint_every,
+            defaults={"prompt_style": args.style, "target_ai": args.target}
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    logger.info(f"Batch finished: {summary}")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
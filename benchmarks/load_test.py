@@ -0,0 +1,280 @@
+"""
+Offline Load Test
+Drives /optimize, /health and /validate against the mock DeepSeek server
+
+By default the Flask app is served in-process on a threaded werkzeug server,
+so RSS growth over the run reflects the backend (plus the load generator).
+Pass --url to target an already running server (e.g. gunicorn or uvicorn
+started with DEEPSEEK_API_URL pointing at benchmarks/mock_deepseek.py).
+
+Usage:
+    python benchmarks/load_test.py --profile BASIC --concurrency 16 --requests 300
+    python benchmarks/load_test.py --profile DETAIL --output benchmarks/results/detail.json \
+        --compare benchmarks/results/detail-baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from mock_deepseek import MockDeepSeekServer, add_mock_arguments, settings_from_args  # noqa: E402
+
+PROMPT_TEMPLATE = "Explain topic number {n} to a junior developer and include an example of how it is used."
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        # ru_maxrss is KiB on Linux, bytes on macOS; this is the peak, not current
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class Recorder:
+    """Thread-safe latency samples per endpoint label"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, label: str, seconds: float, ok: bool):
+        with self._lock:
+            self.samples.setdefault(label, []).append(seconds)
+            if not ok:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def summary(self) -> dict:
+        report = {}
+        with self._lock:
+            for label, values in sorted(self.samples.items()):
+                ordered = sorted(values)
+                report[label] = {
+                    "count": len(ordered),
+                    "errors": self.errors.get(label, 0),
+                    "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                    "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                    "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                    "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                    "max_ms": round(ordered[-1] * 1000, 2)
+                }
+        return report
+
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def _timed(recorder: Recorder, label: str, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = _session().request(method, url, timeout=120, **kwargs)
+        ok = response.status_code == 200
+        body = response.json() if ok else None
+    except requests.RequestException:
+        ok, body = False, None
+    recorder.record(label, time.perf_counter() - start, ok)
+    return body
+
+
+def run_iteration(base_url: str, profile: str, n: int, recorder: Recorder, health_every: int,
+                  use_sessions: bool = True):
+    """One simulated user flow"""
+    prompt = PROMPT_TEMPLATE.format(n=n)
+    _timed(recorder, "validate", "POST", f"{base_url}/validate", json={"raw_prompt": prompt})
+
+    if profile == "DETAIL":
+        body = {"raw_prompt": prompt, "prompt_style": "DETAIL", "target_ai": "Claude"}
+        questions = _timed(recorder, "optimize_detail_questions", "POST", f"{base_url}/optimize", json=body)
+        body["clarifications"] = "Goal: onboarding docs. Audience: new hires. Format: markdown, under 400 words."
+        if use_sessions and questions and questions.get("session_id"):
+            body["session_id"] = questions["session_id"]
+        _timed(recorder, "optimize_detail_final", "POST", f"{base_url}/optimize", json=body)
+    else:
+        body = {"raw_prompt": prompt, "prompt_style": "BASIC", "target_ai": "ChatGPT"}
+        _timed(recorder, "optimize_basic", "POST", f"{base_url}/optimize", json=body)
+
+    if health_every and n % health_every == 0:
+        _timed(recorder, "health", "GET", f"{base_url}/health")
+
+
+def start_local_app(mock_url: str):
+    """Import app.py with benchmark-friendly settings and serve it on a free port"""
+    os.environ["DEEPSEEK_API_URL"] = mock_url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+    os.environ["REQUESTS_PER_MINUTE"] = str(10 ** 9)
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["FLASK_ENV"] = "production"
+
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def compare(current: dict, baseline: dict):
+    """Print per-endpoint latency and throughput deltas against a saved run"""
+    def delta(new, old):
+        if not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\nComparison against {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    print(f"  throughput: {current['throughput_rps']:.2f} rps "
+          f"({delta(current['throughput_rps'], baseline.get('throughput_rps'))})")
+    if "upstream_prompt_cache" in baseline:
+        print(f"  prompt cache hit ratio: {current['upstream_prompt_cache']['hit_ratio']:.2%} "
+              f"(was {baseline['upstream_prompt_cache']['hit_ratio']:.2%})")
+    for label, stats in current["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(label)
+        if not old:
+            continue
+        print(f"  {label:28s} p50 {delta(stats['p50_ms'], old['p50_ms']):>8s}  "
+              f"p95 {delta(stats['p95_ms'], old['p95_ms']):>8s}  p99 {delta(stats['p99_ms'], old['p99_ms']):>8s}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Prompt Optimizer against a mock DeepSeek API")
+    parser.add_argument("--profile", choices=["BASIC", "DETAIL"], default="BASIC")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=200, help="Number of user flows to run")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed flows before measuring")
+    parser.add_argument("--health-every", type=int, default=10, help="Hit /health every N flows (0 to disable)")
+    parser.add_argument("--url", help="Target an already running server instead of an in-process app")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--no-sessions", action="store_true",
+                        help="DETAIL: don't send the stage-one session_id with the answers")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    mock = MockDeepSeekServer(settings_from_args(args)).start()
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, base_url = start_local_app(mock.url)
+
+    try:
+        warmup = Recorder()
+        for n in range(args.warmup):
+            run_iteration(base_url, args.profile, -1 - n, warmup, 0, not args.no_sessions)
+
+        recorder = Recorder()
+        rss_start = rss_mb()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [
+                executor.submit(run_iteration, base_url, args.profile, n, recorder, args.health_every,
+                                not args.no_sessions)
+                for n in range(args.requests)
+            ]
+            for future in futures:
+                future.result()
+        duration = time.perf_counter() - start
+        rss_end = rss_mb()
+    finally:
+        if server:
+            server.shutdown()
+        mock.stop()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "profile": args.profile,
+            "sessions": not args.no_sessions,
+            "concurrency": args.concurrency,
+            "flows": args.requests,
+            "target": args.url or "in-process",
+            "mock": {
+                "latency": args.latency,
+                "latency_ms": args.latency_ms,
+                "jitter_ms": args.jitter_ms,
+                "reasoner_multiplier": args.reasoner_multiplier,
+                "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate
+            }
+        },
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(args.requests / duration, 3),
+        "upstream_requests": mock.settings.requests,
+        "upstream_prompt_cache": {
+            "hit_tokens": mock.settings.prefix_cache.hit_tokens,
+            "miss_tokens": mock.settings.prefix_cache.miss_tokens,
+            "hit_ratio": round(mock.settings.prefix_cache.hit_tokens / max(
+                1, mock.settings.prefix_cache.hit_tokens + mock.settings.prefix_cache.miss_tokens), 4)
+        },
+        "endpoints": recorder.summary(),
+        "memory": {
+            "rss_start_mb": round(rss_start, 2),
+            "rss_end_mb": round(rss_end, 2),
+            "rss_growth_mb": round(rss_end - rss_start, 2)
+        }
+    }
+
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Mock DeepSeek Server
+Local stand-in for POST /v1/chat/completions used by the load-testing benchmarks
+
+Latency is sampled per request from a configurable distribution, a fraction
+of requests can fail with 429/500, and "stream": true requests are answered
+as Server-Sent Events with a per-chunk delay. Usage blocks report prompt
+cache hit/miss tokens from a simulated prefix cache, and uncached prompt
+tokens can add prefill latency.
+
+Usage:
+    python benchmarks/mock_deepseek.py --port 9000 --latency lognormal --latency-ms 800 --error-rate 0.01
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPTIMIZED_RESPONSE = """**Your Optimized Prompt:**
+You are an experienced technical writer. Write a concise, well-structured explanation of the topic below for an audience of junior developers. Use short paragraphs, one code example, and end with a three-item checklist.
+
+**Key Improvements:**
+• Assigned a clear expert role
+• Specified audience and output format
+• Added structure and a concrete deliverable
+
+**Techniques Applied:** Role assignment, output specification, constraint optimization
+
+**Pro Tip:** Paste the topic directly after the prompt and ask for a revision if the tone is off."""
+
+OPTIMIZED_JSON = {
+    "optimized_prompt": "You are an experienced technical writer. Write a concise, well-structured explanation "
+                        "of the topic below for an audience of junior developers. Use short paragraphs, one code "
+                        "example, and end with a three-item checklist.",
+    "improvements": ["Assigned a clear expert role", "Specified audience and output format",
+                     "Added structure and a concrete deliverable"],
+    "techniques_applied": ["Role assignment", "Output specification", "Constraint optimization"],
+    "pro_tip": "Paste the topic directly after the prompt and ask for a revision if the tone is off."
+}
+
+QUESTIONS_RESPONSE = """Analysis: The prompt states a topic but not the goal, audience or format.
+
+Questions:
+1. What is the main goal of the response?
+2. Who is the intended audience?
+3. What format and length do you expect?"""
+
+
+class MockSettings:
+    """Behaviour shared by all handler threads"""
+
+    def __init__(self, latency: str = "fixed", latency_ms: float = 500, jitter_ms: float = 100,
+                 reasoner_multiplier: float = 3.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, chunk_chars: int = 8, chunk_delay_ms: float = 5,
+                 prefill_ms_per_1k: float = 0.0):
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.reasoner_multiplier = reasoner_multiplier
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_chars = chunk_chars
+        self.chunk_delay_ms = chunk_delay_ms
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.requests = 0
+        self.prefix_cache = PrefixCache()
+        self._lock = threading.Lock()
+
+    def sample_latency(self, model: str) -> float:
+        """Latency in seconds for one request"""
+        mean = self.latency_ms
+        if model == "deepseek-reasoner":
+            mean *= self.reasoner_multiplier
+
+        if self.latency == "uniform":
+            value = random.uniform(max(0, mean - self.jitter_ms), mean + self.jitter_ms)
+        elif self.latency == "normal":
+            value = random.gauss(mean, self.jitter_ms)
+        elif self.latency == "lognormal":
+            # Heavy right tail, like real completions; jitter_ms sets the spread
+            sigma = max(0.01, self.jitter_ms / max(mean, 1))
+            value = random.lognormvariate(math.log(max(mean, 1)) - sigma ** 2 / 2, sigma)
+        else:
+            value = mean
+        return max(0.0, value) / 1000.0
+
+    def count(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+
+class PrefixCache:
+    """
+    Simulates DeepSeek context caching: the request is split into fixed-size
+    units, and the leading units already seen (per model) count as cache hits.
+    Tokens are estimated at 4 characters each.
+    """
+
+    UNIT_CHARS = 256  # ~64 tokens, the upstream cache granularity
+    MAX_UNITS = 200000
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.hit_tokens = 0
+        self.miss_tokens = 0
+
+    def lookup(self, model: str, messages) -> tuple:
+        """Return (hit_tokens, miss_tokens) for one request and remember its prefix units"""
+        text = "".join(f"{m.get('role', '')}\x00{m.get('content', '')}\x00" for m in messages)
+        digest = hashlib.sha1(model.encode("utf-8"))
+        keys = []
+        for start in range(0, len(text) - self.UNIT_CHARS + 1, self.UNIT_CHARS):
+            digest.update(text[start:start + self.UNIT_CHARS].encode("utf-8"))
+            keys.append(digest.hexdigest())
+
+        with self._lock:
+            cached_units = 0
+            for key in keys:
+                if key not in self._seen:
+                    break
+                cached_units += 1
+            if len(self._seen) + len(keys) > self.MAX_UNITS:
+                self._seen.clear()
+            self._seen.update(keys)
+
+            hit = cached_units * self.UNIT_CHARS // 4
+            miss = len(text) // 4 - hit
+            self.hit_tokens += hit
+            self.miss_tokens += miss
+        return hit, miss
+
+
+def _usage(hit: int, miss: int, completion: str) -> dict:
+    completion_tokens = len(completion) // 4
+    return {
+        "prompt_tokens": hit + miss,
+        "completion_tokens": completion_tokens,
+        "total_tokens": hit + miss + completion_tokens,
+        "prompt_cache_hit_tokens": hit,
+        "prompt_cache_miss_tokens": miss
+    }
+
+
+def make_handler(settings: MockSettings):
+    class MockDeepSeekHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict, headers: dict = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_POST(self):
+            settings.count()
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"message": "Invalid JSON"}})
+                return
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "Not found"}})
+                return
+
+            model = payload.get("model", "deepseek-chat")
+            messages = payload.get("messages", [])
+            hit, miss = settings.prefix_cache.lookup(model, messages)
+            time.sleep(settings.sample_latency(model) + miss * settings.prefill_ms_per_1k / 1e6)
+
+            roll = random.random()
+            if roll < settings.rate_limit_rate:
+                self._send_json(429, {"error": {"message": "Rate limit reached"}}, {"Retry-After": "1"})
+                return
+            if roll < settings.rate_limit_rate + settings.error_rate:
+                self._send_json(500, {"error": {"message": "Mock upstream failure"}})
+                return
+
+            # The optimization methodology also mentions clarifying questions, so key on the stage-one
+            # wording in the latest user turn (a continued DETAIL session carries it in an earlier one)
+            user_turns = [m.get("content", "") for m in messages if m.get("role") == "user"]
+            is_questions = bool(user_turns) and "ask clarifying questions" in user_turns[-1]
+            if is_questions:
+                completion = QUESTIONS_RESPONSE
+            elif payload.get("response_format", {}).get("type") == "json_object":
+                completion = json.dumps(OPTIMIZED_JSON)
+            else:
+                completion = OPTIMIZED_RESPONSE
+            finish_reason = "stop"
+            if payload.get("max_tokens", 0) <= 10:
+                completion = "OK"
+            elif len(completion) > payload.get("max_tokens", 4096) * 4:
+                # Budget too small for the answer: truncate like the real API
+                completion = completion[:payload["max_tokens"] * 4]
+                finish_reason = "length"
+
+            if not payload.get("stream"):
+                self._send_json(200, {
+                    "id": f"mock-{settings.requests}",
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": completion},
+                                 "finish_reason": finish_reason}],
+                    "usage": _usage(hit, miss, completion)
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(completion), settings.chunk_chars):
+                event = {"choices": [{"index": 0, "delta": {"content": completion[start:start + settings.chunk_chars]}}]}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                time.sleep(settings.chunk_delay_ms / 1000.0)
+            final = {"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                     "usage": _usage(hit, miss, completion)}
+            self._write_chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+    return MockDeepSeekHandler
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Large listen backlog so high-concurrency runs measure latency, not refused connections
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients abandon slow requests on deadlines and lost hedges; that is expected
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockDeepSeekServer:
+    """Run the mock in a background thread (for use from other scripts)"""
+
+    def __init__(self, settings: MockSettings, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings
+        self.httpd = _MockHTTPServer((host, port), make_handler(settings))
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-deepseek", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", choices=["fixed", "uniform", "normal", "lognormal"], default="lognormal",
+                        help="Upstream latency distribution")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Mean deepseek-chat latency")
+    parser.add_argument("--jitter-ms", type=float, default=150, help="Spread of the latency distribution")
+    parser.add_argument("--reasoner-multiplier", type=float, default=3.0,
+                        help="Latency multiplier for deepseek-reasoner")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--chunk-chars", type=int, default=8, help="Characters per streamed chunk")
+    parser.add_argument("--chunk-delay-ms", type=float, default=5, help="Delay between streamed chunks")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="Extra latency per 1000 uncached prompt tokens")
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        reasoner_multiplier=args.reasoner_multiplier,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        chunk_chars=args.chunk_chars,
+        chunk_delay_ms=args.chunk_delay_ms,
+        prefill_ms_per_1k=args.prefill_ms_per_1k
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the DeepSeek chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockDeepSeekServer(settings_from_args(args), args.host, args.port)
+    print(f"Mock DeepSeek listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Near-Duplicate Index Benchmark
+Fills similarity.NearDuplicateIndex with synthetic prompts and measures insert
+cost, memory, lookup latency, recall on edited copies of stored prompts and
+false matches on unseen prompts
+
+Edits are the ones users actually make when re-submitting: changed casing,
+changed punctuation and one swapped word.
+
+Usage:
+    python benchmarks/near_duplicate_bench.py
+    python benchmarks/near_duplicate_bench.py --entries 200000 --threshold 0.85 \
+        --output benchmarks/results/near_duplicate.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from similarity import NearDuplicateIndex  # noqa: E402
+from load_test import git_commit, percentile, rss_mb  # noqa: E402
+
+OPENERS = [
+    "Write a", "Explain how", "Create a detailed", "Help me draft a", "Summarize the",
+    "Compare the", "Generate a list of", "Review this", "Design a", "Plan a"
+]
+NAMESPACES = ["BASIC:ChatGPT:initial", "BASIC:Claude:initial", "DETAIL:Gemini:initial", "DETAIL:Other:answered"]
+
+
+def make_vocabulary(rng: random.Random, size: int):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_prompt(rng: random.Random, vocabulary) -> str:
+    words = [rng.choice(vocabulary) for _ in range(rng.randint(15, 60))]
+    return f"{rng.choice(OPENERS)} {' '.join(words)}."
+
+
+def edit_prompt(rng: random.Random, prompt: str, vocabulary, kind: str) -> str:
+    if kind == "casing":
+        return prompt.upper() if rng.random() < 0.5 else prompt.title()
+    if kind == "punctuation":
+        words = prompt.rstrip(".").split()
+        for i in rng.sample(range(len(words)), min(3, len(words))):
+            words[i] += rng.choice([",", ";", " -", "!"])
+        return " ".join(words) + "?"
+    words = prompt.split()
+    words[rng.randrange(1, len(words))] = rng.choice(vocabulary)
+    return " ".join(words)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Insert/lookup cost and accuracy of the near-duplicate index")
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000, help="Queries of each kind")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+    prompts = [(NAMESPACES[i % len(NAMESPACES)], make_prompt(rng, vocabulary)) for i in range(args.entries)]
+
+    index = NearDuplicateIndex(threshold=args.threshold, max_entries=args.entries)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    for i, (namespace, prompt) in enumerate(prompts):
+        index.add(namespace, f"key-{i}", prompt)
+    insert_seconds = time.perf_counter() - start
+    index_mb = rss_mb() - rss_before
+
+    report = {
+        "commit": git_commit(),
+        "entries": args.entries,
+        "threshold": args.threshold,
+        "insert_us": round(insert_seconds / args.entries * 1e6, 1),
+        "index_mb": round(index_mb, 1),
+        "queries": {}
+    }
+
+    for kind in ("casing", "punctuation", "swap", "unseen"):
+        latencies, matched, correct = [], 0, 0
+        for _ in range(args.queries):
+            if kind == "unseen":
+                target, namespace, prompt = None, rng.choice(NAMESPACES), make_prompt(rng, vocabulary)
+            else:
+                target = rng.randrange(args.entries)
+                namespace, original = prompts[target]
+                prompt = edit_prompt(rng, original, vocabulary, kind)
+            start = time.perf_counter()
+            match = index.query(namespace, prompt)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            if match is not None:
+                matched += 1
+                correct += match[0] == f"key-{target}"
+        latencies.sort()
+        report["queries"][kind] = {
+            "match_rate": round(matched / args.queries, 4),
+            "correct_rate": round(correct / args.queries, 4),
+            "p50_us": round(percentile(latencies, 50), 1),
+            "p95_us": round(percentile(latencies, 95), 1),
+            "p99_us": round(percentile(latencies, 99), 1)
+        }
+
+    print(f"{args.entries} entries: {report['insert_us']} us/insert, index RSS {report['index_mb']} MiB")
+    for kind, stats in report["queries"].items():
+        print(f"  {kind:11s} matched {stats['match_rate']:.1%} (correct {stats['correct_rate']:.1%})  "
+              f"p50 {stats['p50_us']} us  p95 {stats['p95_us']} us  p99 {stats['p99_us']} us")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Parser Benchmark
+Checks parsing.parse_completion against a labelled corpus and times it
+against the legacy find()-based _extract_components
+
+Each corpus line is {"name", "content", "expected", "parser"}; only the
+fields present in "expected" are compared.
+
+Usage:
+    python benchmarks/parser_bench.py
+    python benchmarks/parser_bench.py --iterations 20000 --output benchmarks/results/parser.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from parsing import parse_completion  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(BENCHMARK_DIR, "parser_corpus.jsonl")
+
+
+def legacy_extract_components(content: str) -> dict:
+    """The pre-parsing.py implementation, kept verbatim for comparison"""
+    components = {}
+
+    if "**Your Optimized Prompt:**" in content:
+        start = content.find("**Your Optimized Prompt:**") + len("**Your Optimized Prompt:**")
+        end = content.find("**", start)
+        if end == -1:
+            end = content.find("\n\n", start)
+        if end != -1:
+            components["optimized_prompt"] = content[start:end].strip()
+
+    improvements = []
+    if "**What Changed:**" in content:
+        start = content.find("**What Changed:**") + len("**What Changed:**")
+        end = content.find("**", start)
+        if end != -1:
+            improvements.append(content[start:end].strip())
+    elif "**Key Improvements:**" in content:
+        start = content.find("**Key Improvements:**") + len("**Key Improvements:**")
+        end = content.find("**", start)
+        if end != -1:
+            improvements_text = content[start:end].strip()
+            improvements = [imp.strip("• ").strip() for imp in improvements_text.split("•") if imp.strip()]
+
+    components["improvements"] = improvements
+
+    if "**Techniques Applied:**" in content:
+        start = content.find("**Techniques Applied:**") + len("**Techniques Applied:**")
+        end = content.find("**", start)
+        if end == -1:
+            end = len(content)
+        if end != -1:
+            techniques_text = content[start:end].strip()
+            components["techniques_applied"] = [techniques_text] if techniques_text else []
+
+    if "**Pro Tip:**" in content:
+        start = content.find("**Pro Tip:**") + len("**Pro Tip:**")
+        components["pro_tip"] = content[start:].strip()
+
+    return components
+
+
+def load_corpus(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def mismatches(components: dict, expected: dict):
+    return [field for field, value in expected.items() if components.get(field) != value]
+
+
+def time_parser(fn, contents, iterations: int) -> float:
+    """Mean microseconds per parse over the whole corpus"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for content in contents:
+            fn(content)
+    return (time.perf_counter() - start) / (iterations * len(contents)) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Correctness and speed of the optimization response parsers")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=5000, help="Passes over the corpus when timing")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    report = {"cases": len(corpus), "new": {"failures": []}, "legacy": {"failures": []}}
+
+    for case in corpus:
+        components, used = parse_completion(case["content"])
+        wrong = mismatches(components, case["expected"])
+        if used != case.get("parser", "markdown"):
+            wrong.append(f"parser={used}")
+        if wrong:
+            report["new"]["failures"].append({"case": case["name"], "fields": wrong})
+
+        legacy_wrong = mismatches(legacy_extract_components(case["content"]), case["expected"])
+        if legacy_wrong:
+            report["legacy"]["failures"].append({"case": case["name"], "fields": legacy_wrong})
+
+    contents = [case["content"] for case in corpus]
+    report["new"]["us_per_parse"] = round(time_parser(lambda c: parse_completion(c), contents, args.iterations), 2)
+    report["legacy"]["us_per_parse"] = round(time_parser(legacy_extract_components, contents, args.iterations), 2)
+
+    for name in ("new", "legacy"):
+        stats = report[name]
+        print(f"{name:7s} {len(corpus) - len(stats['failures'])}/{len(corpus)} cases correct, "
+              f"{stats['us_per_parse']:.2f} us/parse")
+        for failure in stats["failures"]:
+            print(f"        - {failure['case']}: {', '.join(failure['fields'])}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if report["new"]["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
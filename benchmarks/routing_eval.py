@@ -0,0 +1,144 @@
+"""
+Routing Evaluation
+Replays a prompt corpus through each model router against the mock DeepSeek
+server and compares upstream latency, token budgets and token usage
+
+Only the optimization stage is routed, so DETAIL records without
+clarifications are skipped. Truncated answers (finish_reason "length")
+are counted as a guard against budgets that are too tight.
+
+Usage:
+    python benchmarks/routing_eval.py
+    python benchmarks/routing_eval.py --corpus prompts.jsonl --routers static,complexity --repeat 3 \
+        --output benchmarks/results/routing.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from load_test import git_commit, percentile  # noqa: E402
+from mock_deepseek import MockDeepSeekServer, add_mock_arguments, settings_from_args  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(BENCHMARK_DIR, "routing_corpus.jsonl")
+
+
+def load_corpus(path: str):
+    records = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("prompt_style", "BASIC").upper() == "DETAIL" and not record.get("clarifications"):
+                continue
+            records.append(record)
+    return records
+
+
+def evaluate(optimizer, router, records, repeat: int) -> dict:
+    """Route and send every record; return latency and token totals"""
+    optimizer.router = router
+    latencies = []
+    models = {}
+    budget = 0
+    prompt_tokens = 0
+    completion_tokens = 0
+    truncated = 0
+
+    for _ in range(repeat):
+        for record in records:
+            payload = optimizer._build_optimization_payload(
+                record["raw_prompt"],
+                record.get("prompt_style", "BASIC").upper(),
+                record.get("target_ai", "ChatGPT"),
+                record.get("clarifications")
+            )
+            start = time.perf_counter()
+            response = optimizer._call_deepseek_api(payload, record.get("clarifications") is not None)
+            latencies.append(time.perf_counter() - start)
+
+            models[payload["model"]] = models.get(payload["model"], 0) + 1
+            budget += payload["max_tokens"]
+            usage = response.get("usage", {})
+            prompt_tokens += usage.get("prompt_tokens", 0)
+            completion_tokens += usage.get("completion_tokens", 0)
+            if response["choices"][0].get("finish_reason") == "length":
+                truncated += 1
+
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "models": models,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "max_tokens_total": budget,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "truncated": truncated
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare model routers on a prompt corpus against the mock DeepSeek API")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL of /optimize request bodies")
+    parser.add_argument("--routers", default="static,complexity",
+                        help="Comma-separated MODEL_ROUTER values; the first is the baseline")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the corpus per router")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    mock = MockDeepSeekServer(settings_from_args(args)).start()
+    os.environ["DEEPSEEK_API_URL"] = mock.url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+    os.environ["CACHE_ENABLED"] = "false"
+
+    from optimizer import PromptOptimizer
+    from routing import get_router
+
+    records = load_corpus(args.corpus)
+    optimizer = PromptOptimizer()
+    results = {}
+    try:
+        for name in args.routers.split(","):
+            results[name] = evaluate(optimizer, get_router(name, optimizer.config), records, args.repeat)
+    finally:
+        mock.stop()
+
+    report = {
+        "meta": {"commit": git_commit(), "corpus": args.corpus, "records": len(records), "repeat": args.repeat,
+                 "mock": {"latency_ms": args.latency_ms, "reasoner_multiplier": args.reasoner_multiplier}},
+        "routers": results
+    }
+    print(json.dumps(report, indent=2))
+
+    names = list(results)
+    baseline = results[names[0]]
+    for name in names[1:]:
+        current = results[name]
+        print(f"\n{name} vs {names[0]}:")
+        for field in ("mean_ms", "p95_ms", "max_tokens_total", "prompt_tokens", "completion_tokens"):
+            old, new = baseline[field], current[field]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {field:18s} {old:>10} -> {new:>10}  ({change})")
+        print(f"  truncated answers  {baseline['truncated']:>10} -> {current['truncated']:>10}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Startup Benchmark
+Cold-starts app.py in fresh processes against the mock DeepSeek API and
+measures process start to bind, and process start to the first /optimize
+response, for each boot mode
+
+Each run spawns a new interpreter, so the numbers include every import.
+--idle-ms leaves a gap between bind and the first request, like a platform
+health check before traffic arrives; that gap is what BOOT_PREWARM uses.
+With --compare, exits non-zero when a mode's median time to first response
+regressed by more than --max-regression against the baseline.
+
+Usage:
+    python benchmarks/startup_bench.py --runs 5 --output benchmarks/results/startup.json
+    python benchmarks/startup_bench.py --compare benchmarks/results/startup.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import requests
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+from load_test import git_commit, percentile  # noqa: E402
+from mock_deepseek import MockDeepSeekServer, MockSettings  # noqa: E402
+
+MODES = {
+    "eager": {"BOOT_MODE": "eager", "BOOT_PREWARM": "false"},
+    "lazy": {"BOOT_MODE": "lazy", "BOOT_PREWARM": "false"},
+    "lazy+prewarm": {"BOOT_MODE": "lazy", "BOOT_PREWARM": "true"}
+}
+
+BOOT_GAUGE_RE = re.compile(r'^prompt_optimizer_boot_seconds\{phase="(\w+)"\} ([0-9.e+-]+)$', re.MULTILINE)
+
+FIRST_REQUEST = {"raw_prompt": "Explain how a hash map handles collisions", "prompt_style": "BASIC", "target_ai": "ChatGPT"}
+
+
+# Run with -c rather than as this module, so the child imports nothing the app itself doesn't
+CHILD_SCRIPT = """
+from werkzeug.serving import make_server
+import app
+server = make_server("127.0.0.1", 0, app.app, threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+"""
+
+
+def cold_start(mode_env: dict, mock_url: str, idle_seconds: float = 0) -> dict:
+    """Spawn one app process and time it up to its first /optimize response"""
+    env = dict(os.environ, **mode_env)
+    env.update({
+        "DEEPSEEK_API_URL": mock_url,
+        "DEEPSEEK_API_KEY": env.get("DEEPSEEK_API_KEY", "benchmark"),
+        "REQUESTS_PER_MINUTE": str(10 ** 9),
+        "CACHE_ENABLED": "false",
+        "FLASK_ENV": "production",
+        # The probe that HealthMonitor.start() fires would compete with the first request
+        "HEALTH_PROBE_INTERVAL": "3600"
+    })
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-c", CHILD_SCRIPT], cwd=REPO_ROOT, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        port = int(child.stdout.readline())
+        bound = time.perf_counter()
+        base_url = f"http://127.0.0.1:{port}"
+        time.sleep(idle_seconds)
+        sent = time.perf_counter()
+        response = requests.post(f"{base_url}/optimize", json=FIRST_REQUEST, timeout=60)
+        first_response = time.perf_counter()
+        response.raise_for_status()
+        phases = {phase: float(value) * 1000
+                  for phase, value in BOOT_GAUGE_RE.findall(requests.get(f"{base_url}/metrics", timeout=10).text)}
+    finally:
+        child.terminate()
+        child.wait(timeout=10)
+    return {
+        "bind_ms": (bound - start) * 1000,
+        "first_response_ms": (first_response - start) * 1000,
+        "first_request_ms": (first_response - sent) * 1000,
+        "phases_ms": phases
+    }
+
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for key in ("bind_ms", "first_response_ms", "first_request_ms"):
+        values = sorted(run[key] for run in runs)
+        summary[key] = {"p50": round(percentile(values, 50), 1), "max": round(values[-1], 1)}
+    phases = sorted({phase for run in runs for phase in run["phases_ms"]})
+    summary["phases_p50_ms"] = {
+        phase: round(percentile(sorted(run["phases_ms"][phase] for run in runs if phase in run["phases_ms"]), 50), 1)
+        for phase in phases
+    }
+    return summary
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> bool:
+    """Print per-mode deltas; returns False when a mode's first response regressed too far"""
+    ok = True
+    print(f"\nComparison against {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for mode, stats in current["modes"].items():
+        old = baseline.get("modes", {}).get(mode)
+        if not old:
+            continue
+        new_ms, old_ms = stats["first_response_ms"]["p50"], old["first_response_ms"]["p50"]
+        change = (new_ms - old_ms) / old_ms if old_ms else 0.0
+        regressed = change > max_regression
+        ok = ok and not regressed
+        print(f"  {mode:14s} first response p50 {new_ms:8.1f} ms (was {old_ms:8.1f}, {change:+.1%})"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Prompt Optimizer cold starts per boot mode")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per mode")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated subset of: " + ", ".join(MODES))
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mock upstream latency")
+    parser.add_argument("--idle-ms", type=float, default=0,
+                        help="Wait between bind and the first request (time a pre-warm can use)")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="With --compare, fail when median time to first response grows by more than this fraction")
+    args = parser.parse_args(argv)
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+
+    mock = MockDeepSeekServer(MockSettings(latency="fixed", latency_ms=args.latency_ms)).start()
+    try:
+        # Discarded run so the first measured one doesn't pay for cold .pyc and page caches
+        cold_start(MODES[modes[0]], mock.url)
+        results_by_mode = {}
+        for mode in modes:
+            runs = [cold_start(MODES[mode], mock.url, args.idle_ms / 1000) for _ in range(args.runs)]
+            results_by_mode[mode] = summarize(runs)
+    finally:
+        mock.stop()
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "runs": args.runs,
+            "mock_latency_ms": args.latency_ms,
+            "idle_ms": args.idle_ms
+        },
+        "modes": results_by_mode
+    }
+
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(results, json.load(f), args.max_regression):
+                return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
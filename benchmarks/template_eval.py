@@ -0,0 +1,151 @@
+"""
+System Prompt Template Evaluation
+Replays a prompt corpus with each PROMPT_TEMPLATES mode against the mock
+DeepSeek server and compares input tokens and upstream latency
+
+DETAIL records without clarifications send the question stage, the rest
+the optimization stage. Each mode starts with an empty simulated prefix
+cache. The mock adds --prefill-ms-per-1k of latency per 1000 uncached
+prompt tokens. The first pass pays for warming one cached prefix per
+template (one in total for "full", one per style and target for
+"compact"); later passes show the steady state.
+
+Usage:
+    python benchmarks/template_eval.py
+    python benchmarks/template_eval.py --modes full,compact --repeat 3 --structured \
+        --output benchmarks/results/templates.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from load_test import git_commit, percentile  # noqa: E402
+from mock_deepseek import MockDeepSeekServer, PrefixCache, add_mock_arguments, settings_from_args  # noqa: E402
+from routing_eval import DEFAULT_CORPUS  # noqa: E402
+
+
+def load_corpus(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(optimizer, mock, records, repeat: int) -> dict:
+    """Send every record with the optimizer's current templates; return token and latency totals"""
+    from routing import estimate_tokens
+
+    mock.settings.prefix_cache = PrefixCache()
+    system_tokens = []
+    input_tokens = 0
+    cold_latencies = []
+    warm_latencies = []
+    prompt_tokens = 0
+    miss_tokens = 0
+
+    for n in range(repeat):
+        for record in records:
+            prompt_style = record.get("prompt_style", "BASIC").upper()
+            target_ai = record.get("target_ai", "ChatGPT")
+            if prompt_style == "DETAIL" and not record.get("clarifications"):
+                payload = optimizer._build_questions_payload(record["raw_prompt"], target_ai)
+            else:
+                payload = optimizer._build_optimization_payload(
+                    record["raw_prompt"], prompt_style, target_ai, record.get("clarifications")
+                )
+            system_tokens.append(estimate_tokens(payload["messages"][0]["content"]))
+            input_tokens += sum(estimate_tokens(message["content"]) for message in payload["messages"])
+
+            start = time.perf_counter()
+            response = optimizer._call_deepseek_api(payload, record.get("clarifications") is not None)
+            (warm_latencies if n else cold_latencies).append(time.perf_counter() - start)
+
+            usage = response.get("usage", {})
+            prompt_tokens += usage.get("prompt_tokens", 0)
+            miss_tokens += usage.get("prompt_cache_miss_tokens", 0)
+
+    ordered = sorted(cold_latencies + warm_latencies)
+    return {
+        "calls": len(ordered),
+        "system_prompt_tokens_mean": round(sum(system_tokens) / len(system_tokens), 1),
+        "input_tokens_estimated": input_tokens,
+        "prompt_tokens": prompt_tokens,
+        "prompt_cache_miss_tokens": miss_tokens,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "first_pass_mean_ms": round(sum(cold_latencies) / len(cold_latencies) * 1000, 2),
+        "warm_mean_ms": round(sum(warm_latencies) / len(warm_latencies) * 1000, 2) if warm_latencies else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare system prompt templates on a prompt corpus against the mock DeepSeek API")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL of /optimize request bodies")
+    parser.add_argument("--modes", default="full,compact",
+                        help="Comma-separated PROMPT_TEMPLATES values; the first is the baseline")
+    parser.add_argument("--repeat", type=int, default=2, help="Passes over the corpus per mode")
+    parser.add_argument("--structured", action="store_true", help="Build payloads for STRUCTURED_OUTPUT=true")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    add_mock_arguments(parser)
+    parser.set_defaults(latency="fixed", latency_ms=200, prefill_ms_per_1k=200)
+    args = parser.parse_args(argv)
+
+    mock = MockDeepSeekServer(settings_from_args(args)).start()
+    os.environ["DEEPSEEK_API_URL"] = mock.url
+    os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["DETAIL_SESSIONS_ENABLED"] = "false"
+    os.environ["STRUCTURED_OUTPUT"] = "true" if args.structured else "false"
+
+    from optimizer import PromptOptimizer
+    from prompts import TemplateRegistry
+
+    records = load_corpus(args.corpus)
+    optimizer = PromptOptimizer()
+    results = {}
+    try:
+        for mode in args.modes.split(","):
+            optimizer.templates = TemplateRegistry(mode, optimizer.config.MAX_INPUT_TOKENS, args.structured)
+            results[mode] = evaluate(optimizer, mock, records, args.repeat)
+    finally:
+        mock.stop()
+
+    report = {
+        "meta": {"commit": git_commit(), "corpus": args.corpus, "records": len(records), "repeat": args.repeat,
+                 "structured": args.structured,
+                 "mock": {"latency_ms": args.latency_ms, "prefill_ms_per_1k": args.prefill_ms_per_1k}},
+        "templates": {mode: TemplateRegistry(mode).stats() for mode in results},
+        "modes": results
+    }
+    print(json.dumps(report, indent=2))
+
+    names = list(results)
+    baseline = results[names[0]]
+    for name in names[1:]:
+        current = results[name]
+        print(f"\n{name} vs {names[0]}:")
+        for field in ("system_prompt_tokens_mean", "input_tokens_estimated", "prompt_tokens",
+                      "prompt_cache_miss_tokens", "first_pass_mean_ms", "warm_mean_ms", "mean_ms", "p95_ms"):
+            old, new = baseline[field], current[field]
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {field:26s} {old:>10} -> {new:>10}  ({change})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
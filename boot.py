@@ -0,0 +1,80 @@
+"""
+Boot Timing
+Cold-start measurements (process start to first response) for scale-to-zero
+deployments, and background pre-warming of the optimizer and upstream connections
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def process_started_at() -> float:
+    """Wall-clock time this process started (from /proc on Linux); now elsewhere"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command name start at field 3; starttime is field 22
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class BootTimer:
+    """Seconds from process start to each boot phase, recorded once per phase"""
+
+    def __init__(self):
+        self.started_at = process_started_at()
+        self.phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str) -> Optional[float]:
+        """Record a phase the first time it happens; returns its offset, or None if already recorded"""
+        with self._lock:
+            if phase in self.phases:
+                return None
+            self.phases[phase] = time.time() - self.started_at
+            return self.phases[phase]
+
+    def first_response(self):
+        """Call after every response; logs the cold-start summary once"""
+        if "first_response" in self.phases:
+            return
+        seconds = self.mark("first_response")
+        if seconds is not None:
+            summary = ", ".join(f"{phase}={offset:.3f}s" for phase, offset in self.phases.items())
+            logger.info("Cold start: %s after process start", summary)
+
+    def collect_metrics(self):
+        """Scrape-time gauges for /metrics (see metrics.MetricsRegistry.register_collector)"""
+        with self._lock:
+            phases = dict(self.phases)
+        for phase, offset in phases.items():
+            yield ("prompt_optimizer_boot_seconds", "gauge", "Seconds from process start to each boot phase",
+                   {"phase": phase}, round(offset, 4))
+
+
+def prewarm(timer: BootTimer, get_optimizer: Callable[[], object]):
+    """
+    Build the optimizer (if it is still deferred) and open a connection to
+    each upstream backend on a background thread, so the first request finds
+    DNS, TCP and TLS already done
+    """
+    def run():
+        optimizer = get_optimizer()
+        if optimizer is None:
+            return
+        for backend in optimizer.backends.backends:
+            optimizer.client.warm(backend.url, timeout=optimizer.config.UPSTREAM_CONNECT_TIMEOUT)
+        timer.mark("prewarmed")
+
+    thread = threading.Thread(target=run, name="boot-prewarm", daemon=True)
+    thread.start()
+    return thread
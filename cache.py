@@ -0,0 +1,200 @@
+"""
+Optimization Result Cache
+In-memory LRU with TTL and size-based eviction, backed by an optional SQLite tier
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(text: Optional[str]) -> str:
+    """Collapse runs of whitespace so trivially different pastes share a key"""
+    if not text:
+        return ""
+    return " ".join(text.split())
+
+
+def make_cache_key(raw_prompt: str, prompt_style: str, target_ai: str, clarifications: Optional[str] = None,
+                   routing: Optional[Dict] = None) -> str:
+    """Build a stable cache key from the normalized request fields"""
+    fields = [
+        normalize_prompt(raw_prompt),
+        prompt_style,
+        target_ai,
+        normalize_prompt(clarifications)
+    ]
+    # Per-request routing overrides change the answer; keys without them stay as before
+    if routing:
+        fields.append(sorted(routing.items()))
+    material = json.dumps(fields, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheStore:
+    """Persistent cache tier so results survive process restarts"""
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self._writes += 1
+            # Prune periodically rather than on every write
+            if self._writes % 100 == 0:
+                self._prune(now)
+            self._conn.commit()
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            " SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+
+class ResultCache:
+    """LRU result cache with per-entry TTL and entry/byte limits"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 50 * 1024 * 1024,
+                 ttl: float = 3600, sqlite_path: Optional[str] = None,
+                 sqlite_max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.store = None
+        if sqlite_path:
+            try:
+                self.store = SQLiteCacheStore(sqlite_path, sqlite_max_entries)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open SQLite cache at {sqlite_path}: {e}")
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict]:
+        """Return a cached result, or None on miss or expiry; count=False leaves hit/miss stats alone"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return dict(entry[2])
+                self._remove(key)
+
+        if self.store:
+            try:
+                value = self.store.get(key)
+            except sqlite3.Error as e:
+                logger.error(f"SQLite cache read failed: {e}")
+                value = None
+            if value is not None:
+                self._set_memory(key, value, self.ttl)
+                if count:
+                    with self._lock:
+                        self.hits += 1
+                return dict(value)
+
+        if count:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def set(self, key: str, value: Dict):
+        """Store a result in memory and, if configured, on disk"""
+        self._set_memory(key, value, self.ttl)
+        if self.store:
+            try:
+                self.store.set(key, value, self.ttl)
+            except sqlite3.Error as e:
+                logger.error(f"SQLite cache write failed: {e}")
+
+    def _set_memory(self, key: str, value: Dict, ttl: float):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, size, dict(value))
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.store:
+            self.store.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent": self.store is not None
+            }
@@ -0,0 +1,143 @@
+"""
+Upstream Circuit Breaker
+Fails fast while the upstream is erroring or slow instead of letting every
+request wait out its timeout
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit is open"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Upstream circuit open; retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when, over the last `window` calls (and at least `min_calls`),
+    the error rate reaches `failure_rate` or the share of calls slower than
+    `slow_call_seconds` reaches `slow_call_rate`.
+
+    Open -> half-open after `open_seconds`; up to `half_open_calls` trial calls
+    are let through. If they all succeed quickly the circuit closes, otherwise
+    it opens again. A trial that ends without an outcome (cancelled, or a
+    client that disconnected mid-stream) is released with `release()`; one
+    still outstanding after `slow_call_seconds` counts as slow and reopens
+    the circuit, so a lost trial can never leave it half-open for good.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: int = 20, min_calls: int = 10, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 20, slow_call_rate: float = 0.5,
+                 open_seconds: float = 30, half_open_calls: int = 1):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.half_opened_at = 0.0
+        self._trials = 0
+        self._trial_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        """Reserve permission for one upstream call; raises CircuitOpenError if refused"""
+        with self._lock:
+            if self.state == self.OPEN:
+                waited = time.monotonic() - self.opened_at
+                if waited < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.open_seconds - waited)
+                self.state = self.HALF_OPEN
+                self.half_opened_at = time.monotonic()
+                self._trials = 0
+                self._trial_successes = 0
+                logger.info("Upstream circuit half-open; sending a trial request")
+
+            if self.state == self.HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.rejected += 1
+                    if time.monotonic() - self.half_opened_at >= self.slow_call_seconds:
+                        self._open(f"trial request still running after {self.slow_call_seconds:g}s")
+                        raise CircuitOpenError(self.open_seconds)
+                    raise CircuitOpenError(0)
+                self._trials += 1
+
+    def release(self):
+        """Give back a call permitted by before_call that ended without an outcome"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trials > self._trial_successes:
+                self._trials -= 1
+
+    def record(self, seconds: float, failed: bool):
+        """Record the outcome of a call permitted by before_call"""
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open("trial request failed" if failed else f"trial request took {seconds:.1f}s")
+                    return
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    logger.info("Upstream circuit closed")
+                return
+
+            if self.state == self.OPEN:
+                # A call that started before the circuit opened
+                return
+
+            self._outcomes.append((failed, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for failed_call, _ in self._outcomes if failed_call)
+            slow_calls = sum(1 for _, slow_call in self._outcomes if slow_call)
+            if failures / calls >= self.failure_rate:
+                self._open(f"{failures}/{calls} recent calls failed")
+            elif slow_calls / calls >= self.slow_call_rate:
+                self._open(f"{slow_calls}/{calls} recent calls took over {self.slow_call_seconds:g}s")
+
+    def _open(self, reason: str):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"Upstream circuit opened for {self.open_seconds:g}s: {reason}")
+
+    def reject_if_open(self):
+        """Raise CircuitOpenError while calls are being refused, without reserving a trial call"""
+        with self._lock:
+            if self.state == self.OPEN:
+                waited = time.monotonic() - self.opened_at
+                if waited < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.open_seconds - waited)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected
+            }
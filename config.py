@@ -5,21 +5,153 @@ load_dotenv()
 
 class Config:
     DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
-    DEEPSEEK_API_URL = 'https://api.deepseek.com/v1/chat/completions'
+    DEEPSEEK_API_URL = os.getenv('DEEPSEEK_API_URL', 'https://api.deepseek.com/v1/chat/completions')
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
     
-    # Rate limiting
-    REQUESTS_PER_MINUTE = 30
+    # Logging: "sync" writes text lines from the request thread; "async" queues records
+    # (at most LOG_QUEUE_SIZE) for a background JSON writer with one summary line per
+    # request, shedding INFO records and keeping LOG_SAMPLE_RATE of the summaries once
+    # the queue is half full
+    LOG_MODE = os.getenv('LOG_MODE', 'sync')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+
+    # Boot (app.py): "eager" builds the optimizer at import; "lazy" defers it to the first
+    # request that needs it, so the worker binds sooner after a cold start. BOOT_PREWARM
+    # builds it and opens the upstream connections on a background thread right away.
+    BOOT_MODE = os.getenv('BOOT_MODE', 'eager')
+    BOOT_PREWARM = os.getenv('BOOT_PREWARM', 'false').lower() == 'true'
+
+    # Rate limiting (token bucket; use the sqlite backend to share limits across workers)
+    REQUESTS_PER_MINUTE = int(os.getenv('REQUESTS_PER_MINUTE', '30'))
+    RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '0')) or None
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', '')
     
     # Model configuration
     DEFAULT_MODEL = 'deepseek-chat'
     REASONING_MODEL = 'deepseek-reasoner'
     
+    # Picks model/max_tokens/temperature per call: "complexity", "static" or module:ClassName
+    MODEL_ROUTER = os.getenv('MODEL_ROUTER', 'complexity')
+    
+    # Upstream HTTP client
+    UPSTREAM_POOL_SIZE = int(os.getenv('UPSTREAM_POOL_SIZE', '10'))
+    UPSTREAM_MAX_RETRIES = int(os.getenv('UPSTREAM_MAX_RETRIES', '2'))
+    UPSTREAM_BACKOFF_BASE = float(os.getenv('UPSTREAM_BACKOFF_BASE', '0.5'))
+    UPSTREAM_BACKOFF_MAX = float(os.getenv('UPSTREAM_BACKOFF_MAX', '4'))
+    UPSTREAM_CONNECT_TIMEOUT = float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '5'))
+    UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', '20'))
+    UPSTREAM_CLARIFICATION_TIMEOUT = float(os.getenv('UPSTREAM_CLARIFICATION_TIMEOUT', '35'))
+    HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '10'))
+    
+    # Upstream backends: a JSON list of {"name", "url", "api_key", "models"} objects, e.g. more
+    # DeepSeek keys or regions, or a local OpenAI-compatible server ("models" maps deepseek-chat /
+    # deepseek-reasoner to its model names). Unset means the single DEEPSEEK_API_URL backend.
+    # Calls go to the backend with the fewest outstanding calls and lowest latency EWMA;
+    # a failed call counts UPSTREAM_BACKEND_FAILURE_PENALTY x its latency in the EWMA. A 429
+    # ejects a backend for its Retry-After, and a 5xx, connection error or timeout for
+    # UPSTREAM_BACKEND_EJECT_SECONDS.
+    UPSTREAM_BACKENDS = os.getenv('UPSTREAM_BACKENDS', '')
+    UPSTREAM_BACKEND_EJECT_SECONDS = float(os.getenv('UPSTREAM_BACKEND_EJECT_SECONDS', '30'))
+    UPSTREAM_BACKEND_EWMA_ALPHA = float(os.getenv('UPSTREAM_BACKEND_EWMA_ALPHA', '0.3'))
+    UPSTREAM_BACKEND_FAILURE_PENALTY = float(os.getenv('UPSTREAM_BACKEND_FAILURE_PENALTY', '2.0'))
+    
+    # Per-request time budget for /optimize and /optimize/stream. It only helps while it is
+    # below the gunicorn worker --timeout (45s in the Procfile and railway.toml); gunicorn's
+    # own default is 30s, so any other start command must pass --timeout too.
+    REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '40'))
+    
+    # Hedged upstream requests: send a second request once the first is slower than
+    # the HEDGE_PERCENTILE latency, capped at HEDGE_MAX_RATIO of calls
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'false').lower() == 'true'
+    HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+    HEDGE_MIN_SAMPLES = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+    HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '0.5'))
+    HEDGE_MAX_RATIO = float(os.getenv('HEDGE_MAX_RATIO', '0.1'))
+    
+    # Circuit breaker: fail fast to the local degraded optimizer while the upstream
+    # is erroring or slow over the last CIRCUIT_WINDOW calls
+    CIRCUIT_ENABLED = os.getenv('CIRCUIT_ENABLED', 'true').lower() == 'true'
+    CIRCUIT_WINDOW = int(os.getenv('CIRCUIT_WINDOW', '20'))
+    CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '10'))
+    CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5'))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', '20'))
+    CIRCUIT_SLOW_CALL_RATE = float(os.getenv('CIRCUIT_SLOW_CALL_RATE', '0.5'))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+    
+    # Background health probing (/health serves the cached result)
+    HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '60'))
+    HEALTH_FAILURE_THRESHOLD = int(os.getenv('HEALTH_FAILURE_THRESHOLD', '3'))
+    
+    # Ask the model for a JSON object instead of markdown sections
+    STRUCTURED_OUTPUT = os.getenv('STRUCTURED_OUTPUT', 'false').lower() == 'true'
+    
+    # System prompts: "compact" sends a precompiled prompt per (prompt_style, target_ai) with
+    # only that mode's instructions; "full" sends the whole original methodology every call
+    PROMPT_TEMPLATES = os.getenv('PROMPT_TEMPLATES', 'compact')
+    # Estimated input tokens an optimization may send upstream (system prompt, prompt, answers
+    # and replayed questions); larger requests get a 400. The default fits any prompt /validate
+    # accepts (5000 characters, in any script) with room for the DETAIL answers.
+    MAX_INPUT_TOKENS = int(os.getenv('MAX_INPUT_TOKENS', '8000'))
+    
+    # Coalesce identical concurrent optimizations into one upstream call
+    SINGLEFLIGHT_ENABLED = os.getenv('SINGLEFLIGHT_ENABLED', 'true').lower() == 'true'
+    
+    # Bulk optimization (/optimize/batch and batch.py). Every item costs one rate-limit token.
+    # A streamed batch shares one REQUEST_DEADLINE_SECONDS budget on a web worker, so keep
+    # BATCH_MAX_ITEMS small enough to finish in it; ?async=true batches run on the job pool
+    # and take up to BATCH_JOB_MAX_ITEMS, and batch.py has no cap.
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+    BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '16'))
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '10'))
+    BATCH_JOB_MAX_ITEMS = int(os.getenv('BATCH_JOB_MAX_ITEMS', '200'))
+    
+    # Background jobs ("async": true on /optimize): workers, queue bound, result TTL,
+    # per-job deadline and the longest a GET /jobs/<id>?wait= long poll may block
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+    JOB_MAX_QUEUE = int(os.getenv('JOB_MAX_QUEUE', '100'))
+    JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', '600'))
+    JOB_DEADLINE_SECONDS = float(os.getenv('JOB_DEADLINE_SECONDS', '120'))
+    JOB_MAX_WAIT_SECONDS = float(os.getenv('JOB_MAX_WAIT_SECONDS', '25'))
+    
+    # Async serving mode (asgi.py)
+    ASYNC_POOL_SIZE = int(os.getenv('ASYNC_POOL_SIZE', '100'))
+    ASYNC_MAX_CONCURRENCY = int(os.getenv('ASYNC_MAX_CONCURRENCY', '100'))
+    
+    # Result cache
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1000'))
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+    CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', '')
+    CACHE_SQLITE_MAX_ENTRIES = int(os.getenv('CACHE_SQLITE_MAX_ENTRIES', '100000'))
+    
+    # DETAIL sessions: stage two continues the stage-one conversation. Every questions
+    # response, including cache hits, opens its own session.
+    DETAIL_SESSIONS_ENABLED = os.getenv('DETAIL_SESSIONS_ENABLED', 'true').lower() == 'true'
+    DETAIL_SESSION_TTL_SECONDS = int(os.getenv('DETAIL_SESSION_TTL_SECONDS', '3600'))
+    DETAIL_SESSION_MAX_ENTRIES = int(os.getenv('DETAIL_SESSION_MAX_ENTRIES', '5000'))
+    
+    # Speculative BASIC optimization while the user answers the DETAIL questions,
+    # served when they skip them (needs DETAIL sessions)
+    SPECULATION_ENABLED = os.getenv('SPECULATION_ENABLED', 'false').lower() == 'true'
+    SPECULATION_MAX_CONCURRENT = int(os.getenv('SPECULATION_MAX_CONCURRENT', '2'))
+    
+    # Near-duplicate reuse: serve a cached result for a prompt whose estimated
+    # similarity to an already optimized one is at least NEAR_DUPLICATE_THRESHOLD.
+    # Off by default: a one-word change ("Python" -> "Rust", "not") can clear the
+    # threshold in a long prompt, and that user then gets the other prompt's answer.
+    NEAR_DUPLICATE_ENABLED = os.getenv('NEAR_DUPLICATE_ENABLED', 'false').lower() == 'true'
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.9'))
+    NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', '10000'))
+    
     @staticmethod
     def validate_config():
         """Validate that required configuration is present"""
-        if not Config.DEEPSEEK_API_KEY:
+        # Each UPSTREAM_BACKENDS entry may bring its own key (checked in backends.load_backends)
+        if not Config.DEEPSEEK_API_KEY and not Config.UPSTREAM_BACKENDS.strip():
             raise ValueError("DEEPSEEK_API_KEY environment variable is required")
         
         return True
@@ -0,0 +1,51 @@
+"""
+Request Deadlines
+A per-request time budget, set by the HTTP handler and consulted by every
+upstream call so each one only gets the time that is left
+"""
+
+import contextvars
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out before the upstream answers"""
+
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message)
+
+
+class Deadline:
+    """An absolute point on the monotonic clock"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, timeout: float) -> float:
+        """Shrink a timeout to the time left; raise DeadlineExceeded if none is"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Request deadline of {self.budget:g}s exceeded")
+        return min(timeout, remaining)
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def start_deadline(seconds: Optional[float]) -> Optional[Deadline]:
+    """Set the deadline for the current request (thread or task); falsy seconds clears it"""
+    deadline = Deadline(seconds) if seconds else None
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
@@ -0,0 +1,120 @@
+"""
+Local Degraded-Mode Optimizer
+Deterministic, rule-based version of the 4-D methodology used while the
+upstream circuit is open
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from routing import estimate_complexity
+
+# Request type -> (keywords, role, output specification, technique)
+REQUEST_TYPES = {
+    "technical": (
+        ("code", "function", "bug", "debug", "error", "api", "sql", "python", "javascript", "typescript",
+         "java", "script", "algorithm", "database", "query", "implement", "refactor", "deploy", "regex"),
+        "a senior software engineer",
+        "Provide working code in fenced code blocks, explain the key decisions briefly, and call out edge cases.",
+        "Constraint-based precision"
+    ),
+    "creative": (
+        ("story", "poem", "poetry", "lyrics", "novel", "character", "slogan", "tagline", "blog", "creative",
+         "fiction", "script", "caption", "marketing copy", "essay"),
+        "an award-winning writer",
+        "Match the requested tone and voice, and deliver one polished draft followed by two alternative angles.",
+        "Tone emphasis"
+    ),
+    "educational": (
+        ("explain", "teach", "learn", "understand", "what is", "how does", "why does", "tutorial", "lesson",
+         "student", "beginner", "course", "quiz"),
+        "an experienced teacher",
+        "Start with a plain-language overview, then give a worked example, and end with a three-point summary.",
+        "Few-shot examples"
+    ),
+    "analytical": (
+        ("analyze", "analyse", "compare", "evaluate", "report", "strategy", "summarize", "summarise", "data",
+         "research", "review", "pros and cons", "plan", "forecast"),
+        "a senior analyst",
+        "Use headings and bullet points, state your assumptions, and end with clear recommendations.",
+        "Systematic framework"
+    ),
+}
+DEFAULT_REQUEST_TYPE = (
+    (),
+    "a knowledgeable expert in the subject of the request",
+    "Be clear and concise, and use lists or headings where they make the answer easier to scan.",
+    "Output specification"
+)
+
+CONSTRAINTS = [
+    "If any information you need is missing, state your assumptions before answering.",
+    "Stay focused on the task and skip unnecessary preamble."
+]
+
+DEGRADED_PRO_TIP = ("DeepSeek is currently unavailable, so this prompt was optimized with local rules. "
+                    "Try again in a minute for a full AI optimization.")
+
+
+def classify_request(raw_prompt: str) -> str:
+    """Pick the request type whose keywords occur most often; ties go to the first listed"""
+    text = raw_prompt.lower()
+    best, best_hits = None, 0
+    for name, (keywords, _, _, _) in REQUEST_TYPES.items():
+        hits = sum(1 for keyword in keywords if re.search(r"\b" + re.escape(keyword) + r"\b", text))
+        if hits > best_hits:
+            best, best_hits = name, hits
+    return best or "general"
+
+
+def _section(title: str, body: str, target_ai: str) -> str:
+    # Claude follows XML-style tags well; the others get markdown headings
+    if target_ai == "Claude":
+        tag = title.lower().replace(" ", "_")
+        return f"<{tag}>\n{body}\n</{tag}>"
+    return f"## {title}\n{body}"
+
+
+def optimize_locally(raw_prompt: str, prompt_style: str, target_ai: str,
+                     clarifications: Optional[str] = None) -> Dict:
+    """
+    Apply the 4-D structure without a model:
+    role assignment, the original task, any user context, explicit
+    constraints and an output specification matched to the request type.
+    """
+    request_type = classify_request(raw_prompt)
+    _, role, output_spec, technique = REQUEST_TYPES.get(request_type, DEFAULT_REQUEST_TYPE)
+    complex_request = estimate_complexity(raw_prompt, clarifications)["score"] >= 0.55
+
+    constraints: List[str] = list(CONSTRAINTS)
+    if complex_request:
+        constraints.insert(0, "Break the problem into steps and work through them in order before giving the final answer.")
+
+    # The user's text goes in verbatim (code, lists and line breaks matter); only the outer blank lines go
+    sections = [f"You are {role}.", _section("Task", raw_prompt.strip("\n"), target_ai)]
+    if clarifications:
+        sections.append(_section("Context", clarifications.strip("\n"), target_ai))
+    sections.append(_section("Constraints", "\n".join(f"- {line}" for line in constraints), target_ai))
+    sections.append(_section("Output format", output_spec, target_ai))
+
+    improvements = [
+        f"Assigned an expert role ({role})",
+        "Restated the task on its own, separated from context and constraints",
+        "Added explicit constraints for missing information and focus",
+        f"Specified an output format suited to a {request_type} request"
+    ]
+    if clarifications:
+        improvements.insert(2, "Folded your answers into a dedicated context section")
+
+    techniques = ["Role assignment", "Context layering", "Output specification", technique]
+    if complex_request:
+        techniques.append("Chain-of-thought")
+
+    return {
+        "error": False,
+        "degraded": True,
+        "optimized_prompt": "\n\n".join(sections),
+        "improvements": improvements,
+        "techniques_applied": list(dict.fromkeys(techniques)),
+        "pro_tip": DEGRADED_PRO_TIP
+    }
@@ -8,6 +8,7 @@ class PromptOptimizerExtension {
         // Production backend URL on Railway
         this.apiUrl = 'https://promptoptimizer-production.up.railway.app';
         this.isOptimizing = false;
+        this.sessionId = null;
         
         this.initializeElements();
         this.attachEventListeners();
@@ -136,7 +137,7 @@ class PromptOptimizerExtension {
         this.statusDotEl.className = `status-dot ${type}`;
     }
 
-    async optimizePrompt(clarifications = null) {
+    async optimizePrompt(clarifications = null, skipped = false) {
         if (this.isOptimizing || !this.validateInput()) return;
 
         try {
@@ -162,10 +163,15 @@ class PromptOptimizerExtension {
                 target_ai: targetAI
             };
 
-            // Add clarifications if provided
+            // Add clarifications if provided, continuing the server-side DETAIL session
             if (clarifications) {
                 payload.clarifications = clarifications;
             }
+            // Skipping sends the session too, so a BASIC result prepared while the
+            // questions were shown can be served straight away
+            if ((clarifications || skipped) && this.sessionId) {
+                payload.session_id = this.sessionId;
+            }
 
             // Make API request
             const response = await fetch(`${this.apiUrl}/optimize`, {
@@ -181,12 +187,17 @@ class PromptOptimizerExtension {
             if (response.ok && !data.error) {
                 // Check if we need clarification (DETAIL mode stage 1)
                 if (data.needs_clarification) {
+                    this.sessionId = data.session_id || null;
                     this.showClarification(data.questions);
                     this.setStatus('ready', 'Please answer questions');
                 } else {
                     // Final result
                     this.displayResult(data);
-                    this.setStatus('ready', 'Optimization complete');
+                    if (data.degraded) {
+                        this.setStatus('loading', 'Optimized offline with basic rules');
+                    } else {
+                        this.setStatus('ready', 'Optimization complete');
+                    }
                 }
             } else {
                 throw new Error(data.message || 'Optimization failed');
@@ -363,7 +374,7 @@ class PromptOptimizerExtension {
         // Change to BASIC mode and re-optimize
         const basicRadio = document.querySelector('input[name="promptStyle"][value="BASIC"]');
         if (basicRadio) basicRadio.checked = true;
-        await this.optimizePrompt();
+        await this.optimizePrompt(null, true);
     }
 }
 
@@ -194,7 +194,11 @@ class PromptOptimizerWebApp {
 
             if (response.ok && !data.error) {
                 this.displayResults(data);
-                this.setStatus('ready', 'Optimization complete');
+                if (data.degraded) {
+                    this.setStatus('loading', 'DeepSeek unavailable - optimized with basic rules');
+                } else {
+                    this.setStatus('ready', 'Optimization complete');
+                }
                 
                 // Analytics
                 this.trackOptimization(promptStyle, targetAI, true);
@@ -0,0 +1,140 @@
+"""
+Upstream Health Monitor
+Background-probed, cached upstream status so /health never pays for a completion
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Tracks upstream health from two sources:
+    - active probes, run on a background thread every `interval` seconds
+      (skipped while real traffic has recently succeeded)
+    - passive signals, recorded from the outcome of every real upstream call
+
+    A failed probe marks the upstream unhealthy immediately; passive failures
+    only do so after `failure_threshold` consecutive errors, and any success
+    marks it healthy again.
+    """
+
+    def __init__(self, probe: Callable[[], Dict], interval: float = 60, failure_threshold: int = 3):
+        self.probe = probe
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.status = None  # None until the first probe or real call completes
+        self.last_error = None
+        self.checked_at = None
+        self.source = None
+        self.last_success_at = 0.0
+        self.consecutive_failures = 0
+        self.probes = 0
+        self.probes_skipped = 0
+
+    def start(self):
+        """Start the background prober (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Recent successful traffic already proves the upstream is reachable
+            if time.time() - self.last_success_at < self.interval:
+                with self._lock:
+                    self.probes_skipped += 1
+            else:
+                self.probe_now()
+            self._stop.wait(self.interval)
+
+    def probe_now(self):
+        """Run one active probe and record its outcome"""
+        with self._probe_lock:
+            try:
+                result = self.probe()
+            except Exception as e:
+                result = {"status": "unhealthy", "error": str(e)}
+
+            with self._lock:
+                self.probes += 1
+            if result.get("status") == "healthy":
+                self._record(True, None, "probe")
+            else:
+                self._record(False, result.get("error"), "probe", immediate=True)
+
+    def record_success(self):
+        """Passive signal: a real upstream call succeeded"""
+        self._record(True, None, "traffic")
+
+    def record_failure(self, error: str):
+        """Passive signal: a real upstream call failed"""
+        self._record(False, error, "traffic")
+
+    def _record(self, success: bool, error: Optional[str], source: str, immediate: bool = False):
+        now = time.time()
+        with self._lock:
+            self.checked_at = now
+            self.source = source
+            if success:
+                self.status = "healthy"
+                self.last_error = None
+                self.last_success_at = now
+                self.consecutive_failures = 0
+                return
+
+            self.consecutive_failures += 1
+            self.last_error = error
+            if immediate or self.consecutive_failures >= self.failure_threshold:
+                if self.status != "unhealthy":
+                    logger.warning(f"Upstream marked unhealthy ({source}): {error}")
+                self.status = "unhealthy"
+            elif self.status is None:
+                self.status = "degraded"
+
+    def snapshot(self) -> Dict:
+        """
+        Return the cached status without calling the upstream
+
+        Only the very first call, before any probe or traffic, waits for a probe.
+        """
+        if self.status is None:
+            self.probe_now()
+
+        with self._lock:
+            snapshot = {
+                "status": self.status,
+                "api_accessible": self.status != "unhealthy",
+                "checked_at": datetime.fromtimestamp(self.checked_at).isoformat() if self.checked_at else None,
+                "age_seconds": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+                "source": self.source,
+                "consecutive_failures": self.consecutive_failures
+            }
+            if self.last_error:
+                snapshot["error"] = self.last_error
+            return snapshot
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "probes": self.probes,
+                "probes_skipped": self.probes_skipped,
+                "consecutive_failures": self.consecutive_failures
+            }
@@ -0,0 +1,142 @@
+"""
+Hedged Upstream Requests
+Fire a second, identical upstream request when the first is slower than a
+recent latency percentile, and take whichever answer arrives first
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """
+    Decides when to hedge, from a sliding window of successful latencies per key
+    (the model name).
+
+    No hedge is sent until `min_samples` latencies have been seen. The hedge
+    delay is the `percentile` latency, never less than `min_delay`, and hedges
+    are capped at `max_ratio` of all calls so a slow upstream is not hit with
+    double the traffic.
+    """
+
+    def __init__(self, percentile: float = 95, min_samples: int = 20, min_delay: float = 0.5,
+                 max_ratio: float = 0.1, window: int = 200):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.window = window
+
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None when there is too little data"""
+        with self._lock:
+            samples = self._latencies.get(key)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        rank = min(len(ordered) - 1, max(0, int(round(self.percentile / 100.0 * len(ordered))) - 1))
+        return max(self.min_delay, ordered[rank])
+
+    def start_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_hedge(self) -> bool:
+        """Reserve a hedge if the budget allows"""
+        with self._lock:
+            if self.hedged + 1 > self.max_ratio * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def record_win(self, hedge_won: bool):
+        if hedge_won:
+            with self._lock:
+                self.hedge_wins += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"calls": self.calls, "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+
+
+def hedged_call(policy: HedgePolicy, executor: ThreadPoolExecutor, key: str, fn: Callable[[], Dict],
+                timeout: Optional[float] = None) -> Tuple[Dict, bool]:
+    """
+    Run fn, hedging it with a second call after the policy's delay
+
+    No hedge is sent if the delay would not fit in `timeout` (the time left
+    before the request deadline). Returns (result, hedged). The slower call
+    is left to finish in the background and its result is discarded; if the
+    first call to finish fails, the other one is awaited before giving up.
+    """
+    policy.start_call()
+    hedge_after = policy.delay(key)
+    if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+        result = fn()
+        return result, False
+
+    primary = executor.submit(fn)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done or not policy.try_hedge():
+        return primary.result(), False
+
+    logger.info(f"Upstream call slower than {hedge_after:.2f}s; sending hedged request")
+    hedge = executor.submit(fn)
+    error = None
+    for future in as_completed((primary, hedge)):
+        if future.exception() is None:
+            policy.record_win(future is hedge)
+            return future.result(), True
+        error = future.exception()
+    raise error
+
+
+async def hedged_call_async(policy: HedgePolicy, key: str, factory: Callable[[], Awaitable[Dict]],
+                            timeout: Optional[float] = None) -> Tuple[Dict, bool]:
+    """asyncio counterpart of hedged_call; the losing request is cancelled"""
+    policy.start_call()
+    hedge_after = policy.delay(key)
+    if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+        return await factory(), False
+
+    primary = asyncio.ensure_future(factory())
+    done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+    if done or not policy.try_hedge():
+        return await primary, False
+
+    logger.info(f"Upstream call slower than {hedge_after:.2f}s; sending hedged request")
+    hedge = asyncio.ensure_future(factory())
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    policy.record_win(task is hedge)
+                    return task.result(), True
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
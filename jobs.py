@@ -0,0 +1,194 @@
+"""
+Background Optimization Jobs
+Bounded worker pool that runs optimizations off the HTTP worker, with results
+kept for polling until they expire
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+import metrics
+from deadline import start_deadline
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+JOB_WAIT_SECONDS = metrics.REGISTRY.histogram(
+    "prompt_optimizer_job_wait_seconds",
+    "Time jobs spent queued before a worker picked them up"
+)
+JOB_RUN_SECONDS = metrics.REGISTRY.histogram(
+    "prompt_optimizer_job_run_seconds",
+    "Time workers spent running jobs, by final status",
+    ["status"]
+)
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity; the client should retry later"""
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        super().__init__(f"Job queue is full ({depth} queued)")
+
+
+class Job:
+    """One queued optimization and, once finished, its result"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, fn: Callable[[], Dict]):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.status = self.QUEUED
+        self.result: Optional[Dict] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.finished = threading.Event()
+
+    def to_dict(self) -> Dict:
+        now = time.time()
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "queued_seconds": round((self.started_at or now) - self.created_at, 3)
+        }
+        if self.started_at is not None:
+            data["run_seconds"] = round((self.finished_at or now) - self.started_at, 3)
+        if self.result is not None:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """
+    Runs jobs on `workers` daemon threads fed by a queue of at most
+    `max_queue` jobs; submit() raises JobQueueFull beyond that rather than
+    letting the backlog grow. Finished jobs are kept for `ttl` seconds.
+    Each job runs under its own deadline of `deadline_seconds`.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 100, ttl: float = 600,
+                 deadline_seconds: Optional[float] = None):
+        self.workers = workers
+        self.ttl = ttl
+        self.deadline_seconds = deadline_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, fn: Callable[[], Dict]) -> Job:
+        """Queue fn to run on a worker; raises JobQueueFull when the queue is at capacity"""
+        self.start()
+        self._purge_expired()
+        job = Job(fn)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self.rejected += 1
+            raise JobQueueFull(self._queue.qsize())
+        with self._lock:
+            self.submitted += 1
+        return job
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[Job]:
+        """
+        Look up a job, optionally blocking up to `wait` seconds for it to
+        finish (long polling). Returns None for unknown or expired jobs.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or self._is_expired(job, time.time()):
+            return None
+        if wait > 0:
+            job.finished.wait(wait)
+        return job
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.started_at = time.time()
+            job.status = Job.RUNNING
+            JOB_WAIT_SECONDS.observe(job.started_at - job.created_at)
+            with self._lock:
+                self.running += 1
+
+            # Worker threads are long-lived, so each job gets a fresh deadline and trace
+            start_deadline(self.deadline_seconds)
+            metrics.start_trace()
+            try:
+                result = job.fn()
+                job.status = Job.FAILED if result.get("error") else Job.DONE
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {str(e)}")
+                result = {"error": True, "message": "An unexpected error occurred. Please try again."}
+                job.status = Job.FAILED
+            job.result = result
+            job.finished_at = time.time()
+            job.fn = None
+            JOB_RUN_SECONDS.observe(job.finished_at - job.started_at, status=job.status)
+            with self._lock:
+                self.running -= 1
+            job.finished.set()
+            self._queue.task_done()
+
+    def _is_expired(self, job: Job, now: float) -> bool:
+        # Queued and running jobs never expire; finished ones are kept for ttl
+        return job.finished_at is not None and now - job.finished_at > self.ttl
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if self._is_expired(job, now)]
+            for job_id in expired:
+                del self._jobs[job_id]
+            self.expired += len(expired)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "running": self.running,
+                "stored": len(self._jobs),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "expired": self.expired
+            }
+
+    def collect_metrics(self):
+        """Scrape-time gauges for /metrics (see metrics.MetricsRegistry.register_collector)"""
+        self._purge_expired()
+        job_stats = self.stats()
+        yield ("prompt_optimizer_jobs_queued", "gauge", "Jobs waiting for a worker", {}, job_stats["queued"])
+        yield ("prompt_optimizer_jobs_running", "gauge", "Jobs currently running", {}, job_stats["running"])
+        yield ("prompt_optimizer_jobs_stored", "gauge", "Jobs held for polling, including finished ones", {}, job_stats["stored"])
+        yield ("prompt_optimizer_jobs_total", "counter", "Job submissions by outcome", {"outcome": "accepted"}, job_stats["submitted"])
+        yield ("prompt_optimizer_jobs_total", "counter", "Job submissions by outcome", {"outcome": "rejected"}, job_stats["rejected"])
+        yield ("prompt_optimizer_jobs_expired_total", "counter", "Finished jobs dropped after their TTL", {}, job_stats["expired"])
@@ -0,0 +1,251 @@
+"""
+Metrics
+Dependency-free counters, histograms and per-request timing spans,
+rendered in the Prometheus text exposition format for /metrics
+
+Metrics are per process; with several gunicorn workers, scrape each worker
+or aggregate them in Prometheus.
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, spanning in-process stages up to slow reasoner calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            state[index] += 1
+            state[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                    cumulative += count
+                    bucket_labels = dict(labels, le=_format_value(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(state[-1])}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict, float]]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict, float]]]):
+        """
+        Register a callback evaluated at scrape time
+
+        The callback yields (name, type, help, labels, value) tuples, where
+        type is "gauge" or "counter".
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        with self._lock:
+            collectors = list(self._collectors)
+        declared = set()
+        for collector in collectors:
+            for name, metric_type, documentation, labels, value in collector():
+                if name not in declared:
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    declared.add(name)
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "prompt_optimizer_request_seconds",
+    "End-to-end HTTP request latency",
+    ["endpoint", "status"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "prompt_optimizer_stage_seconds",
+    "Latency of each request stage (validation, cache, questions, upstream, parse)",
+    ["stage", "model", "prompt_style", "target_ai"]
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "prompt_optimizer_upstream_requests_total",
+    "Upstream chat completion calls by outcome",
+    ["model", "outcome"]
+)
+UPSTREAM_TOKENS = REGISTRY.counter(
+    "prompt_optimizer_upstream_tokens_total",
+    "Tokens reported in the upstream usage block",
+    ["model", "type"]
+)
+PARSE_RESULTS = REGISTRY.counter(
+    "prompt_optimizer_parse_results_total",
+    "Optimization responses by the parser that understood them (json, markdown, raw fallback)",
+    ["parser"]
+)
+ROUTING_DECISIONS = REGISTRY.counter(
+    "prompt_optimizer_routing_decisions_total",
+    "Optimization calls by routed model and complexity tier",
+    ["model", "tier"]
+)
+
+USAGE_FIELDS = {
+    "prompt_tokens": "prompt",
+    "completion_tokens": "completion",
+    "prompt_cache_hit_tokens": "prompt_cache_hit",
+    "prompt_cache_miss_tokens": "prompt_cache_miss"
+}
+
+
+class RequestTrace:
+    """Stage durations, upstream usage and log fields collected for one request"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.model = None
+        self.upstream_calls = 0
+        self.tokens: Dict[str, int] = {}
+        self.fields: Dict[str, object] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Render as a Server-Timing header value (milliseconds)"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+
+
+def start_trace() -> RequestTrace:
+    """Begin collecting spans for the current request (thread or task)"""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def annotate(**fields):
+    """Add fields to the current request's log summary line"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+def observe_stage(stage: str, seconds: float, model: str = "", prompt_style: str = "", target_ai: str = ""):
+    STAGE_SECONDS.observe(seconds, stage=stage, model=model, prompt_style=prompt_style, target_ai=target_ai)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str, model: str = "", prompt_style: str = "", target_ai: str = ""):
+    """Time a block as one stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, model, prompt_style, target_ai)
+
+
+def record_upstream(model: str, usage: Optional[Dict], success: bool = True):
+    """Count an upstream call and the tokens in its usage block"""
+    UPSTREAM_REQUESTS.inc(model=model, outcome="success" if success else "error")
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.model = model
+        trace.upstream_calls += 1
+    for field, token_type in USAGE_FIELDS.items():
+        value = (usage or {}).get(field)
+        if value:
+            UPSTREAM_TOKENS.inc(value, model=model, type=token_type)
+            if trace is not None:
+                trace.tokens[token_type] = trace.tokens.get(token_type, 0) + value
@@ -3,88 +3,227 @@
 Enhanced prompt optimization using the proven 4-D methodology
 """
 
-import openai
-from openai import OpenAI
 import logging
 from datetime import datetime
 import os
 import json
-import requests
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from config import Config
+from upstream import get_upstream_client
+from backends import BackendPool, load_backends
+from cache import ResultCache, make_cache_key
+from singleflight import SingleFlight
+from circuit import CircuitBreaker, CircuitOpenError
+from deadline import DeadlineExceeded, current_deadline
+from degraded import optimize_locally
+from health import HealthMonitor
+from hedging import HedgePolicy, hedged_call
+from parsing import STRUCTURED_OUTPUT_INSTRUCTIONS, parse_completion, split_items
+from prompts import QUESTIONS_MAX_TOKENS, get_template_registry
+from routing import apply_overrides, get_router
+from sessions import DetailSession, SessionStore
+from similarity import NearDuplicateIndex
+from speculation import Speculation, Speculator
+from validation import MAX_PROMPT_LENGTH
+import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+class StreamingComponentParser:
+    """
+    Incremental counterpart of parsing.parse_markdown_sections for the canonical headings
+    
+    Feed completion text as it arrives; each section is emitted as soon as
+    the next section heading (or the end of the stream) closes it.
+    """
+    
+    MARKERS = [
+        ("**Your Optimized Prompt:**", "optimized_prompt"),
+        ("**What Changed:**", "improvements"),
+        ("**Key Improvements:**", "improvements"),
+        ("**Techniques Applied:**", "techniques_applied"),
+        ("**Pro Tip:**", "pro_tip"),
+    ]
+    FIELDS = ["optimized_prompt", "improvements", "techniques_applied", "pro_tip"]
+    MAX_MARKER_LEN = max(len(marker) for marker, _ in MARKERS)
+    
+    def __init__(self):
+        self.buffer = ""
+        self._scan_from = 0
+        self._current = None  # (field, content_start)
+    
+    def feed(self, text: str) -> List[Tuple[str, object]]:
+        """Add a chunk of text and return any sections it closed"""
+        self.buffer += text
+        events = []
+        
+        while True:
+            match = self._next_marker()
+            if match is None:
+                break
+            index, marker, field = match
+            if self._current:
+                events.append(self._close_current(index))
+            self._current = (field, index + len(marker))
+            self._scan_from = index + len(marker)
+        
+        # A heading may be split across chunks, so rescan the tail next time
+        self._scan_from = max(self._scan_from, len(self.buffer) - self.MAX_MARKER_LEN + 1)
+        return events
+    
+    def close(self) -> List[Tuple[str, object]]:
+        """Flush the final open section at the end of the stream"""
+        if not self._current:
+            return []
+        event = self._close_current(len(self.buffer))
+        self._current = None
+        return [event]
+    
+    def _next_marker(self) -> Optional[Tuple[int, str, str]]:
+        best = None
+        for marker, field in self.MARKERS:
+            index = self.buffer.find(marker, self._scan_from)
+            if index != -1 and (best is None or index < best[0]):
+                best = (index, marker, field)
+        return best
+    
+    def _close_current(self, end: int) -> Tuple[str, object]:
+        field, start = self._current
+        text = self.buffer[start:end].strip()
+        
+        # Split list sections exactly as parse_markdown_sections does, so both paths agree
+        if field in ("improvements", "techniques_applied"):
+            return field, split_items(text)
+        return field, text
+
+
+# DETAIL stage one; sent as the user message after the DETAIL system prompt for the target
+QUESTION_STAGE_INSTRUCTIONS = """Do not optimize yet. Please analyze the raw prompt below and ask clarifying questions for optimization: 2-3 specific questions, as an expert prompt consultant.
+
+FOCUS ON:
+- Purpose/Goal
+- Context/Audience
+- Output Requirements
+
+FORMAT:
+Analysis: [Brief assessment]
+
+Questions:
+1. [Question about purpose/goal]
+2. [Question about context/audience]
+3. [Question about output format] (if needed)
+
+Keep it concise and specific.
+"""
+
+
 class PromptOptimizer:
     def __init__(self):
         self.config = Config()
         self.config.validate_config()
         
-        # 4-D methodology to be embedded in DeepSeek API calls
-        self.methodology = """
-You are an expert prompt optimization AI. Apply the 4-D METHODOLOGY to optimize user prompts:
-
-THE 4-D METHODOLOGY:
-1. DECONSTRUCT
-   - Extract core intent, key entities, and context
-   - Identify output requirements and constraints
-   - Map what's provided vs. what's missing
-
-2. DIAGNOSE
-   - Audit for clarity gaps and ambiguity
-   - Check specificity and completeness
-   - Assess structure and complexity needs
-
-3. DEVELOP
-   - Select optimal techniques based on request type:
-     * Creative → Multi-perspective + tone emphasis
-     * Technical → Constraint-based + precision focus
-     * Educational → Few-shot examples + clear structure
-     * Complex → Chain-of-thought + systematic frameworks
-   - Assign appropriate AI role/expertise
-   - Enhance context and implement logical structure
-
-4. DELIVER
-   - Construct optimized prompt
-   - Format based on complexity
-   - Provide implementation guidance
-
-OPTIMIZATION TECHNIQUES:
-- Foundation: Role assignment, context layering, output specs, task decomposition
-- Advanced: Chain-of-thought, few-shot learning, multi-perspective analysis, constraint optimization
-
-OPERATING MODES:
-DETAIL MODE:
-- Gather context with smart defaults
-- Ask 2-3 targeted clarifying questions
-- Provide comprehensive optimization
-
-BASIC MODE:
-- Quick fix primary issues
-- Apply core techniques only
-- Deliver ready-to-use prompt
-
-RESPONSE FORMATS:
-For Simple Requests:
-**Your Optimized Prompt:**
-[Improved prompt]
-
-**What Changed:** [Key improvements]
-
-For Complex Requests:
-**Your Optimized Prompt:**
-[Improved prompt]
-
-**Key Improvements:**
-• [Primary changes and benefits]
-
-**Techniques Applied:** [Brief mention]
-
-**Pro Tip:** [Usage guidance]
-"""
-
-    def optimize_prompt(self, raw_prompt: str, prompt_style: str, target_ai: str, clarifications: Optional[str] = None) -> Dict:
+        # Upstream endpoints; each call goes to the least loaded, fastest one
+        self.backends = BackendPool(
+            load_backends(self.config.UPSTREAM_BACKENDS, self.config.DEEPSEEK_API_URL, self.config.DEEPSEEK_API_KEY),
+            ewma_alpha=self.config.UPSTREAM_BACKEND_EWMA_ALPHA,
+            eject_seconds=self.config.UPSTREAM_BACKEND_EJECT_SECONDS,
+            failure_penalty=self.config.UPSTREAM_BACKEND_FAILURE_PENALTY
+        )
+        
+        # Shared keep-alive client, reused for every upstream call in this process
+        self.client = get_upstream_client(hosts=len(self.backends.backends))
+        
+        # Result cache for repeated prompts
+        self.cache = None
+        if self.config.CACHE_ENABLED:
+            self.cache = ResultCache(
+                max_entries=self.config.CACHE_MAX_ENTRIES,
+                max_bytes=self.config.CACHE_MAX_BYTES,
+                ttl=self.config.CACHE_TTL_SECONDS,
+                sqlite_path=self.config.CACHE_SQLITE_PATH or None,
+                sqlite_max_entries=self.config.CACHE_SQLITE_MAX_ENTRIES
+            )
+        
+        # Index of cached prompts for reusing results on near-identical inputs
+        self.near_duplicates = None
+        if self.cache and self.config.NEAR_DUPLICATE_ENABLED:
+            self.near_duplicates = NearDuplicateIndex(
+                threshold=self.config.NEAR_DUPLICATE_THRESHOLD,
+                max_entries=self.config.NEAR_DUPLICATE_MAX_ENTRIES,
+                ttl=self.config.CACHE_TTL_SECONDS
+            )
+        
+        # DETAIL stage-one conversations, continued by stage two, and the BASIC
+        # optimizations speculatively started for users who skip the questions
+        self.sessions = None
+        self.speculator = None
+        if self.config.DETAIL_SESSIONS_ENABLED:
+            if self.config.SPECULATION_ENABLED:
+                self.speculator = Speculator(
+                    max_concurrent=self.config.SPECULATION_MAX_CONCURRENT,
+                    deadline_seconds=self.config.REQUEST_DEADLINE_SECONDS
+                )
+            self.sessions = SessionStore(
+                max_entries=self.config.DETAIL_SESSION_MAX_ENTRIES,
+                ttl=self.config.DETAIL_SESSION_TTL_SECONDS,
+                on_drop=self._discard_speculation
+            )
+        
+        # Model/max_tokens/temperature policy for the optimization stage
+        self.router = get_router(config=self.config)
+        
+        # Fail fast to the local optimizer while the upstream is down or slow
+        self.circuit = None
+        if self.config.CIRCUIT_ENABLED:
+            self.circuit = CircuitBreaker(
+                window=self.config.CIRCUIT_WINDOW,
+                min_calls=self.config.CIRCUIT_MIN_CALLS,
+                failure_rate=self.config.CIRCUIT_FAILURE_RATE,
+                slow_call_seconds=self.config.CIRCUIT_SLOW_CALL_SECONDS,
+                slow_call_rate=self.config.CIRCUIT_SLOW_CALL_RATE,
+                open_seconds=self.config.CIRCUIT_OPEN_SECONDS
+            )
+        
+        # Optional hedging of slow upstream calls; hedges run on their own small pool
+        self.hedge_policy = None
+        self.hedge_executor = None
+        if self.config.HEDGE_ENABLED:
+            self.hedge_policy = HedgePolicy(
+                percentile=self.config.HEDGE_PERCENTILE,
+                min_samples=self.config.HEDGE_MIN_SAMPLES,
+                min_delay=self.config.HEDGE_MIN_DELAY,
+                max_ratio=self.config.HEDGE_MAX_RATIO
+            )
+            self.hedge_executor = ThreadPoolExecutor(
+                max_workers=self.config.UPSTREAM_POOL_SIZE * 2,
+                thread_name_prefix="upstream-hedge"
+            )
+        
+        # Coalesce identical in-flight optimizations into one upstream call
+        self.singleflight = SingleFlight() if self.config.SINGLEFLIGHT_ENABLED else None
+        
+        # Cached upstream status; servers call health_monitor.start() to probe in the background
+        self.health_monitor = HealthMonitor(
+            self.health_check,
+            interval=self.config.HEALTH_PROBE_INTERVAL,
+            failure_threshold=self.config.HEALTH_FAILURE_THRESHOLD
+        )
+        
+        # System prompt per (prompt_style, target_ai), compiled once per process
+        self.templates = get_template_registry()
+        worst_case = self.templates.worst_case_tokens(MAX_PROMPT_LENGTH)
+        if worst_case > self.config.MAX_INPUT_TOKENS:
+            logger.warning(
+                f"MAX_INPUT_TOKENS={self.config.MAX_INPUT_TOKENS} is below the ~{worst_case} tokens a "
+                f"{MAX_PROMPT_LENGTH}-character prompt can need; /optimize will reject some prompts /validate accepts"
+            )
+
+    def optimize_prompt(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                        clarifications: Optional[str] = None, use_cache: bool = True,
+                        routing: Optional[Dict] = None, session_id: Optional[str] = None) -> Dict:
         """
         Optimize a prompt using the 4-D methodology via DeepSeek API
         
@@ -93,244 +232,685 @@ For Complex Requests:
             prompt_style: "BASIC" or "DETAIL"
             target_ai: "ChatGPT", "Claude", "Gemini", or "Other"
             clarifications: Additional context from user (for DETAIL mode stage 2)
+            use_cache: Serve and store results through the result cache
+            routing: Per-request model/max_tokens/temperature overrides for the router
+            session_id: The session_id returned with the questions, sent with the
+                answers (DETAIL stage two) or when skipping them (BASIC)
             
         Returns:
             Dict containing optimized prompt and metadata, or clarifying questions
+            (with a session_id when sessions are enabled).
+            "cache_status" is set to HIT, NEAR_HIT, MISS, BYPASS, COALESCED or SPECULATIVE.
         """
+        speculation = self._speculation_for(session_id, raw_prompt, prompt_style, target_ai, routing)
+        if speculation is not None:
+            result = self.speculator.claim(speculation, self._speculation_wait())
+            if result is not None:
+                return self._speculative_result(result)
+        
+        cache_key, cached = self._cache_lookup(raw_prompt, prompt_style, target_ai, clarifications, use_cache, routing)
+        if cached is not None:
+            return cached
+        
+        near_duplicate_entry = self._near_duplicate_entry(raw_prompt, prompt_style, target_ai, clarifications, routing)
+        if not self.singleflight:
+            result = self._optimize_uncached(raw_prompt, prompt_style, target_ai, clarifications, routing, session_id)
+            return self._cache_store(cache_key, result, near_duplicate_entry)
+        
+        flight_key = cache_key or make_cache_key(raw_prompt, prompt_style, target_ai, clarifications, routing)
+        try:
+            result, shared = self.singleflight.do(
+                flight_key,
+                lambda: self._optimize_uncached(raw_prompt, prompt_style, target_ai, clarifications, routing, session_id)
+            )
+        except DeadlineExceeded as e:
+            # Our budget ran out while waiting on the identical in-flight request
+            return self._optimization_error(e)
+        return self._finish_flight(cache_key, result, shared, raw_prompt, target_ai, near_duplicate_entry)
+
+    def optimize_prompt_stream(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                               clarifications: Optional[str] = None, use_cache: bool = True,
+                               routing: Optional[Dict] = None,
+                               session_id: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Stream an optimization as (event, data) pairs
+        
+        Emits "token" events for each content delta, a section event
+        ("optimized_prompt", "improvements", "techniques_applied", "pro_tip")
+        as soon as that section closes, and a final "done" event carrying the
+        same result optimize_prompt would return. Failures emit "error".
+        """
+        # DETAIL stage one returns questions, which are short enough to send whole
+        if prompt_style == "DETAIL" and clarifications is None:
+            yield "done", self.optimize_prompt(raw_prompt, prompt_style, target_ai, clarifications, use_cache,
+                                               routing=routing, session_id=session_id)
+            return
+        
+        cached = None
+        speculation = self._speculation_for(session_id, raw_prompt, prompt_style, target_ai, routing)
+        if speculation is not None:
+            cached = self.speculator.claim(speculation, self._speculation_wait())
+            if cached is not None:
+                cached = self._speculative_result(cached)
+        
+        cache_key = None
+        if cached is None:
+            cache_key, cached = self._cache_lookup(raw_prompt, prompt_style, target_ai, clarifications, use_cache, routing)
+        if cached is not None:
+            for field in StreamingComponentParser.FIELDS:
+                if cached.get(field):
+                    yield field, {"value": cached[field]}
+            yield "done", cached
+            return
+        
+        logger.info("Streaming optimization: style=%s, has_clarifications=%s", prompt_style, clarifications is not None)
+        try:
+            if self.circuit:
+                self.circuit.reject_if_open()
+            payload = self._build_optimization_payload(raw_prompt, prompt_style, target_ai, clarifications,
+                                                       stream=True, routing=routing, session_id=session_id)
+            parser = StreamingComponentParser()
+            chunks = []
+            labels = {"model": payload["model"], "prompt_style": prompt_style, "target_ai": target_ai}
+            start = time.perf_counter()
+            
+            for delta in self._stream_deepseek_api(payload, clarifications is not None):
+                if not chunks:
+                    metrics.observe_stage("first_token", time.perf_counter() - start, **labels)
+                chunks.append(delta)
+                yield "token", {"text": delta}
+                for field, value in parser.feed(delta):
+                    yield field, {"value": value}
+            
+            for field, value in parser.close():
+                yield field, {"value": value}
+            metrics.observe_stage("upstream", time.perf_counter() - start, **labels)
+            
+            result = self._parse_response({"choices": [{"message": {"content": "".join(chunks)}}]})
+        except CircuitOpenError:
+            result = self._degraded_result(raw_prompt, prompt_style, target_ai, clarifications)
+            for field in StreamingComponentParser.FIELDS:
+                if result.get(field):
+                    yield field, {"value": result[field]}
+        except Exception as e:
+            logger.error(f"Streaming optimization failed: {str(e)}")
+            yield "error", {"error": True, "message": str(e)}
+            return
+        
+        yield "done", self._cache_store(cache_key, result,
+                                        self._near_duplicate_entry(raw_prompt, prompt_style, target_ai, clarifications, routing))
+
+    def _cache_lookup(self, raw_prompt: str, prompt_style: str, target_ai: str, clarifications: Optional[str],
+                      use_cache: bool, routing: Optional[Dict] = None) -> Tuple[Optional[str], Optional[Dict]]:
+        """Return (cache_key, cached_result); the key is None when caching is off"""
+        if not (self.cache and use_cache):
+            return None, None
+        cache_key = make_cache_key(raw_prompt, prompt_style, target_ai, clarifications, routing)
+        with metrics.span("cache", prompt_style=prompt_style, target_ai=target_ai):
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving optimization from cache")
+                cached["cache_status"] = "HIT"
+            else:
+                cached = self._near_duplicate_lookup(raw_prompt, prompt_style, target_ai, clarifications, routing)
+        if cached is not None and cached.get("needs_clarification"):
+            self._open_session(cached, raw_prompt, target_ai)
+        return cache_key, cached
+
+    @staticmethod
+    def _near_duplicate_entry(raw_prompt: str, prompt_style: str, target_ai: str, clarifications: Optional[str],
+                              routing: Optional[Dict] = None) -> Optional[Tuple[str, str]]:
+        """(namespace, text) under which a request is indexed for near-duplicate reuse"""
+        # Requests with routing overrides asked for a specific answer, so they are never matched
+        if routing:
+            return None
+        # Stage-one questions and final prompts are different kinds of result
+        stage = "answered" if clarifications is not None else "initial"
+        text = raw_prompt if clarifications is None else f"{raw_prompt}\n{clarifications}"
+        return f"{prompt_style}:{target_ai}:{stage}", text
+
+    def _near_duplicate_lookup(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                               clarifications: Optional[str], routing: Optional[Dict] = None) -> Optional[Dict]:
+        """Cached result of the most similar earlier prompt, if one is similar enough"""
+        entry = self._near_duplicate_entry(raw_prompt, prompt_style, target_ai, clarifications, routing)
+        if not (self.near_duplicates and entry):
+            return None
+        match = self.near_duplicates.query(*entry)
+        if match is None:
+            return None
+        key, similarity = match
+        cached = self.cache.get(key, count=False)
+        if cached is None:
+            # The result has since been evicted from the cache
+            self.near_duplicates.remove(key)
+            return None
+        logger.info("Serving optimization of a near-duplicate prompt from cache (similarity=%.2f)", similarity)
+        cached["cache_status"] = "NEAR_HIT"
+        return cached
+
+    def _finish_flight(self, cache_key: Optional[str], result: Dict, shared: bool, raw_prompt: str, target_ai: str,
+                       near_duplicate_entry: Optional[Tuple[str, str]] = None) -> Dict:
+        """
+        Give each coalesced caller its own copy, and its own session for
+        questions; only the caller that ran the call stores it
+        """
+        result = dict(result)
+        if shared:
+            logger.info("Optimization coalesced with an identical in-flight request")
+            result["cache_status"] = "COALESCED"
+            if result.get("needs_clarification"):
+                self._open_session(result, raw_prompt, target_ai)
+            return result
+        return self._cache_store(cache_key, result, near_duplicate_entry)
+
+    def _cache_store(self, cache_key: Optional[str], result: Dict,
+                     near_duplicate_entry: Optional[Tuple[str, str]] = None) -> Dict:
+        """Store a fresh result if it is cacheable and tag it with its cache status"""
+        if cache_key and self._is_cacheable(result):
+            # A session belongs to the user it was opened for; hits get their own
+            self.cache.set(cache_key, {field: value for field, value in result.items() if field != "session_id"})
+            if self.near_duplicates and near_duplicate_entry:
+                namespace, text = near_duplicate_entry
+                self.near_duplicates.add(namespace, cache_key, text)
+        result["cache_status"] = "MISS" if cache_key else "BYPASS"
+        return result
+
+    @staticmethod
+    def _is_cacheable(result: Dict) -> bool:
+        """Only cache real upstream answers, never errors or local fallbacks"""
+        if result.get("error"):
+            return False
+        return bool(result.get("needs_clarification") or result.get("raw_response"))
+
+    def _optimize_uncached(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                           clarifications: Optional[str] = None, routing: Optional[Dict] = None,
+                           session_id: Optional[str] = None) -> Dict:
+        """Run the optimization against the DeepSeek API without consulting the cache"""
         try:
+            if self.circuit:
+                self.circuit.reject_if_open()
+            
             # For DETAIL mode without clarifications, first ask questions
             if prompt_style == "DETAIL" and clarifications is None:
                 logger.info("DETAIL mode: Getting clarifying questions")
                 return self._get_clarifying_questions(raw_prompt, target_ai)
             
             # For BASIC mode or DETAIL with clarifications, proceed with optimization
-            logger.info(f"Optimizing prompt: style={prompt_style}, has_clarifications={clarifications is not None}")
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": self.methodology
-                },
-                {
-                    "role": "user",
-                    "content": self._build_user_message(raw_prompt, prompt_style, target_ai, clarifications)
-                }
-            ]
+            logger.info("Optimizing prompt: style=%s, has_clarifications=%s", prompt_style, clarifications is not None)
             
-            # Select model based on complexity
-            model = self.config.REASONING_MODEL if prompt_style == "DETAIL" else self.config.DEFAULT_MODEL
+            payload = self._build_optimization_payload(raw_prompt, prompt_style, target_ai, clarifications,
+                                                       routing=routing, session_id=session_id)
             
-            # Reduce token count for faster processing, especially with clarifications
-            max_tokens = 1500 if clarifications else 2000
-            
-            payload = {
-                "model": model,
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": max_tokens,
-                "stream": False
-            }
+            labels = {"model": payload["model"], "prompt_style": prompt_style, "target_ai": target_ai}
             
             # Make API call to DeepSeek with longer timeout for clarification stage
             is_clarification_stage = clarifications is not None
-            response = self._call_deepseek_api(payload, is_clarification_stage)
+            with metrics.span("upstream", **labels):
+                response = self._call_deepseek_api(payload, is_clarification_stage)
             
             # Parse and format the response
-            return self._parse_response(response)
+            with metrics.span("parse", **labels):
+                return self._parse_response(response)
             
+        except CircuitOpenError:
+            return self._degraded_result(raw_prompt, prompt_style, target_ai, clarifications)
         except Exception as e:
             logger.error(f"Optimization failed: {str(e)}")
-            return {
-                "error": str(e),
-                "optimized_prompt": None,
-                "improvements": [],
-                "techniques_applied": [],
-                "pro_tip": "Try again or switch to BASIC mode if the issue persists."
-            }
+            return self._optimization_error(e)
+
+    def _degraded_result(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                         clarifications: Optional[str] = None) -> Dict:
+        """Local rule-based optimization, served while the upstream circuit is open"""
+        logger.warning("Upstream circuit open; serving a locally optimized prompt")
+        with metrics.span("degraded", prompt_style=prompt_style, target_ai=target_ai):
+            return optimize_locally(raw_prompt, prompt_style, target_ai, clarifications)
+
+    @staticmethod
+    def _optimization_error(error: Exception) -> Dict:
+        """Response used when the optimization stage fails"""
+        result = {
+            "error": str(error),
+            "optimized_prompt": None,
+            "improvements": [],
+            "techniques_applied": [],
+            "pro_tip": "Try again or switch to BASIC mode if the issue persists."
+        }
+        if isinstance(error, DeadlineExceeded):
+            result["deadline_exceeded"] = True
+        return result
 
     def _get_clarifying_questions(self, raw_prompt: str, target_ai: str) -> Dict:
         """Get clarifying questions for DETAIL mode optimization"""
         try:
-            question_system_prompt = """
-You are an expert prompt consultant. Analyze the user's prompt and ask 2-3 specific clarifying questions.
+            payload = self._build_questions_payload(raw_prompt, target_ai)
+            with metrics.span("questions", model=payload["model"], prompt_style="DETAIL", target_ai=target_ai):
+                response = self._call_deepseek_api(payload, False)  # Questions are simpler, use shorter timeout
+            return self._questions_result(response, raw_prompt, target_ai, payload)
 
-FOCUS ON:
-- Purpose/Goal
-- Context/Audience  
-- Output Requirements
-
-FORMAT:
-Analysis: [Brief assessment]
-
-Questions:
-1. [Question about purpose/goal]
-2. [Question about context/audience]
-3. [Question about output format] (if needed)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            # Fallback to basic optimization if questions fail
+            logger.error(f"Failed to get clarifying questions: {str(e)}")
+            return self._questions_fallback()
+    
+    def _build_questions_payload(self, raw_prompt: str, target_ai: str) -> Dict:
+        """Build the chat completion payload for the DETAIL question stage"""
+        # The system prompt is the one a DETAIL optimization for this target sends, so both
+        # stages share one cacheable upstream prefix; the stage instructions follow in the
+        # user message, and the prompt itself comes last.
+        messages = [
+            {
+                "role": "system", 
+                "content": self.templates.get("DETAIL", target_ai).system
+            },
+            {
+                "role": "user",
+                "content": f"""{QUESTION_STAGE_INSTRUCTIONS}
+Target AI: {target_ai}
 
-Keep it concise and specific.
-"""
+Raw Prompt: {raw_prompt}"""
+            }
+        ]
+
+        return {
+            "model": self.config.DEFAULT_MODEL,  # Use faster model for questions
+            "messages": messages,
+            "temperature": 0.6,
+            "max_tokens": QUESTIONS_MAX_TOKENS,  # Reduced tokens for faster response
+            "stream": False
+        }
+    
+    def _questions_result(self, api_response: Dict, raw_prompt: str, target_ai: str, payload: Dict) -> Dict:
+        """
+        Shape a question-stage completion into the needs_clarification response,
+        opening a session that holds the conversation so far
+        """
+        response_content = api_response['choices'][0]['message']['content']
+
+        result = {
+            "needs_clarification": True,
+            "questions": response_content,
+            "optimized_prompt": None,
+            "improvements": [],
+            "techniques_applied": [],
+            "pro_tip": "Please answer the questions above to get a comprehensive optimization."
+        }
+        return self._open_session(result, raw_prompt, target_ai, payload)
 
+    def _open_session(self, result: Dict, raw_prompt: str, target_ai: str, payload: Optional[Dict] = None) -> Dict:
+        """
+        Attach a new session (and start its speculation) to a questions result;
+        a cached or coalesced result replays the questions after this prompt's
+        question-stage messages
+        """
+        if not self.sessions:
+            return result
+        if payload is None:
+            payload = self._build_questions_payload(raw_prompt, target_ai)
+        messages = payload["messages"] + [{"role": "assistant", "content": result["questions"]}]
+        session = self.sessions.create(raw_prompt, target_ai, payload["model"], messages)
+        result["session_id"] = session.id
+        if self.speculator and not (self.circuit and self.circuit.state != CircuitBreaker.CLOSED):
+            # While the circuit is open the speculation would only be a local fallback
+            self._speculate(session)
+        return result
+    
+    def _speculate(self, session: DetailSession):
+        """Start a BASIC optimization of the session's prompt while the user answers the questions"""
+        session.speculation = self.speculator.start(
+            lambda: self.optimize_prompt(session.raw_prompt, "BASIC", session.target_ai)
+        )
+    
+    def _speculation_for(self, session_id: Optional[str], raw_prompt: str, prompt_style: str, target_ai: str,
+                         routing: Optional[Dict] = None) -> Optional[Speculation]:
+        """The speculation started for a session whose user skipped the questions and asked for BASIC"""
+        # The speculation ran without overrides, so a request with its own routing gets a fresh answer
+        if not (self.speculator and session_id and prompt_style == "BASIC") or routing:
+            return None
+        session = self.sessions.get(session_id, raw_prompt, target_ai)
+        return session.speculation if session else None
+    
+    def _speculation_wait(self) -> float:
+        """How long a skip may wait for a speculation that is still running"""
+        deadline = current_deadline()
+        return deadline.remaining() if deadline else self.config.REQUEST_DEADLINE_SECONDS
+    
+    @staticmethod
+    def _speculative_result(result: Dict) -> Dict:
+        logger.info("Serving the speculative BASIC optimization of a skipped DETAIL prompt")
+        result["cache_status"] = "SPECULATIVE"
+        return result
+    
+    def _discard_speculation(self, session: DetailSession):
+        """The session was answered, expired or evicted; its speculation is no longer needed"""
+        if self.speculator and session.speculation is not None:
+            self.speculator.discard(session.speculation)
+    
+    @staticmethod
+    def _questions_fallback() -> Dict:
+        """Response used when the question stage fails"""
+        return {
+            "error": False,
+            "optimized_prompt": "Unable to get clarifying questions. Please try BASIC mode instead.",
+            "improvements": ["Please switch to BASIC mode for immediate optimization"],
+            "techniques_applied": [],
+            "pro_tip": "If you're experiencing issues with DETAIL mode, try BASIC mode for faster results."
+        }
+    
+    def _build_optimization_payload(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                                    clarifications: Optional[str] = None, stream: bool = False,
+                                    routing: Optional[Dict] = None, session_id: Optional[str] = None) -> Dict:
+        """
+        Build the chat completion payload for the optimization stage
+        
+        With a live DETAIL session, stage two always sees the questions the
+        answers refer to. When it runs on the stage-one model, the stage-one
+        conversation is replayed byte for byte and the answers follow as the
+        next user turn, so the upstream context cache covers everything up to
+        the answers. The cache is per model, so a stage two routed to another
+        model gets a single-turn message with the questions folded in instead.
+        """
+        # Streaming relies on the markdown sections, so structured output is for whole responses only
+        structured = self.config.STRUCTURED_OUTPUT and not stream
+        
+        # Select model, token budget and temperature based on prompt complexity
+        decision = apply_overrides(self.router.route(raw_prompt, prompt_style, target_ai, clarifications), routing)
+        logger.info("Routing decision (%s): %s", self.router.name, decision)
+        metrics.ROUTING_DECISIONS.inc(model=decision.model, tier=decision.tier)
+        model = decision.model
+        
+        session = None
+        if self.sessions and session_id and clarifications:
+            session = self.sessions.get(session_id, raw_prompt, target_ai)
+            if session is None:
+                logger.info("DETAIL session expired or unknown; optimizing without it")
+            else:
+                self._discard_speculation(session)
+        
+        if session and session.model == model:
+            # The stage-one system prompt must stay unchanged, so JSON instructions go in the new turn
+            answers = self._build_answers_message(prompt_style, target_ai, clarifications)
+            messages = session.messages + [
+                {
+                    "role": "user",
+                    "content": answers + STRUCTURED_OUTPUT_INSTRUCTIONS if structured else answers
+                }
+            ]
+        else:
+            system_prompt = self.templates.get(prompt_style, target_ai).system_prompt(structured)
+            questions = session.questions if session else None
             messages = [
                 {
-                    "role": "system", 
-                    "content": question_system_prompt
+                    "role": "system",
+                    "content": system_prompt
                 },
                 {
                     "role": "user",
-                    "content": f"""
-Please analyze this prompt and ask clarifying questions for optimization targeting {target_ai}:
-
-Raw Prompt: {raw_prompt}
-
-Target AI: {target_ai}
-
-What 2-3 questions would help me optimize this prompt most effectively?
-"""
+                    "content": self._build_user_message(raw_prompt, prompt_style, target_ai, clarifications, questions)
                 }
             ]
+        
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": decision.temperature,
+            "max_tokens": decision.max_tokens,
+            "stream": stream
+        }
+        # JSON mode is only offered for the chat model; the reasoner follows the instructions alone
+        if structured and model == self.config.DEFAULT_MODEL:
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+    
+    def _build_user_message(self, raw_prompt: str, prompt_style: str, target_ai: str, clarifications: Optional[str] = None,
+                            questions: Optional[str] = None) -> str:
+        """
+        Build the user message for the DeepSeek API call
+        
+        Fixed text comes first and the raw prompt and clarifications last, so
+        requests with the same style and target share the longest possible
+        byte-identical prefix for upstream context caching.
+        """
+        base_message = f"""Please optimize the raw prompt below. Apply your 4-D methodology and provide the response in the appropriate format based on the complexity of the request.
 
-            payload = {
-                "model": self.config.DEFAULT_MODEL,  # Use faster model for questions
-                "messages": messages,
-                "temperature": 0.6,
-                "max_tokens": 400,  # Reduced tokens for faster response
-                "stream": False
-            }
-
-            response = self._call_deepseek_api(payload, False)  # Questions are simpler, use shorter timeout
-            response_content = response['choices'][0]['message']['content']
-
-            return {
-                "needs_clarification": True,
-                "questions": response_content,
-                "optimized_prompt": None,
-                "improvements": [],
-                "techniques_applied": [],
-                "pro_tip": "Please answer the questions above to get a comprehensive optimization."
-            }
+Optimization Style: {prompt_style}
+Target AI: {target_ai}
 
-        except Exception as e:
-            # Fallback to basic optimization if questions fail
-            logger.error(f"Failed to get clarifying questions: {str(e)}")
-            return {
-                "error": False,
-                "optimized_prompt": "Unable to get clarifying questions. Please try BASIC mode instead.",
-                "improvements": ["Please switch to BASIC mode for immediate optimization"],
-                "techniques_applied": [],
-                "pro_tip": "If you're experiencing issues with DETAIL mode, try BASIC mode for faster results."
-            }
-    
-    def _build_user_message(self, raw_prompt: str, prompt_style: str, target_ai: str, clarifications: Optional[str] = None) -> str:
-        """Build the user message for the DeepSeek API call"""
-        base_message = f"""
-Please optimize the following prompt using the {prompt_style} mode approach, targeting {target_ai}:
+Raw Prompt: {raw_prompt}"""
 
-Raw Prompt: {raw_prompt}
+        if questions:
+            base_message += f"""
 
-Optimization Style: {prompt_style}
-Target AI: {target_ai}"""
+Your Clarifying Questions:
+{questions}"""
 
         if clarifications:
             base_message += f"""
 
 Additional Context from User:
 {clarifications}"""
-
-        base_message += """
-
-Apply your 4-D methodology and provide the response in the appropriate format based on the complexity of the request."""
         
         return base_message
     
-    def _call_deepseek_api(self, payload: Dict, is_clarification_stage: bool = False) -> Dict:
-        """Make the actual API call to DeepSeek"""
-        headers = {
-            "Authorization": f"Bearer {self.config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
+    @staticmethod
+    def _build_answers_message(prompt_style: str, target_ai: str, clarifications: str) -> str:
+        """Stage-two user turn when continuing a DETAIL session"""
+        return f"""Here are my answers to your questions:
+{clarifications}
+
+Now optimize the raw prompt above with these answers in mind. Apply your 4-D methodology and provide the response in the appropriate format based on the complexity of the request.
+
+Optimization Style: {prompt_style}
+Target AI: {target_ai}"""
+    
+    def _call_deepseek_api(self, payload: Dict, is_clarification_stage: bool = False,
+                           timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                           probe: bool = False) -> Dict:
+        """
+        Make the actual API call to DeepSeek
         
+        The call gets the smaller of its stage timeout and the time left on the
+        current request deadline, and may be hedged (see hedging.HedgePolicy).
+        Raises CircuitOpenError without calling out while the circuit is open.
+        Health probes (probe=True) bypass the circuit breaker and hedging and
+        record nothing themselves; HealthMonitor.probe_now records the outcome.
+        """
         # Use longer timeout for clarification optimization, shorter for questions
-        timeout = 35 if is_clarification_stage else 20
+        if timeout is None:
+            timeout = self.config.UPSTREAM_CLARIFICATION_TIMEOUT if is_clarification_stage else self.config.UPSTREAM_TIMEOUT
         
-        response = requests.post(
-            self.config.DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=timeout
-        )
+        model = payload.get("model", "")
+        deadline = current_deadline()
+        # A request whose own budget is already spent raises here, before the circuit sees it
+        budget = deadline.cap(timeout) if deadline else timeout
+        
+        def call():
+            return self.backends.call(payload, lambda backend, backend_payload: self.client.post_json(
+                backend.url,
+                backend_payload,
+                headers=backend.headers,
+                timeout=timeout,
+                max_retries=max_retries,
+                deadline=deadline,
+                retry_statuses=self.backends.retry_statuses(model)
+            ))
+        
+        circuit = self.circuit if not probe else None
+        if circuit:
+            circuit.before_call()
         
-        if response.status_code != 200:
-            raise Exception(f"DeepSeek API error: {response.status_code} - {response.text}")
+        start = time.perf_counter()
+        try:
+            if self.hedge_policy and not probe:
+                response, _ = hedged_call(self.hedge_policy, self.hedge_executor, model, call, timeout=budget)
+            else:
+                response = call()
+        except DeadlineExceeded:
+            # Our own budget ran out mid-call; not evidence that the upstream is down, so
+            # only the slow-call threshold judges it
+            if circuit:
+                circuit.record(time.perf_counter() - start, failed=False)
+            if not probe:
+                metrics.record_upstream(model, None, success=False)
+            raise
+        except Exception as e:
+            if circuit:
+                circuit.record(time.perf_counter() - start, failed=True)
+            # A probe's outcome is recorded by HealthMonitor.probe_now alone
+            if not probe:
+                self.health_monitor.record_failure(str(e))
+                metrics.record_upstream(model, None, success=False)
+            raise
+        except BaseException:
+            # Cancelled (a lost hedge, a disconnected client): no outcome to judge the upstream by
+            if circuit:
+                circuit.release()
+            raise
+        
+        if probe:
+            return response
+        elapsed = time.perf_counter() - start
+        if circuit:
+            circuit.record(elapsed, failed=False)
+        if self.hedge_policy:
+            self.hedge_policy.record(model, elapsed)
+        self.health_monitor.record_success()
+        metrics.record_upstream(model, response.get("usage"))
+        return response
+    
+    def _stream_deepseek_api(self, payload: Dict, is_clarification_stage: bool = False) -> Iterator[str]:
+        """
+        Stream a completion from DeepSeek, yielding content deltas as they arrive
+        
+        The circuit breaker judges streams on their time to first token.
+        """
+        timeout = self.config.UPSTREAM_CLARIFICATION_TIMEOUT if is_clarification_stage else self.config.UPSTREAM_TIMEOUT
+        
+        deadline = current_deadline()
+        # A request whose own budget is already spent raises here, before the circuit sees it
+        if deadline:
+            deadline.cap(timeout)
+        if self.circuit:
+            self.circuit.before_call()
+        start = time.perf_counter()
+        first_token_seconds = None
+        
+        usage = None
+        try:
+            retry_statuses = self.backends.retry_statuses(payload.get("model", ""))
+            for chunk in self.backends.stream(payload, lambda backend, backend_payload: self.client.stream_json(
+                backend.url,
+                backend_payload,
+                headers=backend.headers,
+                timeout=timeout,
+                deadline=deadline,
+                retry_statuses=retry_statuses
+            )):
+                # The final chunk carries the usage block
+                usage = chunk.get("usage") or usage
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                # deepseek-reasoner also streams reasoning_content, which is not part of the answer
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    if first_token_seconds is None:
+                        first_token_seconds = time.perf_counter() - start
+                    yield delta
+        except DeadlineExceeded:
+            # Judged by the slow-call threshold only, as in _call_deepseek_api
+            if self.circuit:
+                self.circuit.record(time.perf_counter() - start, failed=False)
+            metrics.record_upstream(payload.get("model", ""), None, success=False)
+            raise
+        except Exception as e:
+            if self.circuit:
+                self.circuit.record(time.perf_counter() - start, failed=True)
+            self.health_monitor.record_failure(str(e))
+            metrics.record_upstream(payload.get("model", ""), None, success=False)
+            raise
+        except BaseException:
+            # GeneratorExit when the client disconnects mid-stream: no outcome either way
+            if self.circuit:
+                self.circuit.release()
+            raise
         
-        return response.json()
+        if self.circuit:
+            self.circuit.record(first_token_seconds or time.perf_counter() - start, failed=False)
+        self.health_monitor.record_success()
+        metrics.record_upstream(payload.get("model", ""), usage)
     
     def _parse_response(self, api_response: Dict) -> Dict:
         """Parse the DeepSeek API response and extract components"""
         try:
             content = api_response['choices'][0]['message']['content']
             
-            # Parse the structured response from Lyra
-            parsed = self._extract_components(content)
+            # Structured JSON if the model returned it, else the tolerant markdown parser
+            parsed, parser = parse_completion(content)
+            metrics.PARSE_RESULTS.inc(parser=parser)
+            if parser == "raw":
+                logger.warning("Could not find optimization sections in response; returning raw text")
             
             return {
                 "error": False,
-                "optimized_prompt": parsed.get("optimized_prompt", content),
+                "optimized_prompt": parsed.get("optimized_prompt") or content,
                 "improvements": parsed.get("improvements", []),
                 "techniques_applied": parsed.get("techniques_applied", []),
                 "pro_tip": parsed.get("pro_tip", ""),
                 "raw_response": content
             }
             
-        except (KeyError, IndexError) as e:
+        except (KeyError, IndexError, TypeError) as e:
             raise Exception(f"Failed to parse DeepSeek response: {str(e)}")
     
     def _extract_components(self, content: str) -> Dict:
         """Extract structured components from the optimization response"""
-        components = {}
-        
-        # Extract optimized prompt
-        if "**Your Optimized Prompt:**" in content:
-            start = content.find("**Your Optimized Prompt:**") + len("**Your Optimized Prompt:**")
-            end = content.find("**", start)
-            if end == -1:
-                end = content.find("\n\n", start)
-            if end != -1:
-                components["optimized_prompt"] = content[start:end].strip()
-        
-        # Extract improvements
-        improvements = []
-        if "**What Changed:**" in content:
-            start = content.find("**What Changed:**") + len("**What Changed:**")
-            end = content.find("**", start)
-            if end != -1:
-                improvements.append(content[start:end].strip())
-        elif "**Key Improvements:**" in content:
-            start = content.find("**Key Improvements:**") + len("**Key Improvements:**")
-            end = content.find("**", start)
-            if end != -1:
-                improvements_text = content[start:end].strip()
-                # Split by bullet points
-                improvements = [imp.strip("• ").strip() for imp in improvements_text.split("•") if imp.strip()]
-        
-        components["improvements"] = improvements
-        
-        # Extract techniques applied
-        if "**Techniques Applied:**" in content:
-            start = content.find("**Techniques Applied:**") + len("**Techniques Applied:**")
-            end = content.find("**", start)
-            if end == -1:
-                end = len(content)
-            if end != -1:
-                techniques_text = content[start:end].strip()
-                components["techniques_applied"] = [techniques_text] if techniques_text else []
-        
-        # Extract pro tip
-        if "**Pro Tip:**" in content:
-            start = content.find("**Pro Tip:**") + len("**Pro Tip:**")
-            end = len(content)
-            components["pro_tip"] = content[start:end].strip()
-        
-        return components
+        return parse_completion(content)[0]
+
+    def collect_metrics(self):
+        """Scrape-time gauges for /metrics (see metrics.MetricsRegistry.register_collector)"""
+        if self.cache:
+            cache_stats = self.cache.stats()
+            yield ("prompt_optimizer_cache_entries", "gauge", "Entries in the in-memory result cache", {}, cache_stats["entries"])
+            yield ("prompt_optimizer_cache_bytes", "gauge", "Approximate size of the in-memory result cache", {}, cache_stats["bytes"])
+            yield ("prompt_optimizer_cache_lookups_total", "counter", "Result cache lookups", {"result": "hit"}, cache_stats["hits"])
+            yield ("prompt_optimizer_cache_lookups_total", "counter", "Result cache lookups", {"result": "miss"}, cache_stats["misses"])
+        if self.near_duplicates:
+            near_stats = self.near_duplicates.stats()
+            yield ("prompt_optimizer_near_duplicate_entries", "gauge", "Prompts in the near-duplicate index", {}, near_stats["entries"])
+            yield ("prompt_optimizer_near_duplicate_lookups_total", "counter", "Near-duplicate lookups after an exact cache miss", {"result": "hit"}, near_stats["hits"])
+            yield ("prompt_optimizer_near_duplicate_lookups_total", "counter", "Near-duplicate lookups after an exact cache miss", {"result": "miss"}, near_stats["misses"])
+            yield ("prompt_optimizer_near_duplicate_evictions_total", "counter", "Entries evicted from the near-duplicate index", {}, near_stats["evictions"])
+        if self.sessions:
+            session_stats = self.sessions.stats()
+            yield ("prompt_optimizer_detail_sessions", "gauge", "Open DETAIL sessions", {}, session_stats["entries"])
+            yield ("prompt_optimizer_detail_sessions_total", "counter", "DETAIL sessions by event", {"event": "created"}, session_stats["created"])
+            yield ("prompt_optimizer_detail_sessions_total", "counter", "DETAIL sessions by event", {"event": "resumed"}, session_stats["resumed"])
+            yield ("prompt_optimizer_detail_sessions_total", "counter", "DETAIL sessions by event", {"event": "missed"}, session_stats["missed"])
+        if self.speculator:
+            yield from self.speculator.collect_metrics()
+        yield from self.backends.collect_metrics()
+        yield from self.templates.collect_metrics()
+        if self.singleflight:
+            flight_stats = self.singleflight.stats()
+            yield ("prompt_optimizer_singleflight_in_flight", "gauge", "Distinct optimizations currently in flight", {}, flight_stats["in_flight"])
+            yield ("prompt_optimizer_singleflight_calls_total", "counter", "Optimizations by coalescing outcome", {"outcome": "executed"}, flight_stats["executed"])
+            yield ("prompt_optimizer_singleflight_calls_total", "counter", "Optimizations by coalescing outcome", {"outcome": "coalesced"}, flight_stats["coalesced"])
+        if self.hedge_policy:
+            hedge_stats = self.hedge_policy.stats()
+            yield ("prompt_optimizer_upstream_hedges_total", "counter", "Upstream calls by hedging outcome", {"outcome": "eligible"}, hedge_stats["calls"])
+            yield ("prompt_optimizer_upstream_hedges_total", "counter", "Upstream calls by hedging outcome", {"outcome": "hedged"}, hedge_stats["hedged"])
+            yield ("prompt_optimizer_upstream_hedges_total", "counter", "Upstream calls by hedging outcome", {"outcome": "hedge_won"}, hedge_stats["hedge_wins"])
+        if self.circuit:
+            circuit_stats = self.circuit.stats()
+            yield ("prompt_optimizer_circuit_open", "gauge", "1 while the upstream circuit breaker is open", {}, 1 if circuit_stats["state"] == CircuitBreaker.OPEN else 0)
+            yield ("prompt_optimizer_circuit_opened_total", "counter", "Times the upstream circuit breaker opened", {}, circuit_stats["times_opened"])
+            yield ("prompt_optimizer_circuit_rejected_total", "counter", "Upstream calls refused by the open circuit", {}, circuit_stats["rejected"])
+        health_stats = self.health_monitor.stats()
+        yield ("prompt_optimizer_upstream_healthy", "gauge", "1 if the cached upstream status is healthy", {}, 1 if self.health_monitor.status == "healthy" else 0)
+        yield ("prompt_optimizer_health_probes_total", "counter", "Background health probes", {"outcome": "sent"}, health_stats["probes"])
+        yield ("prompt_optimizer_health_probes_total", "counter", "Background health probes", {"outcome": "skipped"}, health_stats["probes_skipped"])
 
     def health_check(self) -> Dict:
         """Check if the DeepSeek API is accessible"""
@@ -342,7 +922,7 @@ Apply your 4-D methodology and provide the response in the appropriate format ba
                 "max_tokens": 10
             }
             
-            self._call_deepseek_api(payload)
+            self._call_deepseek_api(payload, timeout=self.config.HEALTH_CHECK_TIMEOUT, max_retries=0, probe=True)
             return {"status": "healthy", "api_accessible": True}
             
         except Exception as e:
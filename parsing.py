@@ -0,0 +1,181 @@
+"""
+Response Parsing
+Structured (JSON) and tolerant single-pass markdown parsers for optimization output
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Schema for the structured output mode; every field is validated by validate_structured_output
+OUTPUT_SCHEMA = {
+    "type": "object",
+    "required": ["optimized_prompt"],
+    "properties": {
+        "optimized_prompt": {"type": "string", "minLength": 1},
+        "improvements": {"type": "array", "items": {"type": "string"}},
+        "techniques_applied": {"type": "array", "items": {"type": "string"}},
+        "pro_tip": {"type": "string"}
+    }
+}
+
+STRUCTURED_OUTPUT_INSTRUCTIONS = """
+OUTPUT FORMAT:
+Respond with a single JSON object and nothing else, using exactly these keys:
+{
+  "optimized_prompt": "<the complete optimized prompt>",
+  "improvements": ["<key improvement>", "..."],
+  "techniques_applied": ["<technique>", "..."],
+  "pro_tip": "<one usage tip>"
+}
+"""
+
+# Heading text -> result field; matched case-insensitively
+SECTION_ALIASES = {
+    "your optimized prompt": "optimized_prompt",
+    "optimized prompt": "optimized_prompt",
+    "improved prompt": "optimized_prompt",
+    "what changed": "improvements",
+    "key improvements": "improvements",
+    "improvements": "improvements",
+    "techniques applied": "techniques_applied",
+    "techniques used": "techniques_applied",
+    "techniques": "techniques_applied",
+    "pro tip": "pro_tip",
+}
+
+# The headings the system prompts ask for (prompts.RESPONSE_FORMATS). Only these may
+# appear without bold or #'s; a plain "Improvements:" or "Techniques:" line is as likely
+# to be part of the optimized prompt itself.
+CANONICAL_HEADINGS = {"your optimized prompt", "what changed", "key improvements", "techniques applied", "pro tip"}
+
+# One alternation over every alias, longest first so "optimized prompt" never shadows
+# "your optimized prompt". A heading is the alias at the start of a line, optionally
+# wrapped in markdown bold or preceded by #'s, followed by a colon or the end of the line.
+_ALIAS_PATTERN = "|".join(re.escape(alias) for alias in sorted(SECTION_ALIASES, key=len, reverse=True))
+_HEADING_RE = re.compile(
+    r"^[ \t]*(?P<marker>(?:#{1,6}[ \t]*)?(?:\*\*|__)?)[ \t]*(?P<alias>" + _ALIAS_PATTERN + r")[ \t]*"
+    r"(?:(?:\*\*|__)[ \t]*:|:[ \t]*(?:\*\*|__)?|(?:\*\*|__)[ \t]*$|[ \t]*$)",
+    re.IGNORECASE | re.MULTILINE
+)
+_BULLET_RE = re.compile(r"^[ \t]*(?:[•\-*–]|\d+[.)])[ \t]+", re.MULTILINE)
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL | re.IGNORECASE)
+
+
+def split_items(text: str) -> List[str]:
+    """Split a section body into list items on bullets, numbering or inline •"""
+    text = text.strip()
+    if not text:
+        return []
+    if "•" in text:
+        parts = text.split("•")
+    elif _BULLET_RE.search(text):
+        parts = _BULLET_RE.split(text)
+    else:
+        return [text]
+    return [" ".join(part.split()) for part in parts if part.strip()]
+
+
+def parse_markdown_sections(content: str) -> Dict:
+    """
+    Single pass over the completion: one regex scan finds every section heading,
+    and each section runs until the next heading. Tolerates bold/italic/#
+    heading styles, colons inside or outside the bold markers and any casing.
+    Aliases outside CANONICAL_HEADINGS only count as headings when marked up.
+    """
+    components = {}
+    matches = [match for match in _HEADING_RE.finditer(content)
+               if match.group("marker") or match.group("alias").lower() in CANONICAL_HEADINGS]
+    for index, match in enumerate(matches):
+        field = SECTION_ALIASES[match.group("alias").lower()]
+        if field in components:
+            continue
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(content)
+        body = content[match.end():end].strip()
+
+        if field in ("improvements", "techniques_applied"):
+            components[field] = split_items(body)
+        elif body:
+            components[field] = body
+
+    components.setdefault("improvements", [])
+    return components
+
+
+def validate_structured_output(data) -> Tuple[Optional[Dict], List[str]]:
+    """
+    Check a decoded JSON object against OUTPUT_SCHEMA
+
+    Scalars where a list is expected are wrapped, and missing optional fields
+    get empty defaults. Returns (normalized, errors); normalized is None when
+    there are errors.
+    """
+    if not isinstance(data, dict):
+        return None, ["expected a JSON object"]
+
+    errors = []
+    normalized = {}
+    for field in OUTPUT_SCHEMA["required"]:
+        if field not in data:
+            errors.append(f"missing required field '{field}'")
+
+    for field, spec in OUTPUT_SCHEMA["properties"].items():
+        value = data.get(field)
+        if value is None:
+            normalized[field] = [] if spec["type"] == "array" else ""
+            continue
+        if spec["type"] == "string":
+            if not isinstance(value, str):
+                errors.append(f"'{field}' must be a string")
+                continue
+            if len(value.strip()) < spec.get("minLength", 0):
+                errors.append(f"'{field}' must not be empty")
+                continue
+            normalized[field] = value.strip()
+        else:
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                errors.append(f"'{field}' must be a list of strings")
+                continue
+            normalized[field] = [item.strip() for item in value if item.strip()]
+
+    return (None, errors) if errors else (normalized, [])
+
+
+def parse_structured_output(content: str) -> Optional[Dict]:
+    """Decode and validate a JSON completion; None if it is not valid structured output"""
+    text = content.strip()
+    fenced = _FENCE_RE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    if not text.startswith("{"):
+        # Tolerate a short preamble before the object
+        start = text.find("{")
+        if start == -1:
+            return None
+        text = text[start:text.rfind("}") + 1]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    normalized, errors = validate_structured_output(data)
+    return normalized
+
+
+def parse_completion(content: str) -> Tuple[Dict, str]:
+    """
+    Parse an optimization completion from either output mode
+
+    Returns:
+        (components, parser) where parser is "json", "markdown" or "raw"
+    """
+    if content.lstrip().startswith(("{", "```")):
+        structured = parse_structured_output(content)
+        if structured is not None:
+            return structured, "json"
+
+    components = parse_markdown_sections(content)
+    if components.get("optimized_prompt"):
+        return components, "markdown"
+    return components, "raw"
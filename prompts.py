@@ -0,0 +1,245 @@
+"""
+System Prompt Templates
+Precompiled system prompts per (prompt_style, target_ai), with local token
+counts used for the input-token budget
+
+Each request uses one style and one target, so a compact template carries
+only that mode's instructions and a note on the target. "full" sends the
+original methodology, covering every mode, on every call.
+"""
+
+import logging
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from config import Config
+from parsing import STRUCTURED_OUTPUT_INSTRUCTIONS
+from routing import estimate_tokens
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROMPT_STYLES = ("BASIC", "DETAIL")
+
+# max_tokens of the DETAIL question stage; a resumed session replays at most this much
+QUESTIONS_MAX_TOKENS = 400
+
+# Fixed text of the optimization user message around the prompt and answers
+MESSAGE_OVERHEAD_TOKENS = 80
+
+# The original system prompt, sent for every style and target with PROMPT_TEMPLATES=full
+METHODOLOGY = """
+You are an expert prompt optimization AI. Apply the 4-D METHODOLOGY to optimize user prompts:
+
+THE 4-D METHODOLOGY:
+1. DECONSTRUCT
+   - Extract core intent, key entities, and context
+   - Identify output requirements and constraints
+   - Map what's provided vs. what's missing
+
+2. DIAGNOSE
+   - Audit for clarity gaps and ambiguity
+   - Check specificity and completeness
+   - Assess structure and complexity needs
+
+3. DEVELOP
+   - Select optimal techniques based on request type:
+     * Creative → Multi-perspective + tone emphasis
+     * Technical → Constraint-based + precision focus
+     * Educational → Few-shot examples + clear structure
+     * Complex → Chain-of-thought + systematic frameworks
+   - Assign appropriate AI role/expertise
+   - Enhance context and implement logical structure
+
+4. DELIVER
+   - Construct optimized prompt
+   - Format based on complexity
+   - Provide implementation guidance
+
+OPTIMIZATION TECHNIQUES:
+- Foundation: Role assignment, context layering, output specs, task decomposition
+- Advanced: Chain-of-thought, few-shot learning, multi-perspective analysis, constraint optimization
+
+OPERATING MODES:
+DETAIL MODE:
+- Gather context with smart defaults
+- Ask 2-3 targeted clarifying questions
+- Provide comprehensive optimization
+
+BASIC MODE:
+- Quick fix primary issues
+- Apply core techniques only
+- Deliver ready-to-use prompt
+
+RESPONSE FORMATS:
+For Simple Requests:
+**Your Optimized Prompt:**
+[Improved prompt]
+
+**What Changed:** [Key improvements]
+
+For Complex Requests:
+**Your Optimized Prompt:**
+[Improved prompt]
+
+**Key Improvements:**
+• [Primary changes and benefits]
+
+**Techniques Applied:** [Brief mention]
+
+**Pro Tip:** [Usage guidance]
+"""
+
+COMPACT_METHODOLOGY = """You are an expert prompt optimization AI. Optimize the user's prompt with the 4-D methodology:
+1. DECONSTRUCT: core intent, key entities, context, output requirements and constraints; what is missing.
+2. DIAGNOSE: clarity gaps, ambiguity, specificity, completeness, structure and complexity needs.
+3. DEVELOP: pick techniques by request type (creative: multi-perspective + tone; technical: constraints + precision; educational: few-shot + clear structure; complex: chain-of-thought + systematic frameworks). Assign an expert role, add context and logical structure.
+4. DELIVER: the optimized prompt, formatted for its complexity, with usage guidance.
+"""
+
+MODE_INSTRUCTIONS = {
+    "BASIC": """
+MODE: BASIC. Quick-fix the primary issues with core techniques only (role assignment, context layering, output specs, task decomposition) and deliver a ready-to-use prompt.
+""",
+    "DETAIL": """
+MODE: DETAIL. Gather context with smart defaults; when asked, ask 2-3 targeted clarifying questions. Then give a comprehensive optimization using foundation techniques (role assignment, context layering, output specs, task decomposition) and advanced ones (chain-of-thought, few-shot learning, multi-perspective analysis, constraint optimization).
+"""
+}
+
+TARGET_NOTES = {
+    "ChatGPT": "TARGET: ChatGPT. Lead with the instruction, use markdown structure and state the output format explicitly.",
+    "Claude": "TARGET: Claude. Separate context, instructions and examples with XML tags and state the desired output explicitly.",
+    "Gemini": "TARGET: Gemini. Keep instructions direct and structured, with explicit constraints on length and format.",
+    "Other": "TARGET: a general-purpose assistant. Keep the prompt model-agnostic and self-contained."
+}
+
+# Headings parsing.py reads back; kept verbatim in every template
+RESPONSE_FORMATS = """
+RESPONSE FORMATS:
+For Simple Requests:
+**Your Optimized Prompt:**
+[Improved prompt]
+
+**What Changed:** [Key improvements]
+
+For Complex Requests:
+**Your Optimized Prompt:**
+[Improved prompt]
+
+**Key Improvements:**
+• [Primary changes and benefits]
+
+**Techniques Applied:** [Brief mention]
+
+**Pro Tip:** [Usage guidance]
+"""
+
+
+def compile_system_prompt(prompt_style: str, target_ai: str, structured: bool = False) -> str:
+    """Compact system prompt for one style and target; structured output replaces the markdown formats"""
+    target_note = TARGET_NOTES.get(target_ai, f"TARGET: {target_ai}.")
+    output_format = STRUCTURED_OUTPUT_INSTRUCTIONS if structured else RESPONSE_FORMATS
+    return COMPACT_METHODOLOGY + MODE_INSTRUCTIONS[prompt_style] + target_note + "\n" + output_format
+
+
+class PromptTemplate(NamedTuple):
+    """A system prompt and its plain and structured-output variants' token counts"""
+    prompt_style: str
+    target_ai: str
+    system: str
+    structured_system: str
+    tokens: int
+    structured_tokens: int
+
+    def system_prompt(self, structured: bool = False) -> str:
+        return self.structured_system if structured else self.system
+
+    def token_count(self, structured: bool = False) -> int:
+        return self.structured_tokens if structured else self.tokens
+
+
+class TemplateRegistry:
+    """
+    System prompts for every (prompt_style, target_ai) pair, compiled once
+
+    Targets outside TARGET_NOTES are compiled on first use. `structured`
+    (STRUCTURED_OUTPUT) selects the variant non-streaming optimizations send,
+    which is the one token budgets and metrics count.
+    """
+
+    def __init__(self, mode: str = "compact", max_input_tokens: int = 8000, structured: bool = False):
+        if mode not in ("compact", "full"):
+            raise ValueError(f"PROMPT_TEMPLATES must be 'compact' or 'full', got {mode!r}")
+        self.mode = mode
+        self.max_input_tokens = max_input_tokens
+        self.structured = structured
+        self._templates: Dict[Tuple[str, str], PromptTemplate] = {}
+        for prompt_style in PROMPT_STYLES:
+            for target_ai in TARGET_NOTES:
+                self._templates[(prompt_style, target_ai)] = self._compile(prompt_style, target_ai)
+
+    def _compile(self, prompt_style: str, target_ai: str) -> PromptTemplate:
+        if self.mode == "full":
+            system, structured_system = METHODOLOGY, METHODOLOGY + STRUCTURED_OUTPUT_INSTRUCTIONS
+        else:
+            system = compile_system_prompt(prompt_style, target_ai)
+            structured_system = compile_system_prompt(prompt_style, target_ai, structured=True)
+        return PromptTemplate(prompt_style, target_ai, system, structured_system,
+                              estimate_tokens(system), estimate_tokens(structured_system))
+
+    def get(self, prompt_style: str, target_ai: str) -> PromptTemplate:
+        key = (prompt_style, target_ai)
+        template = self._templates.get(key)
+        if template is None:
+            # Dict assignment is atomic; a racing compile produces the same template
+            template = self._templates[key] = self._compile(prompt_style, target_ai)
+        return template
+
+    def input_tokens(self, raw_prompt: str, prompt_style: str, target_ai: str,
+                     clarifications: Optional[str] = None, resumes_session: bool = False,
+                     stream: bool = False) -> int:
+        """
+        Estimated input tokens of the optimization call, with the system prompt
+        it compiles (streams always use the markdown one); a resumed DETAIL
+        session counts its questions at the question stage's max_tokens
+        """
+        structured = self.structured and not stream
+        tokens = self.get(prompt_style, target_ai).token_count(structured) + MESSAGE_OVERHEAD_TOKENS
+        tokens += estimate_tokens(raw_prompt) + estimate_tokens(clarifications or "")
+        if resumes_session:
+            tokens += QUESTIONS_MAX_TOKENS
+        return tokens
+
+    def worst_case_tokens(self, max_prompt_chars: int) -> int:
+        """Input tokens of the largest template with a prompt of max_prompt_chars non-Latin characters"""
+        largest = max(template.structured_tokens for template in self._templates.values())
+        return largest + MESSAGE_OVERHEAD_TOKENS + max_prompt_chars
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            f"{prompt_style}/{target_ai}": {"tokens": template.tokens, "structured_tokens": template.structured_tokens}
+            for (prompt_style, target_ai), template in sorted(self._templates.items())
+        }
+
+    def collect_metrics(self):
+        """Scrape-time gauges for /metrics (see metrics.MetricsRegistry.register_collector)"""
+        for (prompt_style, target_ai), template in sorted(self._templates.items()):
+            yield ("prompt_optimizer_system_prompt_tokens", "gauge",
+                   "Estimated tokens of the system prompt sent for each style and target",
+                   {"prompt_style": prompt_style, "target_ai": target_ai}, template.token_count(self.structured))
+        yield ("prompt_optimizer_max_input_tokens", "gauge", "Estimated input-token budget per optimization", {},
+               self.max_input_tokens)
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Return the process-wide registry, building it from Config on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry(Config.PROMPT_TEMPLATES, Config.MAX_INPUT_TOKENS, Config.STRUCTURED_OUTPUT)
+    return _registry
@@ -0,0 +1,194 @@
+"""
+Rate Limiting
+Token-bucket limits per client, shared by the Flask and ASGI servers
+
+Each client gets a bucket of REQUESTS_PER_MINUTE tokens that refills
+continuously. A bucket that has been idle long enough to refill completely
+carries no state, so it is dropped; this keeps memory bounded by the number
+of recently active clients. The SQLite backend stores buckets in a file so
+every worker on the host enforces one shared limit.
+"""
+
+import itertools
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from config import Config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the bucket is full again
+    retry_after: float  # seconds until the next request would be allowed
+
+    def headers(self) -> Dict[str, str]:
+        """Standard rate-limit response headers"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class TokenBucketLimiter(ABC):
+    """Shared token-bucket arithmetic; subclasses decide where buckets live"""
+
+    def __init__(self, requests_per_minute: int, burst: Optional[int] = None):
+        self.limit = requests_per_minute
+        self.capacity = float(burst or requests_per_minute)
+        self.rate = requests_per_minute / 60.0
+        # After this long without requests a bucket is full, i.e. indistinguishable from a new one
+        self.idle_ttl = self.capacity / self.rate
+
+    def _consume(self, tokens: float, updated_at: float, now: float):
+        """Refill a bucket to now and try to take one token; returns (tokens, result)"""
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+        result = RateLimitResult(
+            allowed=allowed,
+            limit=self.limit,
+            remaining=int(tokens),
+            reset_after=(self.capacity - tokens) / self.rate,
+            retry_after=0.0 if allowed else (1.0 - tokens) / self.rate
+        )
+        return tokens, result
+
+    @abstractmethod
+    def check(self, client_id: str) -> RateLimitResult:
+        """Take one token from the client's bucket"""
+
+
+class MemoryRateLimiter(TokenBucketLimiter):
+    """Per-process buckets in an LRU-ordered dict"""
+
+    def __init__(self, requests_per_minute: int, burst: Optional[int] = None, max_clients: int = 100000):
+        super().__init__(requests_per_minute, burst)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client_id -> (tokens, updated_at), least recently seen first
+        self._lock = threading.Lock()
+
+    def check(self, client_id: str) -> RateLimitResult:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client_id, (self.capacity, now))
+            tokens, result = self._consume(tokens, updated_at, now)
+            self._buckets[client_id] = (tokens, now)
+
+            # Expire idle clients from the old end; amortized O(1) per request
+            while self._buckets:
+                oldest_id, (_, oldest_at) = next(iter(self._buckets.items()))
+                if now - oldest_at < self.idle_ttl and len(self._buckets) <= self.max_clients:
+                    break
+                del self._buckets[oldest_id]
+
+        return result
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteRateLimiter(TokenBucketLimiter):
+    """Buckets in a SQLite file, so all workers on a host share one limit"""
+
+    def __init__(self, path: str, requests_per_minute: int, burst: Optional[int] = None,
+                 cleanup_every: int = 500):
+        super().__init__(requests_per_minute, burst)
+        self.path = path
+        self.cleanup_every = cleanup_every
+        self._checks = itertools.count(1)  # next() is atomic, so threads need no lock for it
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " client_id TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_updated ON buckets(updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def check(self, client_id: str) -> RateLimitResult:
+        # Wall-clock time, since buckets are shared between processes
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE client_id = ?", (client_id,)
+            ).fetchone()
+            tokens, updated_at = row if row else (self.capacity, now)
+            tokens, result = self._consume(tokens, updated_at, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (client_id, tokens, updated_at) VALUES (?, ?, ?)",
+                (client_id, tokens, now)
+            )
+
+            if next(self._checks) % self.cleanup_every == 0:
+                conn.execute("DELETE FROM buckets WHERE updated_at < ?", (now - self.idle_ttl,))
+
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+
+def _build_rate_limiter() -> TokenBucketLimiter:
+    backend = Config.RATE_LIMIT_BACKEND
+    if backend == "sqlite":
+        path = Config.RATE_LIMIT_SQLITE_PATH or os.path.join(tempfile.gettempdir(), "prompt-optimizer-ratelimit.sqlite3")
+        try:
+            return SQLiteRateLimiter(path, Config.REQUESTS_PER_MINUTE, Config.RATE_LIMIT_BURST)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open shared rate limit store at {path}, falling back to memory: {e}")
+    return MemoryRateLimiter(Config.REQUESTS_PER_MINUTE, Config.RATE_LIMIT_BURST)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucketLimiter:
+    """Return the process-wide rate limiter, creating it on first use"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = _build_rate_limiter()
+    return _rate_limiter
+
+
+def check_rate_limit(client_ip: str) -> RateLimitResult:
+    """Consume one request for client_ip and return the limiter's decision"""
+    try:
+        return get_rate_limiter().check(client_ip)
+    except sqlite3.Error as e:
+        # Never turn a limiter storage problem into an outage
+        logger.error(f"Rate limit check failed: {e}")
+        return RateLimitResult(True, Config.REQUESTS_PER_MINUTE, Config.REQUESTS_PER_MINUTE, 0.0, 0.0)
@@ -0,0 +1,159 @@
+"""
+Request Logging
+LOG_MODE=async hands log records to a background writer through a bounded
+queue and writes them as compact JSON lines, plus one summary line per
+request. Under overload it sheds records instead of blocking request threads.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from metrics import RequestTrace
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# One JSON line per request; logged as a dict so it is only serialized on the writer thread
+ACCESS_LOGGER = logging.getLogger("prompt_optimizer.access")
+
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def request_id(incoming: Optional[str] = None) -> str:
+    """The caller's X-Request-ID if it is a sane token, else a fresh id"""
+    if incoming and REQUEST_ID_RE.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+class JsonFormatter(logging.Formatter):
+    """Compact JSON lines; dict messages are merged into the line, others go under "message" """
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name
+        }
+        if isinstance(record.msg, dict):
+            line.update(record.msg)
+        else:
+            line["message"] = record.getMessage()
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, separators=(",", ":"), default=str)
+
+
+class SheddingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without ever blocking the caller
+
+    Formatting is left to the writer thread. Once the queue is more than
+    `high_water` full, INFO and DEBUG records are shed, except request
+    summary lines, which are kept at `sample_rate`. When the queue is
+    full, every record is dropped. Each loss is counted by reason.
+    """
+
+    def __init__(self, log_queue: queue.Queue, sample_rate: float = 0.1, high_water: float = 0.5):
+        super().__init__(log_queue)
+        self.sample_rate = sample_rate
+        self.high_water_mark = max(1, int(log_queue.maxsize * high_water))
+        self._lock = threading.Lock()
+        self.dropped = {"full": 0, "shed": 0, "sampled": 0}
+
+    def _drop(self, reason: str):
+        with self._lock:
+            self.dropped[reason] += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class formats here, on the request thread; the writer formats instead
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        if record.levelno < logging.WARNING and self.queue.qsize() >= self.high_water_mark:
+            if record.name != ACCESS_LOGGER.name:
+                self._drop("shed")
+                return
+            if random.random() >= self.sample_rate:
+                self._drop("sampled")
+                return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._drop("full")
+
+    def collect_metrics(self):
+        """Scrape-time gauges for /metrics (see metrics.MetricsRegistry.register_collector)"""
+        yield ("prompt_optimizer_log_queue_depth", "gauge", "Log records waiting for the writer thread", {},
+               self.queue.qsize())
+        with self._lock:
+            dropped = dict(self.dropped)
+        for reason, count in dropped.items():
+            yield ("prompt_optimizer_log_records_dropped_total", "counter", "Log records not written, by reason",
+                   {"reason": reason}, count)
+
+
+_queue_handler: Optional[SheddingQueueHandler] = None
+
+
+def configure_logging(mode: str = "sync", queue_size: int = 10000,
+                      sample_rate: float = 0.1) -> Optional[SheddingQueueHandler]:
+    """
+    Set up the root logger: "sync" writes text lines from the calling thread
+    (the original behaviour); "async" queues records for a background JSON
+    writer. Returns the queue handler in async mode.
+    """
+    global _queue_handler
+    if mode != "async":
+        logging.basicConfig(level=logging.INFO, format=TEXT_FORMAT)
+        return None
+    if _queue_handler is not None:
+        return _queue_handler
+
+    writer = logging.StreamHandler()
+    writer.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(log_queue, writer)
+    listener.start()
+    # Flush what is queued on a clean shutdown
+    atexit.register(listener.stop)
+
+    _queue_handler = SheddingQueueHandler(log_queue, sample_rate=sample_rate)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(logging.INFO)
+    return _queue_handler
+
+
+def log_request(request_id: str, method: str, path: str, status: int, seconds: float,
+                trace: Optional[RequestTrace] = None):
+    """Write the per-request summary line (async mode only)"""
+    if _queue_handler is None:
+        return
+    line: Dict[str, object] = {
+        "request_id": request_id,
+        "method": method,
+        "path": path,
+        "status": status,
+        "duration_ms": round(seconds * 1000, 1)
+    }
+    if trace is not None:
+        line.update(trace.fields)
+        if trace.model:
+            line["model"] = trace.model
+            line["upstream_calls"] = trace.upstream_calls
+        if trace.tokens:
+            line["tokens"] = trace.tokens
+        if trace.stages:
+            line["stages_ms"] = {stage: round(value * 1000, 1) for stage, value in trace.stages.items()}
+    ACCESS_LOGGER.info(line)
@@ -0,0 +1,173 @@
+"""
+Model Routing
+Picks the model, max_tokens and temperature for each optimization call from a
+fast local estimate of prompt complexity
+"""
+
+import importlib
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, NamedTuple, Optional
+
+from config import Config
+
+_STRUCTURE_RE = re.compile(r"^[ \t]*(?:[-*•]|\d+[.)]|#{1,6})[ \t]+", re.MULTILINE)
+_CODE_RE = re.compile(
+    r"```|^(?: {4}|\t)\S|\b(?:def|class|function|return|import|SELECT|const|var)\b|[{};]\s*$",
+    re.MULTILINE
+)
+_CONSTRAINT_RE = re.compile(
+    r"\b(?:must|should|never|always|at least|at most|exactly|format|json|table|steps?|limit|words?)\b",
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 characters per token for Latin text, one per other character"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def estimate_complexity(raw_prompt: str, clarifications: Optional[str] = None) -> Dict:
+    """
+    Score a prompt between 0 (trivial) and 1 (long, structured spec)
+
+    Weighs length, list/heading structure, code and explicit constraints.
+    Runs in microseconds; no upstream call.
+    """
+    text = raw_prompt if not clarifications else f"{raw_prompt}\n{clarifications}"
+    tokens = estimate_tokens(text)
+    structure = len(_STRUCTURE_RE.findall(text))
+    has_code = bool(_CODE_RE.search(raw_prompt))
+    constraints = len(_CONSTRAINT_RE.findall(text))
+
+    score = (
+        0.4 * min(1.0, tokens / 300)
+        + 0.25 * min(1.0, structure / 6)
+        + (0.15 if has_code else 0.0)
+        + 0.2 * min(1.0, constraints / 6)
+    )
+    return {
+        "tokens": tokens,
+        "structure": structure,
+        "has_code": has_code,
+        "constraints": constraints,
+        "score": round(score, 3)
+    }
+
+
+class RoutingDecision(NamedTuple):
+    model: str
+    max_tokens: int
+    temperature: float
+    tier: str
+    score: float
+    overridden: bool = False
+
+    def describe(self) -> str:
+        override = ", overridden" if self.overridden else ""
+        return (f"tier={self.tier}, score={self.score}, model={self.model}, "
+                f"max_tokens={self.max_tokens}, temperature={self.temperature}{override}")
+
+    # Lets log calls pass the decision itself, so describe() only runs if the record is written
+    __str__ = describe
+
+
+class ModelRouter(ABC):
+    """Base class; subclasses implement route()"""
+
+    name = "base"
+
+    def __init__(self, config: Optional[Config] = None):
+        self.config = config or Config()
+
+    @abstractmethod
+    def route(self, raw_prompt: str, prompt_style: str, target_ai: str,
+              clarifications: Optional[str] = None) -> RoutingDecision:
+        """Choose the model, max_tokens and temperature for one call"""
+
+
+class StaticRouter(ModelRouter):
+    """The fixed policy: deepseek-reasoner for every DETAIL call, 1500/2000 max_tokens"""
+
+    name = "static"
+
+    def route(self, raw_prompt: str, prompt_style: str, target_ai: str,
+              clarifications: Optional[str] = None) -> RoutingDecision:
+        model = self.config.REASONING_MODEL if prompt_style == "DETAIL" else self.config.DEFAULT_MODEL
+        max_tokens = 1500 if clarifications else 2000
+        return RoutingDecision(model, max_tokens, 0.7, "static", 0.0)
+
+
+class ComplexityRouter(ModelRouter):
+    """
+    Route on estimate_complexity:
+    - only complex DETAIL prompts go to the reasoner; everything else uses the chat model
+    - max_tokens scales with the prompt (the optimized prompt plus the
+      improvements/techniques/tip sections), between MIN and MAX_TOKENS
+    - prompts containing code get a lower temperature
+    """
+
+    name = "complexity"
+
+    SIMPLE_BELOW = 0.25
+    COMPLEX_FROM = 0.55
+    MIN_TOKENS = 800
+    MAX_TOKENS = 2000
+    REASONER_MIN_TOKENS = 1500
+
+    def route(self, raw_prompt: str, prompt_style: str, target_ai: str,
+              clarifications: Optional[str] = None) -> RoutingDecision:
+        complexity = estimate_complexity(raw_prompt, clarifications)
+        score = complexity["score"]
+        if score < self.SIMPLE_BELOW:
+            tier = "simple"
+        elif score < self.COMPLEX_FROM:
+            tier = "standard"
+        else:
+            tier = "complex"
+
+        # Room for a rewrite a few times longer than the input plus the improvements/tip
+        # sections; clarified DETAIL answers are more comprehensive
+        budget = 400 + 3 * estimate_tokens(raw_prompt) + (300 if clarifications else 0)
+        max_tokens = max(self.MIN_TOKENS, min(self.MAX_TOKENS, -(-budget // 100) * 100))
+
+        if prompt_style == "DETAIL" and tier == "complex":
+            model = self.config.REASONING_MODEL
+            max_tokens = max(max_tokens, self.REASONER_MIN_TOKENS)
+        else:
+            model = self.config.DEFAULT_MODEL
+
+        temperature = 0.4 if complexity["has_code"] else 0.7
+        return RoutingDecision(model, max_tokens, temperature, tier, score)
+
+
+ROUTERS = {
+    StaticRouter.name: StaticRouter,
+    ComplexityRouter.name: ComplexityRouter
+}
+
+
+def get_router(name: Optional[str] = None, config: Optional[Config] = None) -> ModelRouter:
+    """
+    Build the configured router
+
+    `name` is a key of ROUTERS or a "module:ClassName" path to a ModelRouter
+    subclass, so deployments can plug in their own policy.
+    """
+    name = name or Config.MODEL_ROUTER
+    if name in ROUTERS:
+        return ROUTERS[name](config)
+    module_name, _, class_name = name.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown MODEL_ROUTER '{name}' (expected one of {', '.join(ROUTERS)} or module:ClassName)")
+    return getattr(importlib.import_module(module_name), class_name)(config)
+
+
+def apply_overrides(decision: RoutingDecision, overrides: Optional[Dict]) -> RoutingDecision:
+    """Replace routed fields with the per-request model/max_tokens/temperature overrides"""
+    if not overrides:
+        return decision
+    return decision._replace(overridden=True, **overrides)
@@ -0,0 +1,101 @@
+"""
+DETAIL Session Store
+Keeps the stage-one (clarifying questions) conversation so stage two can
+continue it instead of starting over
+"""
+
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from cache import normalize_prompt
+
+SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class DetailSession:
+    """The stage-one request, the model that answered it and the questions it asked"""
+
+    __slots__ = ("id", "raw_prompt", "target_ai", "model", "messages", "expires_at", "speculation")
+
+    def __init__(self, raw_prompt: str, target_ai: str, model: str, messages: List[Dict], expires_at: float):
+        self.id = uuid.uuid4().hex
+        self.raw_prompt = raw_prompt
+        self.target_ai = target_ai
+        self.model = model
+        self.messages = messages
+        self.expires_at = expires_at
+        self.speculation = None  # speculation.Speculation, when one was started
+
+    @property
+    def questions(self) -> str:
+        return self.messages[-1]["content"]
+
+    def matches(self, raw_prompt: str, target_ai: str) -> bool:
+        """Stage two must be about the same prompt and target the session was opened for"""
+        return self.target_ai == target_ai and normalize_prompt(self.raw_prompt) == normalize_prompt(raw_prompt)
+
+
+class SessionStore:
+    """
+    LRU store of DETAIL sessions with a TTL and an entry limit; on_drop is
+    called with each session that expires or is evicted
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 1800,
+                 on_drop: Optional[Callable[[DetailSession], None]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_drop = on_drop
+        self._sessions = OrderedDict()  # id -> DetailSession
+        self._lock = threading.Lock()
+        self.created = 0
+        self.resumed = 0
+        self.missed = 0
+
+    def create(self, raw_prompt: str, target_ai: str, model: str, messages: List[Dict]) -> DetailSession:
+        """Store a stage-one conversation (request messages plus the assistant's questions)"""
+        session = DetailSession(raw_prompt, target_ai, model, messages, time.time() + self.ttl)
+        dropped = []
+        with self._lock:
+            self._sessions[session.id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_entries:
+                dropped.append(self._sessions.popitem(last=False)[1])
+        self._dropped(dropped)
+        return session
+
+    def get(self, session_id: str, raw_prompt: str, target_ai: str) -> Optional[DetailSession]:
+        """Return the session if it exists, has not expired and belongs to this prompt"""
+        now = time.time()
+        dropped = []
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.expires_at <= now:
+                dropped.append(self._sessions.pop(session_id))
+                session = None
+            if session is None or not session.matches(raw_prompt, target_ai):
+                self.missed += 1
+                session = None
+            else:
+                self._sessions.move_to_end(session_id)
+                self.resumed += 1
+        self._dropped(dropped)
+        return session
+
+    def _dropped(self, sessions: List[DetailSession]):
+        if self.on_drop:
+            for session in sessions:
+                self.on_drop(session)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._sessions),
+                "created": self.created,
+                "resumed": self.resumed,
+                "missed": self.missed
+            }
@@ -0,0 +1,190 @@
+"""
+Near-Duplicate Prompt Index
+MinHash/LSH index over previously optimized prompts, so requests that differ
+only by casing, punctuation or a small edit can reuse a cached result
+"""
+
+import logging
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_EMPTY_BIN = 0xFFFFFFFF
+
+
+def normalize_for_similarity(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(_NON_WORD_RE.sub(" ", text.lower()).split())
+
+
+def shingle_hashes(text: str, size: int = 5) -> List[int]:
+    """Hashes of the distinct character shingles of normalized text"""
+    if len(text) <= size:
+        shingles = {text} if text else set()
+    else:
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+    # hash() is salted per process, which is fine for an in-memory index
+    return list(map(hash, shingles))
+
+
+def minhash_signature(hashes: List[int], num_bins: int) -> array:
+    """
+    One-permutation MinHash: each hash lands in one of `num_bins` bins and
+    each bin keeps its minimum, so the cost is one pass over the shingles
+    rather than one pass per permutation. Empty bins borrow the next
+    non-empty bin's value, offset by the distance, so short texts still
+    give comparable signatures.
+    """
+    bins = [_EMPTY_BIN] * num_bins
+    for h in hashes:
+        index = h % num_bins
+        value = (h // num_bins) & 0xFFFFFFF  # 28 bits, leaving room for the densification offset
+        if value < bins[index]:
+            bins[index] = value
+    if _EMPTY_BIN in bins:
+        for index in range(num_bins):
+            if bins[index] != _EMPTY_BIN:
+                continue
+            distance = 1
+            while bins[(index + distance) % num_bins] == _EMPTY_BIN:
+                distance += 1
+            source = bins[(index + distance) % num_bins]
+            bins[index] = (source + distance * 0x10000000) & 0xFFFFFFFF
+    return array("I", bins)
+
+
+def estimate_similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity: the share of bins whose minimums agree"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of MinHash signatures, partitioned by namespace (the
+    prompt_style/target_ai/stage a result belongs to).
+
+    The index only stores signatures and the result-cache key of each entry;
+    results themselves stay in the ResultCache. Signatures are split into
+    `bands` bands and an entry becomes a candidate when any band matches
+    exactly; candidates are then scored on the full signature and the best
+    one at or above `threshold` wins. Entries expire after `ttl` and the
+    least recently used are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_bins: int = 64, bands: int = 8, shingle_size: int = 5,
+                 max_entries: int = 10000, ttl: float = 3600):
+        if num_bins % bands:
+            raise ValueError("num_bins must be a multiple of bands")
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries = OrderedDict()  # key -> (expires_at, namespace, signature)
+        # namespace -> per band {band hash: keys}, mutated in place on add and remove
+        self._buckets: Dict[str, List[Dict[int, Set[str]]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def signature(self, text: str) -> Optional[array]:
+        normalized = normalize_for_similarity(text)
+        if not normalized:
+            return None
+        return minhash_signature(shingle_hashes(normalized, self.shingle_size), self.num_bins)
+
+    def _band_hashes(self, signature: array) -> List[int]:
+        rows = self.rows
+        return [hash(signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, namespace: str, key: str, text: str):
+        """Index `text` under the result-cache key it was stored with"""
+        signature = self.signature(text)
+        if signature is None:
+            return
+        band_hashes = self._band_hashes(signature)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + self.ttl, namespace, signature)
+            buckets = self._buckets.get(namespace)
+            if buckets is None:
+                buckets = self._buckets[namespace] = [{} for _ in range(self.bands)]
+            for band, band_hash in enumerate(band_hashes):
+                buckets[band].setdefault(band_hash, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def query(self, namespace: str, text: str) -> Optional[Tuple[str, float]]:
+        """Return (key, similarity) of the closest entry at or above the threshold, or None"""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        band_hashes = self._band_hashes(signature)
+        now = time.time()
+        with self._lock:
+            buckets = self._buckets.get(namespace)
+            candidates = set()
+            if buckets is not None:
+                for band, band_hash in enumerate(band_hashes):
+                    candidates.update(buckets[band].get(band_hash, ()))
+
+            best_key, best_similarity = None, 0.0
+            for key in candidates:
+                expires_at, _, other = self._entries[key]
+                if expires_at <= now:
+                    self._remove(key)
+                    continue
+                similarity = estimate_similarity(signature, other)
+                if similarity > best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return best_key, best_similarity
+
+    def remove(self, key: str):
+        """Drop an entry, e.g. when its result is no longer in the cache"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        _, namespace, signature = self._entries.pop(key)
+        buckets = self._buckets[namespace]
+        for band, band_hash in enumerate(self._band_hashes(signature)):
+            keys = buckets[band].get(band_hash)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del buckets[band][band_hash]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
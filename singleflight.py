@@ -0,0 +1,119 @@
+"""
+Single-flight Request Coalescing
+Identical concurrent calls share one execution instead of each paying for it
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from deadline import DeadlineExceeded, current_deadline
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-based coalescing for the sync (Flask/gunicorn) serving mode"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once per key among concurrent callers
+
+        A caller that waits on another's execution gives up with
+        DeadlineExceeded when its own request deadline runs out.
+
+        Returns:
+            (result, shared) where shared is True if this caller waited on
+            another caller's execution instead of running fn itself
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            deadline = current_deadline()
+            if not call.event.wait(max(0.0, deadline.remaining()) if deadline else None):
+                raise DeadlineExceeded()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            # The leader was interrupted (worker shutdown); its waiters still need an outcome
+            call.error = RuntimeError("The coalesced call was interrupted before it finished")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "coalesced": self.coalesced
+            }
+
+
+class AsyncSingleFlight:
+    """asyncio coalescing for the ASGI serving mode"""
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async equivalent of SingleFlight.do"""
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+        # Shield so one caller disconnecting does not cancel the call for everyone else
+        deadline = current_deadline()
+        if not shared or deadline is None:
+            return await asyncio.shield(task), shared
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), max(0.0, deadline.remaining())), shared
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._tasks),
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,170 @@
+"""
+Speculative BASIC Optimization
+While a DETAIL user reads and answers the clarifying questions, a BASIC
+optimization of the same prompt runs in the background, so skipping the
+questions can be answered without another upstream round trip
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Awaitable, Callable, Dict, Optional
+
+import metrics
+from deadline import start_deadline
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SPECULATION_AGE_SECONDS = metrics.REGISTRY.histogram(
+    "prompt_optimizer_speculation_age_seconds",
+    "Time from starting a speculative BASIC optimization to its outcome being decided",
+    ["outcome"]
+)
+
+
+class Speculation:
+    """One background BASIC optimization, tied to a DETAIL session"""
+
+    __slots__ = ("future", "started_at", "outcome")
+
+    def __init__(self):
+        self.future = None  # concurrent.futures.Future or asyncio.Task
+        self.started_at = time.time()
+        self.outcome: Optional[str] = None
+
+
+class Speculator:
+    """
+    Starts speculative optimizations and accounts for them
+
+    At most `max_concurrent` run at once; start() refuses new ones beyond
+    that instead of queueing, since a late speculation is worthless. Each
+    one ends as "used" (served to a user who skipped the questions),
+    "wasted" (the user answered, or the session was dropped) or "failed"
+    (its result could not be served).
+    """
+
+    def __init__(self, max_concurrent: int = 2, deadline_seconds: Optional[float] = None):
+        self.max_concurrent = max_concurrent
+        self.deadline_seconds = deadline_seconds
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.running = 0
+        self.started = 0
+        self.rejected = 0
+        self.outcomes = {"used": 0, "wasted": 0, "failed": 0}
+
+    def _admit(self) -> Optional[Speculation]:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.running += 1
+            self.started += 1
+        return Speculation()
+
+    def _release(self):
+        with self._lock:
+            self.running -= 1
+        self._slots.release()
+
+    def start(self, fn: Callable[[], Dict]) -> Optional[Speculation]:
+        """Run fn on a background thread; returns None when all slots are busy"""
+        speculation = self._admit()
+        if speculation is None:
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                                        thread_name_prefix="speculation")
+        speculation.future = self._executor.submit(self._run, fn)
+        return speculation
+
+    def _run(self, fn: Callable[[], Dict]) -> Dict:
+        # Pool threads are long-lived, so each speculation gets a fresh deadline and trace
+        start_deadline(self.deadline_seconds)
+        metrics.start_trace()
+        try:
+            return fn()
+        finally:
+            self._release()
+
+    def start_async(self, fn: Callable[[], Awaitable[Dict]]) -> Optional[Speculation]:
+        """Run fn as a task on the current event loop; returns None when all slots are busy"""
+        speculation = self._admit()
+        if speculation is None:
+            return None
+        speculation.future = asyncio.ensure_future(self._run_async(fn))
+        return speculation
+
+    async def _run_async(self, fn: Callable[[], Awaitable[Dict]]) -> Dict:
+        start_deadline(self.deadline_seconds)
+        metrics.start_trace()
+        try:
+            return await fn()
+        finally:
+            self._release()
+
+    def claim(self, speculation: Speculation, timeout: float) -> Optional[Dict]:
+        """
+        Result for a user who skipped the questions, waiting up to `timeout`
+        seconds for a speculation that is still running; None if it is unusable
+        """
+        try:
+            result = speculation.future.result(timeout=max(0, timeout))
+        except FutureTimeout:
+            result = None
+        except Exception as e:
+            logger.error(f"Speculative optimization failed: {str(e)}")
+            result = None
+        return self._settle(speculation, result)
+
+    async def claim_async(self, speculation: Speculation, timeout: float) -> Optional[Dict]:
+        """Async equivalent of claim"""
+        try:
+            result = await asyncio.wait_for(asyncio.shield(speculation.future), max(0, timeout))
+        except asyncio.TimeoutError:
+            result = None
+        except Exception as e:
+            logger.error(f"Speculative optimization failed: {str(e)}")
+            result = None
+        return self._settle(speculation, result)
+
+    def _settle(self, speculation: Speculation, result: Optional[Dict]) -> Optional[Dict]:
+        # Errors and local fallbacks are not what the user would get from a fresh request
+        usable = bool(result and result.get("optimized_prompt")
+                      and not result.get("error") and not result.get("degraded"))
+        self._decide(speculation, "used" if usable else "failed")
+        return dict(result) if usable else None
+
+    def discard(self, speculation: Speculation):
+        """The user answered the questions or the session ended; the speculation was not needed"""
+        self._decide(speculation, "wasted")
+
+    def _decide(self, speculation: Speculation, outcome: str):
+        # A session can be skipped twice (e.g. a retried request); only the first outcome counts
+        with self._lock:
+            if speculation.outcome is not None:
+                return
+            speculation.outcome = outcome
+            self.outcomes[outcome] += 1
+        SPECULATION_AGE_SECONDS.observe(time.time() - speculation.started_at, outcome=outcome)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.outcomes, running=self.running, started=self.started, rejected=self.rejected)
+
+    def collect_metrics(self):
+        """Scrape-time gauges for /metrics (see metrics.MetricsRegistry.register_collector)"""
+        speculation_stats = self.stats()
+        yield ("prompt_optimizer_speculations_running", "gauge", "Speculative BASIC optimizations in flight", {},
+               speculation_stats["running"])
+        for outcome in ("started", "rejected", "used", "wasted", "failed"):
+            yield ("prompt_optimizer_speculations_total", "counter", "Speculative BASIC optimizations by outcome",
+                   {"outcome": outcome}, speculation_stats[outcome])
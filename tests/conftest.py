@@ -0,0 +1,63 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# The optimizer refuses to start without a key; tests only ever talk to the mock
+os.environ.setdefault("DEEPSEEK_API_KEY", "test")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def mock_upstream():
+    from mock_deepseek import MockDeepSeekServer, MockSettings
+
+    server = MockDeepSeekServer(MockSettings(latency="fixed", latency_ms=5, chunk_delay_ms=0)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def optimizer_factory(mock_upstream, monkeypatch):
+    """Build a PromptOptimizer against the mock with Config overrides (as env var strings)"""
+    from config import Config
+
+    created = []
+
+    def build(**overrides):
+        from optimizer import PromptOptimizer
+
+        settings = {"DEEPSEEK_API_URL": mock_upstream.url, "CACHE_ENABLED": "false",
+                    "HEALTH_PROBE_INTERVAL": "3600"}
+        settings.update(overrides)
+        for name, value in settings.items():
+            current = getattr(Config, name)
+            if isinstance(current, bool):
+                value = value.lower() == "true"
+            elif current is not None and not isinstance(current, str):
+                value = type(current)(value)
+            monkeypatch.setattr(Config, name, value)
+        optimizer = PromptOptimizer()
+        created.append(optimizer)
+        return optimizer
+
+    yield build
+
+
+@pytest.fixture
+def client(optimizer_factory, monkeypatch):
+    """Flask test client whose optimizer talks to the mock"""
+    from config import Config
+    from jobs import JobManager
+
+    # Lazy, so importing app builds nothing against the real upstream
+    monkeypatch.setattr(Config, "BOOT_MODE", "lazy")
+    import app
+
+    monkeypatch.setattr(app, "optimizer", optimizer_factory())
+    monkeypatch.setattr(app, "job_manager", JobManager(workers=1, max_queue=2))
+    monkeypatch.setattr(app, "_booted", True)
+    return app.app.test_client()
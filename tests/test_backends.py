@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from backends import Backend, BackendPool, load_backends
+from hedging import HedgePolicy, hedged_call_async
+from upstream import UpstreamError
+
+PAYLOAD = {"model": "deepseek-chat", "messages": []}
+
+
+def make_pool(*names):
+    return BackendPool([Backend(name, f"http://{name}", "key") for name in names])
+
+
+def test_prefers_the_less_loaded_backend():
+    pool = make_pool("a", "b")
+    first = pool.acquire("deepseek-chat")
+    second = pool.acquire("deepseek-chat")
+    assert first is not second
+    pool.release(first, "deepseek-chat", 0.1)
+    pool.release(second, "deepseek-chat", 0.1)
+
+
+def test_429_ejects_and_fails_over():
+    pool = make_pool("a", "b")
+    seen = []
+
+    def fn(backend, payload):
+        seen.append(backend.name)
+        if len(seen) == 1:
+            raise UpstreamError(429, "slow down", retry_after="60")
+        return {"ok": backend.name}
+
+    assert pool.call(PAYLOAD, fn) == {"ok": seen[1]}
+    assert seen[0] != seen[1]
+    rate_limited = next(backend for backend in pool.backends if backend.name == seen[0])
+    assert rate_limited.ejections == 1
+    assert all(backend.outstanding == 0 for backend in pool.backends)
+    # The ejected backend is skipped while another is available
+    assert pool.call(PAYLOAD, lambda backend, payload: backend.name) == seen[1]
+
+
+def test_single_backend_does_not_fail_over():
+    pool = make_pool("only")
+    calls = []
+
+    def fn(backend, payload):
+        calls.append(backend)
+        raise UpstreamError(429, "slow down")
+
+    with pytest.raises(UpstreamError):
+        pool.call(PAYLOAD, fn)
+    assert len(calls) == 1
+    assert pool.backends[0].outstanding == 0
+
+
+def test_5xx_ejects_penalizes_and_fails_over():
+    pool = make_pool("a", "b")
+    seen = []
+
+    def fn(backend, payload):
+        seen.append(backend.name)
+        if len(seen) == 1:
+            raise UpstreamError(503, "overloaded")
+        return {"ok": backend.name}
+
+    assert pool.call(PAYLOAD, fn) == {"ok": seen[1]}
+    failing = next(backend for backend in pool.backends if backend.name == seen[0])
+    assert failing.ejections == 1 and failing.rate_limited == 0
+    assert pool.retry_statuses("deepseek-chat") == set()
+
+
+def test_release_on_a_5xx_penalizes_the_latency_ewma():
+    pool = make_pool("a")
+    backend = pool.backends[0]
+    pool.release(pool.acquire("deepseek-chat"), "deepseek-chat", 1.0)
+    pool.release(pool.acquire("deepseek-chat"), "deepseek-chat", 0.01, UpstreamError(500, "boom"))
+
+    # A fast error counts as failure_penalty x the current average, not as a fast call
+    assert backend.latency["deepseek-chat"] == pytest.approx(0.3 * 2.0 + 0.7 * 1.0)
+    assert backend.failures == 1 and backend.ejections == 1
+    assert backend.outstanding == 0
+
+
+def test_connection_errors_fail_over():
+    import requests
+
+    pool = make_pool("a", "b")
+    seen = []
+
+    def fn(backend, payload):
+        seen.append(backend.name)
+        if len(seen) == 1:
+            raise requests.ConnectionError("refused")
+        return {"ok": backend.name}
+
+    assert pool.call(PAYLOAD, fn) == {"ok": seen[1]}
+
+
+def test_client_errors_are_raised_and_released():
+    pool = make_pool("a", "b")
+
+    def fn(backend, payload):
+        raise UpstreamError(400, "bad request")
+
+    with pytest.raises(UpstreamError):
+        pool.call(PAYLOAD, fn)
+    assert sum(backend.failures for backend in pool.backends) == 1
+    assert all(backend.ejections == 0 for backend in pool.backends)
+    assert all(backend.outstanding == 0 for backend in pool.backends)
+
+
+def test_cancelled_async_call_releases_its_backend():
+    pool = make_pool("a")
+
+    async def slow(backend, payload):
+        await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.ensure_future(pool.call_async(PAYLOAD, slow))
+        await asyncio.sleep(0.01)
+        assert pool.backends[0].outstanding == 1
+        # What hedged_call_async does to the losing request
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert pool.backends[0].outstanding == 0
+    assert pool.backends[0].latency == {}
+
+
+def test_lost_hedge_releases_its_backend():
+    pool = make_pool("slow", "fast")
+    policy = HedgePolicy(min_samples=1, min_delay=0.01, max_ratio=1)
+    policy.record("deepseek-chat", 0.01)
+
+    async def fn(backend, payload):
+        await asyncio.sleep(10 if backend.name == "slow" else 0)
+        return {"backend": backend.name}
+
+    async def run():
+        result, hedged = await hedged_call_async(policy, "deepseek-chat", lambda: pool.call_async(PAYLOAD, fn))
+        # Let the cancelled primary unwind
+        await asyncio.sleep(0)
+        return result, hedged
+
+    # With no latency samples the first pick is the first backend: the slow one
+    assert asyncio.run(run()) == ({"backend": "fast"}, True)
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
+
+
+def test_closed_stream_releases_its_backend():
+    pool = make_pool("a")
+
+    def events(backend, payload):
+        yield {"n": 1}
+        yield {"n": 2}
+
+    stream = pool.stream(PAYLOAD, events)
+    assert next(stream) == {"n": 1}
+    stream.close()
+    assert pool.backends[0].outstanding == 0
+    assert "deepseek-chat" in pool.backends[0].latency
+
+
+def test_load_backends_rejects_bad_specs():
+    with pytest.raises(ValueError):
+        load_backends("not json", "http://default", "key")
+    with pytest.raises(ValueError):
+        load_backends('[{"name": "a"}]', "http://default", "key")
+    with pytest.raises(ValueError):
+        load_backends('[{"url": "http://a"}]', "http://default", None)
+    assert [backend.name for backend in load_backends("", "http://default", "key")] == ["default"]
@@ -0,0 +1,129 @@
+import json
+
+from batch import iter_batch, run_batch_file
+
+GOOD = {"raw_prompt": "Explain how a hash map handles collisions", "prompt_style": "BASIC", "target_ai": "ChatGPT"}
+
+
+def lines(*records):
+    return [record if isinstance(record, str) else json.dumps(record) for record in records]
+
+
+def test_bad_lines_fail_alone(optimizer_factory):
+    optimizer = optimizer_factory()
+    records = lines(
+        dict(GOOD, id="first"),
+        "{not json",
+        "[1, 2]",
+        dict(GOOD, raw_prompt=123, id="number"),
+        dict(GOOD, prompt_style=["BASIC"]),
+        dict(GOOD, clarifications={"a": 1}),
+        "",
+        dict(GOOD, id="last")
+    )
+    results = list(iter_batch(optimizer, records, concurrency=2))
+
+    assert [item["index"] for item in results] == [0, 1, 2, 3, 4, 5, 7]
+    assert results[0]["id"] == "first" and "optimized_prompt" in results[0]["result"]
+    assert "cache_status" not in results[0]["result"]
+    assert results[1]["error"].startswith("Invalid JSON line")
+    assert results[2]["error"] == "Invalid JSON line: Each line must be a JSON object"
+    assert results[3] == {"index": 3, "id": "number", "error": "Fields must be strings: raw_prompt"}
+    assert results[4]["error"] == "Fields must be strings: prompt_style"
+    assert results[5]["error"] == "Fields must be strings: clarifications"
+    assert results[6]["id"] == "last" and "result" in results[6]
+
+
+def test_optimizer_errors_become_error_lines():
+    class FailingOptimizer:
+        def optimize_prompt(self, *args, **kwargs):
+            raise RuntimeError("upstream exploded")
+
+    results = list(iter_batch(FailingOptimizer(), lines(GOOD, GOOD), ordered=False))
+    assert sorted(item["index"] for item in results) == [0, 1]
+    assert all(item["error"] == "upstream exploded" for item in results)
+
+
+def test_run_batch_file_counts_failures(optimizer_factory, tmp_path):
+    optimizer = optimizer_factory()
+    input_path = tmp_path / "in.jsonl"
+    output_path = tmp_path / "out.jsonl"
+    input_path.write_text("\n".join(lines(GOOD, dict(GOOD, raw_prompt=None), dict(GOOD, raw_prompt=7))) + "\n")
+
+    summary = run_batch_file(optimizer, str(input_path), str(output_path), concurrency=2)
+
+    assert summary == {"processed": 3, "succeeded": 1, "failed": 2, "start_index": 0}
+    written = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert [item["index"] for item in written] == [0, 1, 2]
+    assert written[1]["error"] == "raw_prompt cannot be empty"
+
+
+def rate_limit_after(calls):
+    """check_rate_limit stand-in that allows `calls` requests"""
+    from ratelimit import RateLimitResult
+
+    made = []
+
+    def check(client_id):
+        made.append(client_id)
+        allowed = len(made) <= calls
+        return RateLimitResult(allowed, calls, max(0, calls - len(made)), 60.0, 0.0 if allowed else 2.0)
+
+    check.made = made
+    return check
+
+
+def post_batch(client, records, query=""):
+    body = "\n".join(lines(*records)) + "\n"
+    return client.post("/optimize/batch" + query, data=body, content_type="application/x-ndjson")
+
+
+def test_http_batch_charges_every_item(client, monkeypatch):
+    import app
+
+    check = rate_limit_after(2)
+    monkeypatch.setattr(app, "check_rate_limit", check)
+    response = post_batch(client, [GOOD, "", GOOD, GOOD, GOOD])
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert len(check.made) == 3
+    assert [item["index"] for item in results] == [0, 2, 3]
+    assert "result" in results[0] and "result" in results[1]
+    assert results[2]["error"].startswith("Rate limit exceeded")
+
+
+def test_http_batch_is_capped(client, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "check_rate_limit", rate_limit_after(100))
+    monkeypatch.setattr(app.Config, "BATCH_MAX_ITEMS", 2)
+    results = [json.loads(line) for line in post_batch(client, [GOOD] * 4).get_data(as_text=True).splitlines()]
+
+    assert [item["index"] for item in results] == [0, 1, 2]
+    assert "async=true" in results[2]["error"]
+
+
+def test_http_batch_items_share_the_request_deadline(client, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "check_rate_limit", rate_limit_after(100))
+    monkeypatch.setattr(app.Config, "REQUEST_DEADLINE_SECONDS", 0.0001)
+    results = [json.loads(line) for line in post_batch(client, [GOOD, GOOD]).get_data(as_text=True).splitlines()]
+
+    assert all(item["error"] == "Batch deadline exceeded before this item started" for item in results)
+
+
+def test_async_batch_runs_as_a_job(client, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "check_rate_limit", rate_limit_after(100))
+    monkeypatch.setattr(app.Config, "BATCH_MAX_ITEMS", 1)
+    response = post_batch(client, [GOOD, dict(GOOD, raw_prompt=""), GOOD], "?async=true")
+    assert response.status_code == 202
+
+    job = client.get(response.headers["Location"] + "?wait=5").get_json()
+    assert job["status"] == "done"
+    results = job["result"]["results"]
+    assert [item["index"] for item in results] == [0, 1, 2]
+    assert results[1]["error"] == "raw_prompt cannot be empty"
+    assert "cache_status" not in results[2]["result"]
@@ -0,0 +1,48 @@
+import time
+
+from cache import ResultCache, SQLiteCacheStore, make_cache_key
+
+RESULT = {"optimized_prompt": "Write a haiku about compilers.", "improvements": ["Named the form"]}
+
+
+def test_cache_key_normalizes_whitespace():
+    key = make_cache_key("Write a haiku", "BASIC", "ChatGPT")
+    assert make_cache_key("  Write a haiku  ", "BASIC", "ChatGPT") == key
+    assert make_cache_key("Write a haiku", "DETAIL", "ChatGPT") != key
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResultCache(sqlite_path=path).set("key", RESULT)
+
+    restarted = ResultCache(sqlite_path=path)
+    assert restarted.stats()["entries"] == 0
+    assert restarted.get("key") == RESULT
+    # The disk hit is promoted into memory
+    assert restarted.stats()["entries"] == 1 and restarted.stats()["hits"] == 1
+
+
+def test_sqlite_entries_expire(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"))
+    store.set("key", RESULT, ttl=0.01)
+    assert store.get("key") == RESULT
+    time.sleep(0.02)
+    assert store.get("key") is None
+
+
+def test_sqlite_prune_keeps_the_most_recently_used(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    for number in range(100):
+        store.set(f"key-{number}", RESULT, ttl=60)
+    assert store.get("key-99") == RESULT
+    assert store.get("key-0") is None
+
+
+def test_memory_tier_evicts_by_entries_and_returns_copies():
+    cache = ResultCache(max_entries=1)
+    cache.set("a", RESULT)
+    cache.set("b", RESULT)
+    assert cache.get("a") is None
+    cached = cache.get("b")
+    cached["improvements"] = []
+    assert cache.get("b") == RESULT
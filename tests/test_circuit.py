@@ -0,0 +1,124 @@
+import time
+
+import pytest
+
+from circuit import CircuitBreaker, CircuitOpenError
+
+
+def open_breaker(**kwargs):
+    breaker = CircuitBreaker(window=4, min_calls=2, failure_rate=0.5, open_seconds=0.05, **kwargs)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(0.01, failed=True)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_opens_after_failures_and_refuses_calls():
+    breaker = open_breaker()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_successful_trial_closes():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(0.01, failed=False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_trial_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(0.01, failed=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_released_trial_lets_another_through():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    # The trial was cancelled (client disconnect, lost hedge) before it had an outcome
+    breaker.release()
+    breaker.before_call()
+    breaker.record(0.01, failed=False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_abandoned_trial_times_out_to_open():
+    breaker = open_breaker(slow_call_seconds=0.05)
+    time.sleep(0.06)
+    breaker.before_call()  # never recorded nor released
+    time.sleep(0.06)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(0.01, failed=False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_release_outside_half_open_is_a_no_op():
+    breaker = CircuitBreaker()
+    breaker.before_call()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_disconnected_stream_does_not_wedge_the_circuit(optimizer_factory):
+    optimizer = optimizer_factory(CIRCUIT_OPEN_SECONDS="0.05", CIRCUIT_MIN_CALLS="2", CIRCUIT_WINDOW="4")
+    circuit = optimizer.circuit
+    for _ in range(2):
+        circuit.before_call()
+        circuit.record(0.01, failed=True)
+    time.sleep(0.06)
+
+    payload = optimizer._build_optimization_payload("Write a haiku about compilers", "BASIC", "ChatGPT", stream=True)
+    stream = optimizer._stream_deepseek_api(payload)
+    next(stream)
+    stream.close()  # what Flask does when the client goes away mid-stream
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+
+    result = optimizer.optimize_prompt("Write a limerick about linkers", "BASIC", "ChatGPT", use_cache=False)
+    assert not result.get("degraded")
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+def test_spent_deadline_never_reaches_the_circuit(optimizer_factory):
+    from deadline import DeadlineExceeded, start_deadline
+
+    optimizer = optimizer_factory()
+    payload = optimizer._build_optimization_payload("Write a haiku about compilers", "BASIC", "ChatGPT")
+    start_deadline(0.0001)
+    time.sleep(0.001)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            optimizer._call_deepseek_api(payload)
+        with pytest.raises(DeadlineExceeded):
+            next(optimizer._stream_deepseek_api(dict(payload, stream=True)))
+    finally:
+        start_deadline(None)
+    assert list(optimizer.circuit._outcomes) == []
+
+
+def test_deadline_mid_call_counts_as_slow_not_failed(optimizer_factory, monkeypatch):
+    from deadline import DeadlineExceeded
+
+    optimizer = optimizer_factory(CIRCUIT_SLOW_CALL_SECONDS="0.01")
+
+    def out_of_time(payload, fn):
+        time.sleep(0.02)
+        raise DeadlineExceeded()
+
+    monkeypatch.setattr(optimizer.backends, "call", out_of_time)
+    payload = optimizer._build_optimization_payload("Write a haiku about compilers", "BASIC", "ChatGPT")
+    with pytest.raises(DeadlineExceeded):
+        optimizer._call_deepseek_api(payload)
+    assert list(optimizer.circuit._outcomes) == [(False, True)]
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded, current_deadline, start_deadline
+from upstream import attempt_timeouts, can_retry
+
+
+def test_cap_shrinks_the_timeout_to_the_time_left():
+    deadline = Deadline(0.5)
+    assert deadline.cap(30) <= 0.5
+    assert deadline.cap(0.1) == 0.1
+    assert attempt_timeouts(30, 3.05, deadline)[0] <= 0.5
+
+
+def test_cap_raises_once_the_budget_is_spent():
+    deadline = Deadline(0.001)
+    time.sleep(0.002)
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.cap(30)
+    assert not can_retry(deadline, 0.1)
+
+
+def test_start_deadline_sets_and_clears_the_current_deadline():
+    deadline = start_deadline(5)
+    assert current_deadline() is deadline
+    start_deadline(None)
+    assert current_deadline() is None
+
+
+def test_spent_deadline_raises_before_the_upstream_is_called(optimizer_factory, mock_upstream):
+    optimizer = optimizer_factory()
+    payload = optimizer._build_optimization_payload("Write a haiku about compilers", "BASIC", "ChatGPT")
+    sent = mock_upstream.settings.requests
+    start_deadline(0.001)
+    time.sleep(0.002)
+    try:
+        with pytest.raises(DeadlineExceeded):
+            optimizer._call_deepseek_api(payload)
+    finally:
+        start_deadline(None)
+    assert mock_upstream.settings.requests == sent
+
+
+def test_http_deadline_reaches_the_upstream_call(client, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app.Config, "REQUEST_DEADLINE_SECONDS", 0.0001)
+    response = client.post("/optimize", json={"raw_prompt": "Write a haiku about compilers",
+                                              "prompt_style": "BASIC", "target_ai": "ChatGPT"})
+    assert response.status_code == 504
@@ -0,0 +1,22 @@
+from degraded import classify_request, optimize_locally
+
+
+def test_user_text_is_kept_verbatim():
+    raw_prompt = "fix this python function:\n\n    def add(a, b):\n        return a  +  b"
+    clarifications = "1. it runs on python 3.8\n2. keep   the name"
+    result = optimize_locally(raw_prompt, "DETAIL", "ChatGPT", clarifications)
+
+    assert result["degraded"] is True
+    assert f"## Task\n{raw_prompt}\n\n" in result["optimized_prompt"]
+    assert f"## Context\n{clarifications}\n\n" in result["optimized_prompt"]
+
+
+def test_claude_gets_xml_sections():
+    result = optimize_locally("Write a poem about the sea", "BASIC", "Claude")
+    assert "<task>\nWrite a poem about the sea\n</task>" in result["optimized_prompt"]
+    assert "<output_format>" in result["optimized_prompt"]
+
+
+def test_classify_request():
+    assert classify_request("Debug this SQL query") == "technical"
+    assert classify_request("Hello there") == "general"
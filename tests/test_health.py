@@ -0,0 +1,27 @@
+import metrics
+
+
+def test_probe_is_recorded_once_by_the_monitor(optimizer_factory, monkeypatch):
+    optimizer = optimizer_factory()
+    passive = []
+    monkeypatch.setattr(optimizer.health_monitor, "record_success", lambda: passive.append("success"))
+    monkeypatch.setattr(optimizer.health_monitor, "record_failure", lambda error: passive.append(error))
+    before = dict(metrics.UPSTREAM_REQUESTS._values)
+
+    optimizer.health_monitor.probe_now()
+
+    assert passive == []
+    assert dict(metrics.UPSTREAM_REQUESTS._values) == before
+    assert optimizer.health_monitor.stats()["probes"] == 1
+    assert optimizer.health_monitor.snapshot()["source"] == "probe"
+
+
+def test_failed_probe_is_not_passive_traffic(optimizer_factory, monkeypatch):
+    optimizer = optimizer_factory(DEEPSEEK_API_URL="http://127.0.0.1:9/v1/chat/completions")
+    passive = []
+    monkeypatch.setattr(optimizer.health_monitor, "record_failure", lambda error: passive.append(error))
+
+    optimizer.health_monitor.probe_now()
+
+    assert passive == []
+    assert optimizer.health_monitor.snapshot()["status"] == "unhealthy"
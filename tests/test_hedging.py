@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from hedging import HedgePolicy, hedged_call, hedged_call_async
+
+
+def warmed_policy(**kwargs):
+    policy = HedgePolicy(min_samples=1, min_delay=0.01, max_ratio=1, **kwargs)
+    policy.record("model", 0.01)
+    return policy
+
+
+def test_no_hedge_without_samples():
+    policy = HedgePolicy()
+    assert policy.delay("model") is None
+    assert hedged_call(policy, None, "model", lambda: {"ok": True}) == ({"ok": True}, False)
+
+
+def test_no_hedge_when_the_delay_does_not_fit_the_deadline():
+    policy = warmed_policy()
+    calls = []
+    assert hedged_call(policy, None, "model", lambda: calls.append(1) or {}, timeout=0.005) == ({}, False)
+    assert calls == [1]
+
+
+def test_hedge_budget_is_capped():
+    policy = HedgePolicy(min_samples=1, max_ratio=0.5)
+    policy.start_call()
+    assert policy.try_hedge() is False
+    policy.start_call()
+    assert policy.try_hedge() is True
+
+
+def test_hedge_wins_and_the_slow_call_is_discarded():
+    policy = warmed_policy()
+    executor = ThreadPoolExecutor(max_workers=2)
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            release.wait(5)
+            return {"from": "primary"}
+        return {"from": "hedge"}
+
+    try:
+        assert hedged_call(policy, executor, "model", fn) == ({"from": "hedge"}, True)
+        assert policy.stats() == {"calls": 1, "hedged": 1, "hedge_wins": 1}
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+
+
+def test_failed_first_finisher_waits_for_the_other():
+    policy = warmed_policy()
+    executor = ThreadPoolExecutor(max_workers=2)
+    calls = []
+
+    def fn():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            time.sleep(0.05)
+            return {"from": "primary"}
+        raise RuntimeError("hedge failed")
+
+    try:
+        assert hedged_call(policy, executor, "model", fn) == ({"from": "primary"}, True)
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_async_hedge_winner_cancels_the_loser():
+    policy = warmed_policy()
+    started = []
+    cancelled = []
+
+    async def factory():
+        started.append(len(started))
+        if len(started) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return {"from": "hedge"}
+
+    async def run():
+        result = await hedged_call_async(policy, "model", factory)
+        await asyncio.sleep(0)  # let the cancelled primary unwind
+        return result
+
+    assert asyncio.run(run()) == ({"from": "hedge"}, True)
+    assert cancelled == [True]
+
+
+def test_async_errors_when_both_calls_fail():
+    policy = warmed_policy()
+
+    async def factory():
+        await asyncio.sleep(0.02)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(hedged_call_async(policy, "model", factory))
@@ -0,0 +1,15 @@
+BODY = {"raw_prompt": "Explain how a hash map handles collisions", "prompt_style": "BASIC", "target_ai": "ChatGPT"}
+
+
+def test_job_result_has_no_cache_status(client):
+    response = client.post("/optimize", json=dict(BODY, **{"async": True}))
+    assert response.status_code == 202
+
+    job = client.get(response.headers["Location"] + "?wait=5").get_json()
+    assert job["status"] == "done"
+    assert job["result"]["optimized_prompt"]
+    assert "cache_status" not in job["result"]
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/nope").status_code == 404
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from parsing import parse_completion, parse_markdown_sections, validate_structured_output
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "parser_corpus.jsonl")
+
+with open(CORPUS) as f:
+    CASES = [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_corpus(case):
+    components, parser = parse_completion(case["content"])
+    assert parser == case["parser"]
+    for field, expected in case["expected"].items():
+        assert components.get(field) == expected
+
+
+def test_plain_alias_line_stays_in_the_prompt():
+    content = "**Your Optimized Prompt:**\nSummarize the review.\nImprovements: list three.\n\n**Pro Tip:** Be brief."
+    components = parse_markdown_sections(content)
+    assert components["optimized_prompt"] == "Summarize the review.\nImprovements: list three."
+    assert components["improvements"] == []
+
+
+def test_plain_canonical_headings_still_split():
+    content = "Your Optimized Prompt:\nWrite a haiku.\n\nKey Improvements:\n- Added a form\n\nPro Tip: Read it aloud."
+    components = parse_markdown_sections(content)
+    assert components == {"optimized_prompt": "Write a haiku.", "improvements": ["Added a form"],
+                          "pro_tip": "Read it aloud."}
+
+
+def test_marked_up_alias_is_a_heading():
+    components = parse_markdown_sections("## Improved Prompt\nWrite a haiku.\n\n**Techniques:** Constraints")
+    assert components["optimized_prompt"] == "Write a haiku."
+    assert components["techniques_applied"] == ["Constraints"]
+
+
+def test_invalid_structured_output_is_rejected():
+    assert validate_structured_output([]) == (None, ["expected a JSON object"])
+    normalized, errors = validate_structured_output({"optimized_prompt": "", "improvements": [1]})
+    assert normalized is None
+    assert "'optimized_prompt' must not be empty" in errors
+    assert "'improvements' must be a list of strings" in errors
+
+
+def test_broken_json_falls_back_to_raw():
+    components, parser = parse_completion('{"optimized_prompt": "unterminated')
+    assert parser == "raw"
+    assert "optimized_prompt" not in components
@@ -0,0 +1,36 @@
+import pytest
+
+import prompts
+from prompts import MESSAGE_OVERHEAD_TOKENS, TemplateRegistry
+from routing import estimate_tokens
+from validation import validate_optimize_payload
+
+PROMPT = "Explain how a hash map handles collisions"
+
+
+@pytest.mark.parametrize("mode", ["compact", "full"])
+def test_budget_counts_the_compiled_system_prompt(mode):
+    template = TemplateRegistry(mode).get("BASIC", "ChatGPT")
+    expected = estimate_tokens(PROMPT) + MESSAGE_OVERHEAD_TOKENS
+
+    plain = TemplateRegistry(mode)
+    structured = TemplateRegistry(mode, structured=True)
+    assert plain.input_tokens(PROMPT, "BASIC", "ChatGPT") == template.tokens + expected
+    assert structured.input_tokens(PROMPT, "BASIC", "ChatGPT") == template.structured_tokens + expected
+    # Streams always send the markdown template
+    assert structured.input_tokens(PROMPT, "BASIC", "ChatGPT", stream=True) == template.tokens + expected
+
+
+def test_structured_output_is_budgeted(monkeypatch):
+    # "full" appends the JSON instructions to the whole methodology, so that variant is larger
+    template = TemplateRegistry("full").get("BASIC", "ChatGPT")
+    assert template.structured_tokens > template.tokens
+    # Room for the prompt with the markdown template, but not with the JSON one
+    budget = template.tokens + MESSAGE_OVERHEAD_TOKENS + estimate_tokens(PROMPT)
+    monkeypatch.setattr(prompts, "_registry", TemplateRegistry("full", budget, structured=True))
+    body = {"raw_prompt": PROMPT, "prompt_style": "BASIC", "target_ai": "ChatGPT"}
+
+    params, error = validate_optimize_payload(body)
+    assert params is None and error.startswith("Prompt and answers too long")
+    params, error = validate_optimize_payload(body, stream=True)
+    assert error is None
@@ -0,0 +1,22 @@
+import pytest
+
+from ratelimit import MemoryRateLimiter, SQLiteRateLimiter, TokenBucketLimiter
+
+
+def test_base_limiter_is_abstract():
+    with pytest.raises(TypeError):
+        TokenBucketLimiter(10)
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: MemoryRateLimiter(60, burst=2),
+    lambda tmp_path: SQLiteRateLimiter(str(tmp_path / "limits.db"), 60, burst=2),
+], ids=["memory", "sqlite"])
+def test_burst_then_reject(make, tmp_path):
+    limiter = make(tmp_path)
+    assert limiter.check("client").allowed
+    assert limiter.check("client").allowed
+    rejected = limiter.check("client")
+    assert not rejected.allowed
+    assert rejected.headers()["Retry-After"] == "1"
+    assert limiter.check("other").allowed
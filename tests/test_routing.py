@@ -0,0 +1,25 @@
+import pytest
+
+from routing import ModelRouter, StaticRouter, apply_overrides, get_router
+
+
+class IncompleteRouter(ModelRouter):
+    name = "incomplete"
+
+
+def test_router_without_route_cannot_be_built():
+    with pytest.raises(TypeError):
+        ModelRouter()
+    with pytest.raises(TypeError):
+        get_router(f"{__name__}:IncompleteRouter")
+
+
+def test_unknown_router_name():
+    with pytest.raises(ValueError):
+        get_router("fastest")
+
+
+def test_overrides_replace_routed_fields():
+    decision = apply_overrides(StaticRouter().route("Write a haiku", "DETAIL", "ChatGPT"), {"max_tokens": 300})
+    assert decision.max_tokens == 300
+    assert decision.overridden
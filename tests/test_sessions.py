@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+DETAIL = ("Plan a two-week trip to Japan for a family of four", "DETAIL", "ChatGPT")
+
+
+def test_cached_questions_open_a_new_session(optimizer_factory):
+    optimizer = optimizer_factory(CACHE_ENABLED="true")
+    first = optimizer.optimize_prompt(*DETAIL)
+    second = optimizer.optimize_prompt(*DETAIL)
+
+    assert first["cache_status"] == "MISS" and second["cache_status"] == "HIT"
+    assert first["session_id"] != second["session_id"]
+    assert "session_id" not in optimizer.cache.get(next(iter(optimizer.cache._entries)))
+    session = optimizer.sessions.get(second["session_id"], DETAIL[0], DETAIL[2])
+    assert session.messages[-1] == {"role": "assistant", "content": second["questions"]}
+
+
+def test_cache_hit_starts_its_own_speculation(optimizer_factory):
+    optimizer = optimizer_factory(CACHE_ENABLED="true", SPECULATION_ENABLED="true")
+    miss = optimizer.optimize_prompt(*DETAIL)
+    hit = optimizer.optimize_prompt(*DETAIL)
+
+    assert optimizer.speculator.stats()["started"] == 2
+    optimizer.optimize_prompt(*DETAIL, clarifications="Kyoto and Tokyo, mid budget", session_id=miss["session_id"])
+    skipped = optimizer.optimize_prompt(DETAIL[0], "BASIC", DETAIL[2], session_id=hit["session_id"])
+    assert skipped["cache_status"] == "SPECULATIVE"
+
+
+def test_coalesced_questions_get_their_own_sessions(optimizer_factory, mock_upstream):
+    pytest.importorskip("httpx")
+    from async_optimizer import AsyncPromptOptimizer
+
+    optimizer_factory()
+    optimizer = AsyncPromptOptimizer()
+
+    async def run():
+        try:
+            return await asyncio.gather(*(optimizer.optimize_prompt_async(*DETAIL) for _ in range(3)))
+        finally:
+            await optimizer.aclose()
+
+    results = asyncio.run(run())
+    assert sorted(result["cache_status"] for result in results).count("COALESCED") == 2
+    assert len({result["session_id"] for result in results}) == 3
+
+
+def test_streamed_questions_pass_routing_and_session(optimizer_factory, monkeypatch):
+    optimizer = optimizer_factory()
+    calls = []
+    monkeypatch.setattr(optimizer, "optimize_prompt", lambda *args, **kwargs: calls.append(kwargs) or {})
+
+    events = list(optimizer.optimize_prompt_stream(*DETAIL, routing={"max_tokens": 500}, session_id="abc"))
+
+    assert events == [("done", {})]
+    assert calls == [{"routing": {"max_tokens": 500}, "session_id": "abc"}]
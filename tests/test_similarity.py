@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from similarity import NearDuplicateIndex, estimate_similarity, minhash_signature, normalize_for_similarity, shingle_hashes
+
+PROMPT = "Write a short story about a robot who learns to paint watercolor landscapes in the mountains"
+
+
+def test_normalization_ignores_case_and_punctuation():
+    assert normalize_for_similarity("Hello,   WORLD!!") == "hello world"
+
+
+def test_signatures_of_identical_text_agree():
+    hashes = shingle_hashes(normalize_for_similarity(PROMPT))
+    assert estimate_similarity(minhash_signature(hashes, 64), minhash_signature(hashes, 64)) == 1.0
+    # Short texts leave empty bins, which are filled rather than left at the sentinel
+    assert 0xFFFFFFFF not in minhash_signature(shingle_hashes("hi"), 64)
+
+
+def test_near_duplicate_is_found_in_its_namespace_only():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add("BASIC/ChatGPT", "key-1", PROMPT)
+
+    key, similarity = index.query("BASIC/ChatGPT", PROMPT.upper() + "!")
+    assert key == "key-1" and similarity == 1.0
+    assert index.query("DETAIL/ChatGPT", PROMPT) is None
+    assert index.query("BASIC/ChatGPT", "Explain how a hash map handles collisions") is None
+    assert index.stats()["hits"] == 1
+
+
+def test_removed_and_expired_entries_are_not_returned():
+    index = NearDuplicateIndex(ttl=0.01)
+    index.add("ns", "key-1", PROMPT)
+    index.add("ns", "key-2", PROMPT + " and rivers")
+    index.remove("key-1")
+    time.sleep(0.02)
+    assert index.query("ns", PROMPT) is None
+    assert index.stats()["entries"] == 0
+    # Emptied buckets are dropped, not left behind as empty sets
+    assert all(not band for band in index._buckets["ns"])
+
+
+def test_least_recently_used_entries_are_evicted():
+    index = NearDuplicateIndex(max_entries=2)
+    for number in range(3):
+        index.add("ns", f"key-{number}", f"{PROMPT} number {number}")
+    assert index.stats()["entries"] == 2
+    assert index.stats()["evictions"] == 1
+
+
+def test_readding_a_key_replaces_its_text():
+    index = NearDuplicateIndex()
+    index.add("ns", "key-1", PROMPT)
+    index.add("ns", "key-1", "Explain how a hash map handles collisions in open addressing")
+    assert index.query("ns", PROMPT) is None
+    assert index.stats()["entries"] == 1
+
+
+def test_bands_must_divide_the_signature():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_bins=64, bands=7)
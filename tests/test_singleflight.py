@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded, start_deadline
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_follower(flight, key, deadline_seconds=None):
+    """Call flight.do from another thread and collect what it returned or raised"""
+    outcome = {}
+
+    def follow():
+        start_deadline(deadline_seconds)
+        try:
+            outcome["result"] = flight.do(key, lambda: "follower ran")
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=follow)
+    thread.start()
+    return thread, outcome
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def leader():
+        release.wait(5)
+        return "answer"
+
+    leader_thread = threading.Thread(target=flight.do, args=("k", leader))
+    leader_thread.start()
+    time.sleep(0.02)
+    thread, outcome = run_follower(flight, "k")
+    time.sleep(0.02)
+    release.set()
+    thread.join(5)
+    leader_thread.join(5)
+
+    assert outcome["result"] == ("answer", True)
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 1}
+
+
+def test_followers_see_the_leaders_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def leader():
+        release.wait(5)
+        raise ValueError("upstream broke")
+
+    leader_thread = threading.Thread(target=lambda: pytest.raises(ValueError, flight.do, "k", leader))
+    leader_thread.start()
+    time.sleep(0.02)
+    thread, outcome = run_follower(flight, "k")
+    time.sleep(0.02)
+    release.set()
+    thread.join(5)
+    leader_thread.join(5)
+
+    assert isinstance(outcome["error"], ValueError)
+
+
+def test_interrupted_leader_still_answers_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def leader():
+        release.wait(5)
+        raise KeyboardInterrupt()
+
+    leader_thread = threading.Thread(target=lambda: pytest.raises(KeyboardInterrupt, flight.do, "k", leader))
+    leader_thread.start()
+    time.sleep(0.02)
+    thread, outcome = run_follower(flight, "k")
+    time.sleep(0.02)
+    release.set()
+    thread.join(5)
+    leader_thread.join(5)
+
+    assert isinstance(outcome["error"], RuntimeError)
+
+
+def test_follower_gives_up_at_its_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader_thread = threading.Thread(target=flight.do, args=("k", lambda: release.wait(5)))
+    leader_thread.start()
+    time.sleep(0.02)
+
+    thread, outcome = run_follower(flight, "k", deadline_seconds=0.05)
+    thread.join(1)
+    assert not thread.is_alive()
+    assert isinstance(outcome["error"], DeadlineExceeded)
+    release.set()
+    leader_thread.join(5)
+
+
+def test_async_follower_gives_up_at_its_deadline():
+    flight = AsyncSingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "answer"
+
+    async def follower():
+        start_deadline(0.02)
+        return await flight.do("k", slow)
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            await asyncio.ensure_future(follower())
+        # The shared call keeps running for the leader
+        assert await leader == ("answer", False)
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+from speculation import Speculator
+
+RESULT = {"optimized_prompt": "Write a haiku about compilers."}
+
+
+def test_claimed_result_is_used_once():
+    speculator = Speculator()
+    speculation = speculator.start(lambda: dict(RESULT))
+    assert speculator.claim(speculation, 5) == RESULT
+    speculator.discard(speculation)  # a retried request; only the first outcome counts
+    assert speculator.stats()["used"] == 1 and speculator.stats()["wasted"] == 0
+
+
+def test_unusable_results_fail():
+    speculator = Speculator()
+    errored = speculator.start(lambda: {"error": "upstream broke", "optimized_prompt": None})
+    raising = speculator.start(lambda: 1 / 0)
+    assert speculator.claim(errored, 5) is None
+    assert speculator.claim(raising, 5) is None
+    assert speculator.stats()["failed"] == 2
+
+
+def test_slow_speculation_fails_the_claim_and_frees_its_slot_later():
+    speculator = Speculator(max_concurrent=1)
+    release = threading.Event()
+    speculation = speculator.start(lambda: release.wait(5) and dict(RESULT))
+    assert speculator.start(lambda: dict(RESULT)) is None
+    assert speculator.claim(speculation, 0.01) is None
+    release.set()
+    speculation.future.result(5)
+    assert speculator.stats() == {"used": 0, "wasted": 0, "failed": 1, "running": 0, "started": 1, "rejected": 1}
+
+
+def test_discarded_speculation_is_wasted():
+    speculator = Speculator()
+    speculation = speculator.start(lambda: dict(RESULT))
+    speculator.discard(speculation)
+    assert speculator.stats()["wasted"] == 1
+
+
+def test_async_claim():
+    speculator = Speculator()
+
+    async def optimize():
+        return dict(RESULT)
+
+    async def run():
+        speculation = speculator.start_async(optimize)
+        return await speculator.claim_async(speculation, 5)
+
+    assert asyncio.run(run()) == RESULT
+    assert speculator.stats()["used"] == 1
@@ -0,0 +1,54 @@
+from optimizer import StreamingComponentParser
+
+COMPLETION = (
+    "**Your Optimized Prompt:**\nWrite a haiku about compilers.\n\n"
+    "**Key Improvements:**\n• Named the form\n• Named the subject\n\n"
+    "**Techniques Applied:** Constraints\n\n"
+    "**Pro Tip:** Read it aloud."
+)
+
+
+def feed_in_chunks(text, size):
+    parser = StreamingComponentParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events + parser.close()
+
+
+def test_sections_close_as_the_next_heading_arrives():
+    parser = StreamingComponentParser()
+    assert parser.feed("**Your Optimized Prompt:**\nWrite a haiku.") == []
+    assert parser.feed("\n\n**Pro Tip:** Be brief.") == [("optimized_prompt", "Write a haiku.")]
+    assert parser.close() == [("pro_tip", "Be brief.")]
+    assert parser.close() == []
+
+
+def test_headings_split_across_chunks_are_found():
+    expected = feed_in_chunks(COMPLETION, len(COMPLETION))
+    assert dict(expected) == {
+        "optimized_prompt": "Write a haiku about compilers.",
+        "improvements": ["Named the form", "Named the subject"],
+        "techniques_applied": ["Constraints"],
+        "pro_tip": "Read it aloud."
+    }
+    for size in (1, 3, 7, 16):
+        assert feed_in_chunks(COMPLETION, size) == expected
+
+
+def test_text_without_headings_emits_nothing():
+    assert feed_in_chunks("Just a plain answer with no sections.", 5) == []
+
+
+def test_stream_lists_match_the_non_stream_parser():
+    from parsing import parse_markdown_sections
+
+    completion = (
+        "**Your Optimized Prompt:**\nWrite a haiku.\n\n"
+        "**What Changed:**\n- Named the form\n- Named the subject\n\n"
+        "**Techniques Applied:**\n1. Constraints\n2. Role prompting\n\n"
+        "**Pro Tip:** Read it aloud."
+    )
+    streamed = dict(feed_in_chunks(completion, 4))
+    assert streamed == parse_markdown_sections(completion)
+    assert streamed["improvements"] == ["Named the form", "Named the subject"]
@@ -0,0 +1,315 @@
+"""
+Upstream HTTP client
+Shared, pooled keep-alive session for calls to the DeepSeek API
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Imported by the first AsyncUpstreamClient; only the async serving mode needs it, and
+# leaving it out keeps the Flask app's cold start shorter
+httpx = None
+
+from config import Config
+from deadline import Deadline, DeadlineExceeded
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limited or transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt: int, base: float, maximum: float, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, honouring Retry-After when given"""
+    if retry_after:
+        try:
+            return min(float(retry_after), maximum)
+        except ValueError:
+            pass
+    ceiling = min(maximum, base * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def attempt_timeouts(timeout: float, connect_timeout: float, deadline: Optional[Deadline]):
+    """(connect, read) timeouts for one attempt, capped by the request deadline"""
+    if deadline is not None:
+        timeout = deadline.cap(timeout)
+    return min(connect_timeout, timeout), timeout
+
+
+def can_retry(deadline: Optional[Deadline], delay: float) -> bool:
+    """A retry is only worth making if the backoff leaves time for another attempt"""
+    return deadline is None or deadline.remaining() > delay
+
+
+class UpstreamError(Exception):
+    """Raised when the upstream API returns a non-200 response"""
+
+    def __init__(self, status_code: int, body: str, retry_after: Optional[str] = None):
+        self.status_code = status_code
+        self.body = body
+        self.retry_after = retry_after
+        super().__init__(f"DeepSeek API error: {status_code} - {body}")
+
+
+def is_backend_failure(error: Exception) -> bool:
+    """A 429, a 5xx, a connection error or a timeout: the backend itself is in trouble"""
+    if isinstance(error, UpstreamError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+class UpstreamClient:
+    """
+    Keep-alive HTTP client with a bounded connection pool and jittered retries;
+    `hosts` is the number of upstream hosts to keep a connection pool for
+    """
+
+    def __init__(self, pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 connect_timeout: Optional[float] = None, hosts: int = 1):
+        self.pool_size = pool_size or Config.UPSTREAM_POOL_SIZE
+        self.max_retries = Config.UPSTREAM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or Config.UPSTREAM_BACKOFF_BASE
+        self.backoff_max = backoff_max or Config.UPSTREAM_BACKOFF_MAX
+        self.connect_timeout = connect_timeout or Config.UPSTREAM_CONNECT_TIMEOUT
+
+        self.session = requests.Session()
+        # Retries are handled in post_json so they can honour the per-call timeout
+        adapter = HTTPAdapter(
+            pool_connections=hosts,
+            pool_maxsize=self.pool_size,
+            max_retries=0,
+            pool_block=False
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Connection": "keep-alive"
+        })
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+
+    def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None,
+                  timeout: float = 20, max_retries: Optional[int] = None,
+                  deadline: Optional[Deadline] = None, retry_statuses: Optional[set] = None) -> Dict:
+        """
+        POST a JSON payload and return the decoded JSON body
+
+        Args:
+            url: Endpoint to call
+            payload: JSON-serialisable request body
+            headers: Extra headers (e.g. Authorization)
+            timeout: Read timeout in seconds for each attempt
+            max_retries: Override the client's retry count for this call
+            deadline: Request deadline; caps each attempt's timeout and stops
+                retrying when no time is left (raises DeadlineExceeded)
+            retry_statuses: Status codes to retry (default RETRYABLE_STATUS_CODES)
+
+        Returns:
+            Decoded JSON response
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        retry_statuses = RETRYABLE_STATUS_CODES if retry_statuses is None else retry_statuses
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=attempt_timeouts(timeout, self.connect_timeout, deadline)
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded() from e
+                delay = self._backoff(attempt)
+                if attempt >= retries or not can_retry(deadline, delay):
+                    raise
+                logger.warning("Upstream request failed (%s); retrying in %.2fs", e, delay)
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+
+            delay = self._backoff(attempt, response.headers.get("Retry-After"))
+            if response.status_code in retry_statuses and attempt < retries and can_retry(deadline, delay):
+                logger.warning("Upstream returned %s; retrying in %.2fs", response.status_code, delay)
+                response.close()
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            raise UpstreamError(response.status_code, response.text, response.headers.get("Retry-After"))
+
+    def stream_json(self, url: str, payload: Dict, headers: Optional[Dict] = None,
+                    timeout: float = 20, max_retries: Optional[int] = None,
+                    deadline: Optional[Deadline] = None, retry_statuses: Optional[set] = None) -> Iterator[Dict]:
+        """
+        POST a streaming request and yield each decoded server-sent event
+
+        Retries only cover establishing the stream; once the first chunk
+        has been read, errors are raised to the caller. The deadline is
+        checked between events as well as when connecting.
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        retry_statuses = RETRYABLE_STATUS_CODES if retry_statuses is None else retry_statuses
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=attempt_timeouts(timeout, self.connect_timeout, deadline),
+                    stream=True
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded() from e
+                delay = self._backoff(attempt)
+                if attempt >= retries or not can_retry(deadline, delay):
+                    raise
+                logger.warning("Upstream stream failed to open (%s); retrying in %.2fs", e, delay)
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            if response.status_code == 200:
+                break
+
+            delay = self._backoff(attempt, response.headers.get("Retry-After"))
+            if response.status_code in retry_statuses and attempt < retries and can_retry(deadline, delay):
+                logger.warning("Upstream returned %s; retrying in %.2fs", response.status_code, delay)
+                response.close()
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            raise UpstreamError(response.status_code, response.text, response.headers.get("Retry-After"))
+
+        with response:
+            for raw_line in response.iter_lines():
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded()
+                line = raw_line.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                yield json.loads(data)
+
+    def warm(self, url: str, timeout: float = 5) -> bool:
+        """Open a pooled keep-alive connection to url (DNS, TCP, TLS) ahead of the first real call"""
+        try:
+            self.session.head(url, timeout=timeout).close()
+            return True
+        except requests.RequestException as e:
+            logger.warning("Pre-warming the upstream connection to %s failed: %s", url, e)
+            return False
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class AsyncUpstreamClient:
+    """asyncio counterpart of UpstreamClient, backed by an httpx connection pool"""
+
+    def __init__(self, pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 connect_timeout: Optional[float] = None):
+        global httpx
+        if httpx is None:
+            try:
+                import httpx
+            except ImportError:
+                raise RuntimeError("Async serving mode requires httpx (pip install -r requirements-async.txt)")
+
+        self.pool_size = pool_size or Config.ASYNC_POOL_SIZE
+        self.max_retries = Config.UPSTREAM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or Config.UPSTREAM_BACKOFF_BASE
+        self.backoff_max = backoff_max or Config.UPSTREAM_BACKOFF_MAX
+        self.connect_timeout = connect_timeout or Config.UPSTREAM_CONNECT_TIMEOUT
+
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size
+            ),
+            headers={"Content-Type": "application/json"}
+        )
+
+    async def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None,
+                        timeout: float = 20, max_retries: Optional[int] = None,
+                        deadline: Optional[Deadline] = None, retry_statuses: Optional[set] = None) -> Dict:
+        """Async equivalent of UpstreamClient.post_json"""
+        retries = self.max_retries if max_retries is None else max_retries
+        retry_statuses = RETRYABLE_STATUS_CODES if retry_statuses is None else retry_statuses
+        attempt = 0
+        while True:
+            connect_timeout, read_timeout = attempt_timeouts(timeout, self.connect_timeout, deadline)
+            try:
+                response = await self.client.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+                )
+            except httpx.TransportError as e:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded() from e
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                if attempt >= retries or not can_retry(deadline, delay):
+                    raise
+                logger.warning("Upstream request failed (%s); retrying in %.2fs", e, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max,
+                                  response.headers.get("Retry-After"))
+            if response.status_code in retry_statuses and attempt < retries and can_retry(deadline, delay):
+                logger.warning("Upstream returned %s; retrying in %.2fs", response.status_code, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            raise UpstreamError(response.status_code, response.text, response.headers.get("Retry-After"))
+
+    async def close(self):
+        """Close all pooled connections"""
+        await self.client.aclose()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_upstream_client(hosts: int = 1) -> UpstreamClient:
+    """Return the process-wide upstream client, creating it on first use"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = UpstreamClient(hosts=hosts)
+    return _shared_client
@@ -0,0 +1,156 @@
+"""
+Request Validation
+Framework-independent checks shared by the Flask and ASGI servers
+"""
+
+from typing import Dict, Optional, Tuple
+
+from prompts import get_template_registry
+from sessions import SESSION_ID_RE
+
+PROMPT_STYLES = ["BASIC", "DETAIL"]
+TARGET_AIS = ["ChatGPT", "Claude", "Gemini", "Other"]
+MIN_PROMPT_LENGTH = 10
+MAX_PROMPT_LENGTH = 5000
+
+# Per-request routing overrides
+MODELS = ["deepseek-chat", "deepseek-reasoner"]
+MAX_TOKENS_RANGE = (100, 8000)
+TEMPERATURE_RANGE = (0.0, 2.0)
+
+
+def validate_routing_overrides(data: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """Pick out optional model/max_tokens/temperature overrides; (None, None) when absent"""
+    routing = {}
+
+    model = data.get('model')
+    if model is not None:
+        if model not in MODELS:
+            return None, f"model must be one of: {', '.join(MODELS)}"
+        routing["model"] = model
+
+    max_tokens = data.get('max_tokens')
+    if max_tokens is not None:
+        low, high = MAX_TOKENS_RANGE
+        if isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or not low <= max_tokens <= high:
+            return None, f"max_tokens must be an integer between {low} and {high}"
+        routing["max_tokens"] = max_tokens
+
+    temperature = data.get('temperature')
+    if temperature is not None:
+        low, high = TEMPERATURE_RANGE
+        if isinstance(temperature, bool) or not isinstance(temperature, (int, float)) or not low <= temperature <= high:
+            return None, f"temperature must be a number between {low:g} and {high:g}"
+        routing["temperature"] = float(temperature)
+
+    return routing or None, None
+
+
+def validate_optimize_payload(data: Optional[Dict], cache_control: str = "",
+                              stream: bool = False) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Validate an optimization request body
+
+    Args:
+        data: Decoded JSON body
+        cache_control: Value of the request's Cache-Control header
+        stream: The request is for /optimize/stream (budgeted with the markdown system prompt)
+
+    Returns:
+        (params, None) on success, or (None, error message) on failure
+    """
+    if not data or not isinstance(data, dict):
+        return None, "No JSON data provided"
+
+    # Validate required fields
+    required_fields = ["raw_prompt", "prompt_style", "target_ai"]
+    missing_fields = [field for field in required_fields if field not in data]
+
+    if missing_fields:
+        return None, f"Missing required fields: {', '.join(missing_fields)}"
+
+    # Bulk and job inputs are arbitrary JSON; anything else would fail in .strip()/.upper() below
+    text_fields = required_fields + ["clarifications"]
+    wrong_type = [field for field in text_fields if data.get(field) is not None and not isinstance(data[field], str)]
+    if wrong_type:
+        return None, f"Fields must be strings: {', '.join(wrong_type)}"
+
+    # Extract required fields
+    raw_prompt = (data.get('raw_prompt') or '').strip()
+    prompt_style = (data.get('prompt_style') or 'BASIC').upper()
+    target_ai = data.get('target_ai', 'ChatGPT')
+    clarifications = (data.get('clarifications') or '').strip() or None
+
+    # Clients can bypass the result cache per request
+    use_cache = not (
+        data.get('no_cache') is True
+        or 'no-cache' in (cache_control or '').lower()
+    )
+
+    # Run as a background job and answer with a job id instead of the result
+    run_as_job = data.get('async') is True
+
+    # DETAIL stage two continues the stage-one conversation; a BASIC request that
+    # skipped the questions can be served the speculative result kept with it
+    session_id = data.get('session_id') or None
+
+    # Validate field values
+    if not raw_prompt:
+        return None, "raw_prompt cannot be empty"
+
+    if len(raw_prompt) > MAX_PROMPT_LENGTH:
+        return None, f"Prompt too long (maximum {MAX_PROMPT_LENGTH} characters)"
+
+    if prompt_style not in PROMPT_STYLES:
+        return None, "prompt_style must be 'BASIC' or 'DETAIL'"
+
+    if target_ai not in TARGET_AIS:
+        return None, "target_ai must be one of: ChatGPT, Claude, Gemini, Other"
+
+    if session_id is not None and not (isinstance(session_id, str) and SESSION_ID_RE.match(session_id)):
+        return None, "session_id must be the value returned with the clarifying questions"
+
+    routing, error_message = validate_routing_overrides(data)
+    if error_message:
+        return None, error_message
+
+    # Checked here so oversized requests never reach the cache, a job or the upstream
+    templates = get_template_registry()
+    input_tokens = templates.input_tokens(raw_prompt, prompt_style, target_ai, clarifications,
+                                          resumes_session=bool(session_id and clarifications), stream=stream)
+    if input_tokens > templates.max_input_tokens:
+        return None, (f"Prompt and answers too long (about {input_tokens} tokens, "
+                      f"maximum {templates.max_input_tokens})")
+
+    return {
+        "raw_prompt": raw_prompt,
+        "prompt_style": prompt_style,
+        "target_ai": target_ai,
+        "clarifications": clarifications,
+        "use_cache": use_cache,
+        "routing": routing,
+        "async": run_as_job,
+        "session_id": session_id
+    }, None
+
+
+def validate_prompt_input(data: Optional[Dict]) -> Dict:
+    """Pre-flight checks used by /validate"""
+    if not data:
+        return {"valid": False, "message": "No data provided"}
+
+    raw_prompt = data.get("raw_prompt") or ""
+    if not isinstance(raw_prompt, str):
+        return {"valid": False, "message": "Prompt must be a string"}
+    raw_prompt = raw_prompt.strip()
+
+    if not raw_prompt:
+        return {"valid": False, "message": "Prompt cannot be empty"}
+
+    if len(raw_prompt) < MIN_PROMPT_LENGTH:
+        return {"valid": False, "message": f"Prompt too short (minimum {MIN_PROMPT_LENGTH} characters)"}
+
+    if len(raw_prompt) > MAX_PROMPT_LENGTH:
+        return {"valid": False, "message": f"Prompt too long (maximum {MAX_PROMPT_LENGTH} characters)"}
+
+    return {"valid": True, "message": "Input is valid"}